@@ -0,0 +1,90 @@
+"""
+    Benchmark the display calculation of image frames, with and without a display buffer pool.
+
+    Usage: python benchmarks/display_pipeline.py [--shape 2048,2048] [--dtype float32] [--frames 20] [--adjustment none|gamma|log] [--color-map]
+
+    Each frame is new data of the same shape, displayed through the normalized, adjusted, transformed and rgba display
+    values the way the image display calculates them. The time per frame is reported along with the peak memory allocated
+    while calculating a frame, as traced by tracemalloc, and the number of buffers requested from and allocated by the
+    display buffer pool per frame. The display holds on to the arrays of the last frame, as the image display does.
+    Without a pool, the normalized, adjusted and transformed data is calculated in float64, as computations get it.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+import typing
+
+import numpy
+import numpy.typing
+
+from nion.data import DataAndMetadata
+from nion.swift.model import ColorMaps
+from nion.swift.model import DisplayItem
+
+_NDArray = numpy.typing.NDArray[typing.Any]
+
+def make_frames(shape: typing.Tuple[int, ...], dtype: numpy.typing.DTypeLike, count: int) -> typing.List[_NDArray]:
+    rng = numpy.random.default_rng(0)
+    return [rng.normal(1000, 100, size=shape).astype(dtype) for _ in range(count)]
+
+
+def display_frame(data: _NDArray, adjustments: typing.Sequence[typing.Dict[str, typing.Any]], color_map_data: typing.Optional[_NDArray],
+                  display_buffer_pool: typing.Optional[DisplayItem.DisplayBufferPool]) -> typing.Tuple[_NDArray, typing.Optional[_NDArray]]:
+    display_data_info = DisplayItem.DisplayDataInfo(None, DataAndMetadata.new_data_and_metadata(data), (900.0, 1100.0), (0.0, 2000.0),
+                                                    None, (), (), color_map_data, 0.0, 1.0, adjustments,
+                                                    display_buffer_pool=display_buffer_pool)
+    derived_display_values = display_data_info.derived_display_values
+    display_rgba = derived_display_values.display_rgba
+    transformed_data_and_metadata = derived_display_values.transformed_data_and_metadata
+    assert display_rgba is not None
+    return display_rgba, transformed_data_and_metadata.data if transformed_data_and_metadata else None
+
+
+def run(frames: typing.Sequence[_NDArray], adjustments: typing.Sequence[typing.Dict[str, typing.Any]], color_map_data: typing.Optional[_NDArray],
+        use_pool: bool) -> typing.Tuple[float, float, float, float]:
+    display_buffer_pool = DisplayItem.DisplayBufferPool() if use_pool else None
+    # the display holds on to the arrays of the last frame while the next frame is calculated.
+    last_display = display_frame(frames[0], adjustments, color_map_data, display_buffer_pool)
+    request_count = display_buffer_pool._request_count if display_buffer_pool else 0
+    allocation_count = display_buffer_pool._allocation_count if display_buffer_pool else 0
+    start = time.perf_counter()
+    for data in frames:
+        last_display = display_frame(data, adjustments, color_map_data, display_buffer_pool)
+    frame_s = (time.perf_counter() - start) / len(frames)
+    request_count = (display_buffer_pool._request_count - request_count) if display_buffer_pool else 0
+    allocation_count = (display_buffer_pool._allocation_count - allocation_count) if display_buffer_pool else 0
+    # measure the memory allocated during each frame separately, since tracing slows down the calculation.
+    peak_nbytes = 0
+    for data in frames:
+        tracemalloc.start()
+        last_display = display_frame(data, adjustments, color_map_data, display_buffer_pool)
+        peak_nbytes += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    del last_display
+    frame_count = len(frames)
+    return frame_s, peak_nbytes / frame_count / 1e6, request_count / frame_count, allocation_count / frame_count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the display pipeline.")
+    parser.add_argument("--shape", default="2048,2048", help="comma separated frame shape")
+    parser.add_argument("--dtype", default="float32", help="numpy data type")
+    parser.add_argument("--frames", type=int, default=20, help="number of frames")
+    parser.add_argument("--adjustment", default="gamma", choices=["none", "gamma", "log"], help="display adjustment")
+    parser.add_argument("--color-map", action="store_true", help="display with a color map")
+    args = parser.parse_args()
+    frames = make_frames(tuple(int(n) for n in args.shape.split(",")), args.dtype, args.frames)
+    adjustments = [{"type": args.adjustment, "gamma": 0.5}] if args.adjustment != "none" else list()
+    color_map_data = ColorMaps.get_color_map_data_by_id("viridis") if args.color_map else None
+    print(f"{args.frames} frames {frames[0].shape} {frames[0].dtype} adjustment {args.adjustment}")
+    print(f"{'pool':>6} {'ms/frame':>10} {'allocated MB/frame':>20} {'buffers/frame':>15} {'allocations/frame':>19}")
+    for use_pool in (False, True):
+        frame_s, allocated_mb, request_count, allocation_count = run(frames, adjustments, color_map_data, use_pool)
+        buffers = f"{request_count:15.1f} {allocation_count:19.1f}" if use_pool else f"{'-':>15} {'-':>19}"
+        print(f"{'yes' if use_pool else 'no':>6} {frame_s * 1000:10.1f} {allocated_mb:20.1f} {buffers}")
+
+
+if __name__ == "__main__":
+    main()
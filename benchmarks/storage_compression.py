@@ -0,0 +1,87 @@
+"""
+    Benchmark the write and read throughput of data storage for each compression option.
+
+    Usage: python benchmarks/storage_compression.py [--shape 64,64,1024] [--dtype float32] [--data noise|spectra|zeros]
+
+    The data is written and read through the storage handler used by projects. The throughput is reported in MB/s of
+    uncompressed data along with the compression ratio, which can be used to choose the storage compression of a
+    project. The file system cache is not flushed between write and read, so read throughput is an upper bound.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import pathlib
+import tempfile
+import time
+import typing
+
+import numpy
+import numpy.typing
+
+from nion.data import DataAndMetadata
+from nion.swift.model import HDF5Handler
+from nion.swift.model import NDataHandler
+
+_NDArray = numpy.typing.NDArray[typing.Any]
+
+
+def make_data(shape: typing.Tuple[int, ...], dtype: numpy.typing.DTypeLike, kind: str) -> _NDArray:
+    rng = numpy.random.default_rng(0)
+    if kind == "zeros":
+        return numpy.zeros(shape, dtype=dtype)
+    if kind == "noise":
+        return rng.normal(100, 10, size=shape).astype(dtype)
+    # spectra: a smooth background with peaks and counting noise, similar to EELS data.
+    x = numpy.arange(shape[-1])
+    spectrum = 1000 * numpy.exp(-x / (shape[-1] / 4)) + 200 * numpy.exp(-((x - shape[-1] / 2) / 8) ** 2)
+    return rng.poisson(numpy.broadcast_to(spectrum, shape)).astype(dtype)
+
+
+def run(directory: pathlib.Path, data: _NDArray, compression: typing.Optional[str], use_ndata: bool) -> typing.Tuple[float, float, float]:
+    data_descriptor = DataAndMetadata.DataDescriptor(False, data.ndim - 1, 1)
+    now = datetime.datetime.now()
+    name = "ndata" if use_ndata else (compression or "hdf5")
+    if use_ndata:
+        file_path = directory / f"{name}.ndata"
+        storage_handler: typing.Any = NDataHandler.NDataHandler(file_path)
+    else:
+        file_path = directory / f"{name}.h5"
+        storage_handler = HDF5Handler.HDF5Handler(file_path, compression)
+    try:
+        start = time.perf_counter()
+        storage_handler.write_properties({"uuid": name}, now)
+        storage_handler.write_data(data, data_descriptor, now)
+        storage_handler.close()
+        write_s = time.perf_counter() - start
+        storage_handler = NDataHandler.NDataHandler(file_path) if use_ndata else HDF5Handler.HDF5Handler(file_path)
+        start = time.perf_counter()
+        read_data = numpy.asarray(storage_handler.read_data())
+        read_s = time.perf_counter() - start
+        assert numpy.array_equal(read_data, data)
+    finally:
+        storage_handler.close()
+    return write_s, read_s, data.nbytes / file_path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark storage compression.")
+    parser.add_argument("--shape", default="64,64,1024", help="comma separated data shape")
+    parser.add_argument("--dtype", default="float32", help="numpy data type")
+    parser.add_argument("--data", default="spectra", choices=["noise", "spectra", "zeros"], help="kind of data")
+    parser.add_argument("--directory", default=None, help="directory in which to write files (default temporary)")
+    args = parser.parse_args()
+    data = make_data(tuple(int(n) for n in args.shape.split(",")), args.dtype, args.data)
+    mb = data.nbytes / 1e6
+    print(f"{args.data} {data.shape} {data.dtype} ({mb:.1f} MB)")
+    print(f"{'storage':>8} {'write MB/s':>12} {'read MB/s':>12} {'ratio':>8}")
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        configurations: typing.List[typing.Tuple[str, typing.Optional[str], bool]] = [("ndata", None, True), ("hdf5", None, False)]
+        configurations.extend((compression, compression, False) for compression in HDF5Handler.compression_options)
+        for name, compression, use_ndata in configurations:
+            write_s, read_s, ratio = run(pathlib.Path(directory), data, compression, use_ndata)
+            print(f"{name:>8} {mb / write_s:12.1f} {mb / read_s:12.1f} {ratio:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3422,6 +3422,8 @@ def preview(drawing_metrics: UISettings.DrawingMetrics, display_style: UISetting
         with contextlib.closing(display_canvas_item):
             display_info = display_item.display_info
             display_canvas_item.update_display_info(display_info)
+            # layout first so that the canvas items are updated for the preview size, e.g. to use reduced display data.
+            display_canvas_item.update_layout(Geometry.IntPoint(), pixel_shape)
             with drawing_context.saver():
                 display_canvas_item.update_canvas_items()
                 display_canvas_item.repaint_immediate(drawing_context, pixel_shape)
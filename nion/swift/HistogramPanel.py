@@ -588,14 +588,23 @@ def calculate_histogram_widget_data(display_data_and_metadata: typing.Optional[D
     return HistogramWidgetData()
 
 
-def calculate_statistics(display_data_and_metadata: typing.Optional[DataAndMetadata.DataAndMetadata], display_data_range: typing.Optional[typing.Tuple[float, float]], region: typing.Optional[Graphics.Graphic], displayed_intensity_calibration: typing.Optional[Calibration.Calibration]) -> _StatisticsTable:
+def calculate_statistics_values(data: _NDArray) -> typing.Dict[str, float]:
+    mean = numpy.mean(data).item()
+    std = numpy.std(data).item()
+    rms = numpy.sqrt(numpy.mean(numpy.square(numpy.absolute(data)))).item()
+    return {"mean": mean, "std": std, "rms": rms}
+
+
+def calculate_statistics(display_data_and_metadata: typing.Optional[DataAndMetadata.DataAndMetadata], display_data_range: typing.Optional[typing.Tuple[float, float]], region: typing.Optional[Graphics.Graphic], displayed_intensity_calibration: typing.Optional[Calibration.Calibration], statistics_values: typing.Optional[typing.Mapping[str, float]] = None) -> _StatisticsTable:
     data = display_data_and_metadata.data if display_data_and_metadata else None
     display_data_and_metadata = None  # release ref for gc. needed for tests, because this may occur on a thread.
     data_range = display_data_range
     if data is not None and data.size > 0 and displayed_intensity_calibration:
-        mean = numpy.mean(data).item()
-        std = numpy.std(data).item()
-        rms = numpy.sqrt(numpy.mean(numpy.square(numpy.absolute(data)))).item()
+        # the statistics values may be passed from an earlier calculation to avoid scanning the data.
+        statistics_values = statistics_values if statistics_values is not None else calculate_statistics_values(data)
+        mean = statistics_values["mean"]
+        std = statistics_values["std"]
+        rms = statistics_values["rms"]
         dimensional_shape = Image.dimensional_shape_from_shape_and_dtype(data.shape, data.dtype) or (1, 1)
         sum_data = mean * functools.reduce(operator.mul, dimensional_shape)
         if region is None:
@@ -638,6 +647,7 @@ class HistogramProcessor(Observable.Observable):
         self.__display_range: typing.Optional[typing.Tuple[float, float]] = None
         self.__display_data_range: typing.Optional[typing.Tuple[float, float]] = None
         self.__displayed_intensity_calibration: typing.Optional[Calibration.Calibration] = None
+        self.__statistics_cache: typing.Optional[DisplayItem.DisplayStatisticsCache] = None
         # these fields are used for computation.
         self.__histogram_widget_data_dirty = False
         self.__statistics_dirty = False
@@ -753,6 +763,16 @@ class HistogramProcessor(Observable.Observable):
             self.__statistics_dirty = True
         self.__event.set()
 
+    @property
+    def statistics_cache(self) -> typing.Optional[DisplayItem.DisplayStatisticsCache]:
+        return self.__statistics_cache
+
+    @statistics_cache.setter
+    def statistics_cache(self, value: typing.Optional[DisplayItem.DisplayStatisticsCache]) -> None:
+        # the statistics cache accompanies the display data; it does not require recalculation by itself.
+        with self.__lock:
+            self.__statistics_cache = value
+
     # outputs
 
     @property
@@ -781,6 +801,7 @@ class HistogramProcessor(Observable.Observable):
                 display_range = self.__display_range
                 display_data_range = self.__display_data_range
                 displayed_intensity_calibration = self.__displayed_intensity_calibration
+                statistics_cache = self.__statistics_cache
                 region_data_and_metadata = self.__region_data_and_metadata
                 histogram_widget_data_dirty = self.__histogram_widget_data_dirty
                 statistics_dirty = self.__statistics_dirty
@@ -793,10 +814,25 @@ class HistogramProcessor(Observable.Observable):
                     weakref.ref(display_data_and_metadata) if display_data_and_metadata else None,
                     weakref.ref(region) if region else None
                 )
+            # statistics of the whole display data are stored for use in later sessions; those of regions are not.
+            if region is not None:
+                statistics_cache = None
             if histogram_widget_data_dirty:
-                histogram_widget_data = calculate_histogram_widget_data(region_data_and_metadata, display_range)
+                cached_histogram = statistics_cache.get_value("histogram") if statistics_cache else None
+                if cached_histogram is not None and display_range is not None and tuple(cached_histogram[0]) == tuple(display_range):
+                    histogram_widget_data = HistogramWidgetData(cached_histogram[1], display_range)
+                else:
+                    histogram_widget_data = calculate_histogram_widget_data(region_data_and_metadata, display_range)
+                    if statistics_cache and histogram_widget_data.data is not None and display_range is not None:
+                        statistics_cache.set_value("histogram", (tuple(display_range), histogram_widget_data.data))
             if statistics_dirty:
-                statistics = calculate_statistics(region_data_and_metadata, display_data_range, region, displayed_intensity_calibration)
+                statistics_values = statistics_cache.get_value("statistics") if statistics_cache else None
+                data = region_data_and_metadata.data if region_data_and_metadata else None
+                if statistics_cache and statistics_values is None and displayed_intensity_calibration and data is not None and data.size > 0:
+                    statistics_values = calculate_statistics_values(data)
+                    statistics_cache.set_value("statistics", statistics_values)
+                data = None
+                statistics = calculate_statistics(region_data_and_metadata, display_data_range, region, displayed_intensity_calibration, statistics_values)
             with self.__lock:
                 if not self.__histogram_widget_data_dirty and not self.__statistics_dirty:
                     self.__region_data_and_metadata = region_data_and_metadata
@@ -828,6 +864,10 @@ class HistogramPanel(Panel.Panel):
             display_calibration_info = display_info.display_calibration_info if display_info else None
             return display_calibration_info.displayed_intensity_calibration if display_calibration_info else None
 
+        def extract_data_info_statistics_cache(display_info: DisplayInfo.DisplayInfo | None) -> DisplayItem.DisplayStatisticsCache | None:
+            display_data_info = display_info.display_data_info if display_info else None
+            return display_data_info.statistics_cache if display_data_info else None
+
         def extract_data_info_display_data_and_metadata(display_info: DisplayInfo.DisplayInfo | None) -> DataAndMetadata.DataAndMetadata | None:
             display_data_info = display_info.display_data_info if display_info else None
             return display_data_info.display_data_and_metadata if display_data_info else None
@@ -844,6 +884,7 @@ class HistogramPanel(Panel.Panel):
         display_item = display_item_stream.value
         display_data_channel_stream = StreamPropertyStream[DisplayItem.DisplayDataChannel](typing.cast(Stream.AbstractStream[Observable.Observable], display_item_stream), "display_data_channel")
         display_info_stream = Stream.FollowStream(display_item.display_info_stream if display_item else None)
+        statistics_cache_stream = Stream.MapStream(display_info_stream, extract_data_info_statistics_cache)
         display_data_and_metadata_stream = Stream.MapStream(display_info_stream, extract_data_info_display_data_and_metadata)
         display_range_stream = Stream.MapStream(display_info_stream, extract_data_info_display_range)
         display_data_range_stream = Stream.MapStream(display_info_stream, extract_data_info_data_range)
@@ -859,6 +900,7 @@ class HistogramPanel(Panel.Panel):
 
         region_stream = TargetRegionStream(display_item_stream)
         self.__setters = [
+            PropertySetter(statistics_cache_stream, self._histogram_processor, "statistics_cache"),
             PropertySetter(display_data_and_metadata_stream, self._histogram_processor, "display_data_and_metadata"),
             PropertySetter(region_stream, self._histogram_processor, "region"),
             PropertySetter(display_range_stream, self._histogram_processor, "display_range"),
@@ -25,6 +25,7 @@ from nion.swift.model import ImageDisplay
 from nion.swift.model import UISettings
 from nion.swift.model import Utility
 from nion.ui import CanvasItem
+from nion.utils import Event
 from nion.utils import Geometry
 from nion.utils import Model
 from nion.utils import Stream
@@ -708,6 +709,42 @@ class ImageBitmapCanvasItem(CanvasItem.BitmapCanvasItem):
         return None
 
 
+class ImageTilesCanvasItemComposer(CanvasItem.BaseComposer):
+    def __init__(self, canvas_item: CanvasItem.AbstractCanvasItem, layout_sizing: CanvasItem.Sizing, cache: CanvasItem.ComposerCache, tiles: typing.Sequence[typing.Tuple[Geometry.FloatRect, DrawingContext.RGBA32Type]]) -> None:
+        super().__init__(canvas_item, layout_sizing, cache)
+        self.__tiles = tiles
+
+    def _repaint(self, drawing_context: DrawingContext.DrawingContext, canvas_bounds: Geometry.IntRect, composer_cache: CanvasItem.ComposerCache) -> None:
+        for tile_rect, tile_rgba in self.__tiles:
+            left = canvas_bounds.left + tile_rect.left * canvas_bounds.width
+            top = canvas_bounds.top + tile_rect.top * canvas_bounds.height
+            drawing_context.draw_image(tile_rgba, left, top, tile_rect.width * canvas_bounds.width, tile_rect.height * canvas_bounds.height)
+
+
+class ImageTilesCanvasItem(CanvasItem.AbstractCanvasItem):
+    """A canvas item to paint RGBA tiles of the image.
+
+    Used instead of the bitmap when only part of a large image is visible. The tile rects are in coordinates normalized
+    to the image, so that the tiles follow the layout of the image.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__tiles: typing.Sequence[typing.Tuple[Geometry.FloatRect, DrawingContext.RGBA32Type]] = tuple()
+
+    @property
+    def tiles(self) -> typing.Sequence[typing.Tuple[Geometry.FloatRect, DrawingContext.RGBA32Type]]:
+        return self.__tiles
+
+    def set_tiles(self, tiles: typing.Sequence[typing.Tuple[Geometry.FloatRect, DrawingContext.RGBA32Type]]) -> None:
+        if self.__tiles or tiles:
+            self.__tiles = tuple(tiles)
+            self.update()
+
+    def _get_composer(self, composer_cache: CanvasItem.ComposerCache) -> typing.Optional[CanvasItem.BaseComposer]:
+        return ImageTilesCanvasItemComposer(self, self.layout_sizing, composer_cache, self.__tiles)
+
+
 MousePositionAndModifiers = typing.Tuple[Geometry.IntPoint, "UserInterface.KeyboardModifiers"]
 MouseHandlerReactorFn = typing.Callable[[Stream.ValueChangeStreamReactorInterface[MousePositionAndModifiers]], typing.Coroutine[typing.Any, typing.Any, typing.Any]]
 
@@ -1068,10 +1105,12 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
         # the background
         # next the zoom-able items
         self.__bitmap_canvas_item = ImageBitmapCanvasItem(draw_background)
+        self.__tiles_canvas_item = ImageTilesCanvasItem()
         self.__graphics_canvas_item = GraphicsCanvasItem(self.__drawing_metrics, self.__display_style)
         # put the zoom-able items into a composition
         self.__composite_canvas_item = ImageAreaCompositeCanvasItem()
         self.__composite_canvas_item.add_canvas_item(self.__bitmap_canvas_item)
+        self.__composite_canvas_item.add_canvas_item(self.__tiles_canvas_item)
         self.__composite_canvas_item.add_canvas_item(self.__graphics_canvas_item)
         # and put the composition into a scroll area
         self.scroll_area_canvas_item = ImageAreaCanvasItem(self.__composite_canvas_item)
@@ -1105,10 +1144,26 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
         # frame rate and latency
         self.__display_latency_model = Model.PropertyModel[bool](False)
 
+        # the level of the display data pyramid used for the bitmap and whether it was available.
+        self.__display_data_pyramid: typing.Optional[DisplayItem.DisplayDataPyramid] = None
+        self.__display_data_pyramid_level_ready_listener: typing.Optional[Event.EventListener] = None
+        self.__display_data_level = (0, True)
+
+        # the indexes of the tiles painted when only part of the image is visible, or None if not tiled.
+        self.__display_tile_indexes: typing.Optional[typing.List[typing.Tuple[int, int]]] = None
+
     @property
     def _scale_marker_canvas_item_for_test(self) -> ScaleMarkerCanvasItem:
         return self.__scale_marker_canvas_item
 
+    @property
+    def _bitmap_canvas_item_for_test(self) -> ImageBitmapCanvasItem:
+        return self.__bitmap_canvas_item
+
+    @property
+    def _tiles_canvas_item_for_test(self) -> ImageTilesCanvasItem:
+        return self.__tiles_canvas_item
+
     def add_display_control(self, display_control_canvas_item: CanvasItem.AbstractCanvasItem, role: typing.Optional[str] = None) -> None:
         self.__overlay_canvas_item.add_canvas_item(display_control_canvas_item)
 
@@ -1141,6 +1196,8 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
             self.scroll_area_canvas_item._data_shape = data_shape
             self.__composite_canvas_item._data_shape = data_shape
 
+            screen_pixel_per_image_pixel = 0.0
+            visible_image_rect: typing.Optional[Geometry.FloatRect] = None
             scroll_area_canvas_size = self.scroll_area_canvas_item.canvas_size
             if scroll_area_canvas_size is not None:
                 # only update layout if the size/origin will change. it is slow.
@@ -1149,6 +1206,16 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
                     image_canvas_rect = calculate_origin_and_size(scroll_area_canvas_size, data_shape, image_canvas_mode, image_zoom, image_position)
                 else:
                     image_canvas_rect = None
+                if image_canvas_rect and data_shape and data_shape.height > 0:
+                    screen_pixel_per_image_pixel = image_canvas_rect.height / data_shape.height
+                if image_canvas_rect and image_canvas_rect.height > 0 and image_canvas_rect.width > 0:
+                    # the part of the image within the scroll area, normalized to the image.
+                    visible_rect = image_canvas_rect.intersect(Geometry.IntRect(Geometry.IntPoint(), scroll_area_canvas_size))
+                    if visible_rect != image_canvas_rect and visible_rect.height > 0 and visible_rect.width > 0:
+                        visible_image_rect = Geometry.FloatRect.from_tlbr((visible_rect.top - image_canvas_rect.top) / image_canvas_rect.height,
+                                                                          (visible_rect.left - image_canvas_rect.left) / image_canvas_rect.width,
+                                                                          (visible_rect.bottom - image_canvas_rect.top) / image_canvas_rect.height,
+                                                                          (visible_rect.right - image_canvas_rect.left) / image_canvas_rect.width)
                 if image_canvas_rect != self.__composite_canvas_item.canvas_rect:
                     # layout. this makes sure that the info overlay gets updated too.
                     self.update_layout(self.canvas_origin, self.canvas_size)
@@ -1158,10 +1225,43 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
             # update the display values
             display_data_info = image_display_info.display_data_info
             if display_data_info:
-                if display_data_info != self.__last_image_display_info.display_data_info:
-                    derived_display_values = display_data_info.derived_display_values
-                    display_data = derived_display_values.adjusted_data_and_metadata
-                    if display_data:
+                # large data displayed at a reduced scale uses display data decimated to about the size of the screen.
+                # until the level is available, the full display data is used.
+                display_data_pyramid = display_data_info.display_data_pyramid
+                if display_data_pyramid is not self.__display_data_pyramid:
+                    self.__display_data_pyramid = display_data_pyramid
+                    self.__display_data_pyramid_level_ready_listener = display_data_pyramid.level_ready_event.listen(ReferenceCounting.weak_partial(ImageCanvasItem.__display_data_pyramid_level_ready, self)) if display_data_pyramid else None
+                display_data_level = DisplayItem.DisplayDataPyramid.get_level(data_shape.as_tuple(), screen_pixel_per_image_pixel) if display_data_pyramid and data_shape else 0
+                level_display_data_info = display_data_info.get_level_display_data_info(display_data_level)
+                last_display_data_level = self.__display_data_level
+                self.__display_data_level = (display_data_level, level_display_data_info is not None)
+                # when only part of a large image is visible, only the visible tiles are rendered. the tiles are cached
+                # so that panning only renders the tiles coming into view.
+                display_tile_cache = display_data_info.display_tile_cache
+                tiles_display_data_info = level_display_data_info or display_data_info
+                tiles_level = display_data_level if level_display_data_info else 0
+                last_display_tile_indexes = self.__display_tile_indexes
+                self.__display_tile_indexes = display_tile_cache.get_tile_indexes(tiles_display_data_info, visible_image_rect) if display_tile_cache and visible_image_rect else None
+                display_data_changed = display_data_info != self.__last_image_display_info.display_data_info or self.__display_data_level != last_display_data_level
+                if display_tile_cache and self.__display_tile_indexes is not None and tiles_display_data_info.display_data_and_metadata:
+                    if display_data_changed or self.__display_tile_indexes != last_display_tile_indexes:
+                        tiles_data_shape = tiles_display_data_info.display_data_and_metadata.data_shape
+                        tiles = list()
+                        for tile_index in self.__display_tile_indexes:
+                            tile_rgba = display_tile_cache.get_tile_rgba(tiles_display_data_info, tiles_level, tile_index)
+                            if tile_rgba is not None:
+                                tile_rect = display_tile_cache.get_tile_rect(tiles_data_shape, tile_index)
+                                tiles.append((Geometry.FloatRect.from_tlbr(tile_rect.top / tiles_data_shape[0], tile_rect.left / tiles_data_shape[1], tile_rect.bottom / tiles_data_shape[0], tile_rect.right / tiles_data_shape[1]), tile_rgba))
+                        self.__tiles_canvas_item.set_tiles(tiles)
+                        self.__bitmap_canvas_item.set_rgba_bitmap_data(None)
+                elif display_data_changed or last_display_tile_indexes is not None:
+                    self.__tiles_canvas_item.set_tiles(tuple())
+                    derived_display_values = tiles_display_data_info.derived_display_values
+                    # integer data is mapped by lookup table, even with adjustments, without calculating adjusted data.
+                    display_data = derived_display_values.adjusted_data_and_metadata if not derived_display_values.uses_lookup_table else None
+                    if derived_display_values.uses_lookup_table:
+                        self.__bitmap_canvas_item.set_rgba_bitmap_data(derived_display_values.display_rgba)
+                    elif display_data:
                         if display_data.data_dtype == numpy.float32:
                             display_range = derived_display_values.transformed_display_range
                             color_map_data = derived_display_values.color_map_data
@@ -1185,12 +1285,15 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
                             self.__bitmap_canvas_item.set_rgba_bitmap_data(data_rgba)
                     else:
                         self.__bitmap_canvas_item.set_rgba_bitmap_data(None)
+                if display_data_info != self.__last_image_display_info.display_data_info:
                     data_metadata = display_data_info.data_metadata
                     metadata_d = data_metadata.metadata if data_metadata else dict()
                     timestamp_ns = metadata_d.get("hardware_source", dict()).get("system_time_ns", time.perf_counter_ns()) if self.__display_latency_model.value else 0
                     self.__timestamp_canvas_item.timestamp_ns = timestamp_ns
             else:
                 self.__bitmap_canvas_item.set_rgba_bitmap_data(None)
+                self.__tiles_canvas_item.set_tiles(tuple())
+                self.__display_tile_indexes = None
                 self.__timestamp_canvas_item.timestamp_ns = 0
 
             # setting the bitmap on the bitmap_canvas_item is delayed until paint, so that it happens on a thread, since it may be time consuming
@@ -1209,6 +1312,10 @@ class ImageCanvasItem(DisplayCanvasItem.DisplayCanvasItem):
         # this goes at the end so that the previous values are still available to determine changes during the update.
         self.__last_image_display_info = image_display_info
 
+    def __display_data_pyramid_level_ready(self) -> None:
+        # called on a thread. the next update of the canvas items uses the new level.
+        self.update()
+
     def handle_auto_display(self) -> bool:
         # enter key has been pressed. calculate best display limits and set them.
         delegate = self.delegate
@@ -66,7 +66,7 @@ class Recorder:
         # called when an item is removed from the document
         def item_removed(key: str, value: DataItem.DataItem, index: int) -> None:
             if value == self.__recording_data_item:
-                self.__stop_recording()
+                self.__stop_recording(is_recording_data_item_removed=True)
             if value == self.__data_item:
                 self.__stop_recording()
                 if callable(self.on_data_item_removed):
@@ -200,22 +200,15 @@ class Recorder:
                     # no first image yet
                     return
                 # now record the new data. it may or may not be a new frame at this point.
-                last_xdata = self.__recording_data_item.xdata
-                self.__recording_index += 1
-                recording_data_shape = self.__recording_data_item.data_shape
-                if current_xdata and last_xdata and recording_data_shape is not None and current_xdata.data_shape == recording_data_shape[1:]:
-                    # continue, append the new data to existing data and update existing data item
-                    intensity_calibration = last_xdata.intensity_calibration
-                    dimensional_calibrations = last_xdata.dimensional_calibrations
-                    data_descriptor = last_xdata.data_descriptor
-                    stacked_data = numpy.vstack([last_xdata.data, [current_xdata.data]])
-                    sequence_xdata = DataAndMetadata.new_data_and_metadata(
-                        stacked_data,
-                        intensity_calibration=intensity_calibration, dimensional_calibrations=dimensional_calibrations,
-                        data_descriptor=data_descriptor)
-                    self.__recording_data_item.set_xdata(sequence_xdata)
-                elif current_xdata and not last_xdata:
-                    # first acquisition, create the sequence
+                recording_data_item = self.__recording_data_item
+                recording_data_metadata = recording_data_item.data_metadata
+                current_data_dtype = current_xdata.data_dtype
+                if recording_data_metadata and current_xdata.data_shape == recording_data_metadata.data_shape[1:] and current_data_dtype == recording_data_metadata.data_dtype:
+                    # continue, write the new data into the next frame of the existing data item.
+                    pass
+                elif not recording_data_metadata and current_data_dtype is not None:
+                    # first acquisition, reserve the sequence for all frames. frames are written in place as they
+                    # arrive so the cost of each frame does not depend on the number of frames already recorded.
                     intensity_calibration = current_xdata.intensity_calibration
                     dimensional_calibrations = [Calibration.Calibration(scale=self.__recording_interval,
                                                                         units="s")] + list(
@@ -223,17 +216,22 @@ class Recorder:
                     data_descriptor = DataAndMetadata.DataDescriptor(True,
                                                                      current_xdata.data_descriptor.collection_dimension_count,
                                                                      current_xdata.data_descriptor.datum_dimension_count)
-                    new_axis_data = current_xdata.data[numpy.newaxis, ...]
-                    sequence_xdata = DataAndMetadata.new_data_and_metadata(new_axis_data,
-                                                                           intensity_calibration=intensity_calibration,
-                                                                           dimensional_calibrations=dimensional_calibrations,
-                                                                           data_descriptor=data_descriptor)
-                    self.__recording_data_item.set_xdata(sequence_xdata)
-                    self.__recording_transaction = self.__document_model.item_transaction(self.__recording_data_item)
+                    data_shape = (self.__recording_count,) + tuple(current_xdata.data_shape)
+                    recording_data_item.reserve_data(data_shape=data_shape, data_dtype=current_data_dtype, data_descriptor=data_descriptor)
+                    recording_data_item.set_intensity_calibration(intensity_calibration)
+                    recording_data_item.set_dimensional_calibrations(dimensional_calibrations)
+                    recording_data_metadata = recording_data_item.data_metadata
+                    self.__recording_transaction = self.__document_model.item_transaction(recording_data_item)
                 else:
                     # something is amiss. stop.
                     self.__stop_recording()
                     return
+                assert recording_data_metadata
+                frame_index = self.__recording_index
+                self.__recording_index += 1
+                frame_xdata = DataAndMetadata.new_data_and_metadata(current_xdata.data[numpy.newaxis, ...])
+                self.__document_model.update_data_item_partial(recording_data_item, recording_data_metadata, frame_xdata,
+                                                               (slice(0, 1),), (slice(frame_index, frame_index + 1),))
             # finally -- check if we've reached the maximum count
             if self.__recording_index >= self.__recording_count:
                 self.__stop_recording()
@@ -251,13 +249,21 @@ class Recorder:
     def stop_recording(self) -> None:
         self.__stop_recording()
 
-    def __stop_recording(self) -> None:
+    def __stop_recording(self, *, is_recording_data_item_removed: bool = False) -> None:
         if self.__recording_state == "recording":
             self.__recording_state = "stopped"
+            recording_index = self.__recording_index
             self.__recording_start = 0.0
             self.__recording_index = 0
             self.__recording_error = False
             if self.__recording_data_item and self.__recording_transaction:
+                recording_data_item = self.__recording_data_item
+                # a recording stopped early only keeps the recorded frames.
+                if not is_recording_data_item_removed:
+                    recording_data_item.update_to_pending_xdata()
+                    recording_xdata = recording_data_item.xdata
+                    if recording_xdata and 0 < recording_index < recording_xdata.data_shape[0]:
+                        recording_data_item.set_xdata(recording_xdata[:recording_index])
                 self.__recording_transaction.close()
                 self.__recording_transaction = None
                 self.__recording_data_item = None
@@ -1,22 +1,26 @@
 from __future__ import annotations
 
 # standard libraries
+import collections
 import copy
 import datetime
 import functools
+import json
 import logging
 import os
 import pathlib
 import pickle
 import queue
 import sqlite3
-import sys
+import struct
 import threading
+import time
 import typing
 import uuid
+import zlib
 
 # third party libraries
-# None
+import numpy
 
 # local libraries
 from nion.utils import Process
@@ -28,9 +32,11 @@ class CacheLike(typing.Protocol):
     def spill_cache(self) -> None: ...
     def set_cached_value(self, target: typing.Any, key: str, value: typing.Any, dirty: bool = False) -> None: ...
     def get_cached_value(self, target: typing.Any, key: str, default_value: typing.Any = None) -> typing.Any: ...
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]: ...
     def remove_cached_value(self, target: typing.Any, key: str) -> None: ...
     def is_cached_value_dirty(self, target: typing.Any, key: str) -> bool: ...
     def set_cached_value_dirty(self, target: typing.Any, key: str, dirty: bool = True) -> None: ...
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None: ...
 
 
 class CacheFactory(typing.Protocol):
@@ -64,6 +70,12 @@ class TracingCache(CacheLike):
         logging.debug("# %s", result)
         return result
 
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]:
+        logging.debug("%s.get_cached_values(%s, %s, %s)", id(self), [id(target) for target in targets], key, default_value)
+        result = self.__storage_cache.get_cached_values(targets, key, default_value)
+        logging.debug("# %s", result)
+        return result
+
     def remove_cached_value(self, target: typing.Any, key: str) -> None:
         logging.debug("%s.remove_cached_value(%s, %s)", id(self), target, key)
         self.__storage_cache.remove_cached_value(target, key)
@@ -78,6 +90,10 @@ class TracingCache(CacheLike):
         logging.debug("%s.set_cached_value_dirty(%s, %s, %s)", id(self), target, key, dirty)
         self.__storage_cache.set_cached_value_dirty(target, key, dirty)
 
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        logging.debug("%s.prune_cached_values(%s)", id(self), len(target_uuids))
+        self.__storage_cache.prune_cached_values(target_uuids)
+
 
 class SuspendableCache(CacheLike):
 
@@ -155,6 +171,28 @@ class SuspendableCache(CacheLike):
             return self.__storage_cache.get_cached_value(target, key, default_value)
         return default_value
 
+    # grab the last cached values for many targets, reading the values not in the temporary cache together.
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]:
+        values: typing.List[typing.Any] = list()
+        unread_targets: typing.List[typing.Any] = list()
+        unread_indexes: typing.List[int] = list()
+        with self.__cache_mutex:
+            for index, target in enumerate(targets):
+                _, object_dict = self.__cache.get(id(target), (target, dict()))
+                _, object_list = self.__cache_remove.get(id(target), (target, list()))
+                if key in object_dict:
+                    values.append(object_dict.get(key))
+                elif key in object_list:
+                    values.append(None)
+                else:
+                    values.append(default_value)
+                    unread_targets.append(target)
+                    unread_indexes.append(index)
+        if self.__storage_cache and unread_targets:
+            for index, value in zip(unread_indexes, self.__storage_cache.get_cached_values(unread_targets, key, default_value)):
+                values[index] = value
+        return values
+
     # removing values from the cache happens immediately under a transaction.
     # this is an area of improvement if it becomes a bottleneck.
     def remove_cached_value(self, target: typing.Any, key: str) -> None:
@@ -197,6 +235,10 @@ class SuspendableCache(CacheLike):
                 _, object_dirty_dict = self.__cache_dirty.setdefault(id(target), (target, dict()))
                 object_dirty_dict[key] = dirty
 
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        if self.__storage_cache:
+            self.__storage_cache.prune_cached_values(target_uuids)
+
 
 class ShadowCache(CacheLike):
     """Shadow another cache, allowing cache usage before the other cache is created.
@@ -276,6 +318,9 @@ class ShadowCache(CacheLike):
             return self.storage_cache.get_cached_value(target, key, default_value)
         return default_value
 
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]:
+        return [self.get_cached_value(target, key, default_value) for target in targets]
+
     # removing values from the cache happens immediately under a transaction.
     # this is an area of improvement if it becomes a bottleneck.
     def remove_cached_value(self, target: typing.Any, key: str) -> None:
@@ -312,6 +357,10 @@ class ShadowCache(CacheLike):
             with self.__cache_mutex:
                 self.__cache_dirty[key] = dirty
 
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        if self.storage_cache:
+            self.storage_cache.prune_cached_values(target_uuids)
+
 
 def db_make_directory_if_needed(directory_path: str) -> None:
     if os.path.exists(directory_path):
@@ -361,6 +410,9 @@ class DictStorageCache(CacheLike):
         cache = self.__cache.setdefault(target.uuid, dict())
         return cache.get(key, default_value)
 
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]:
+        return [self.get_cached_value(target, key, default_value) for target in targets]
+
     def remove_cached_value(self, target: typing.Any, key: str) -> None:
         cache = self.__cache.setdefault(target.uuid, dict())
         cache_dirty = self.__cache_dirty.setdefault(target.uuid, dict())
@@ -377,19 +429,113 @@ class DictStorageCache(CacheLike):
         cache_dirty = self.__cache_dirty.setdefault(target.uuid, dict())
         cache_dirty[key] = dirty
 
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        return  # values are not persistent; the cache may be shared by several projects in tests.
+
+
+# cached values are encoded with a tag and version. numpy arrays are stored as raw bytes with their dtype and shape,
+# compressed if that makes them smaller. other values are pickled. values written before the tag was introduced are
+# pickled with protocol 0 and are rewritten when read.
+_cached_value_tag = b"NSCV"
+_cached_value_version = 1
+_cached_value_pickle = 0
+_cached_value_array = 1
+_cached_value_array_zlib = 2
+
+# whether cached arrays are compressed.
+_g_compress_cached_values = True
+
+
+def _encode_cached_value(value: typing.Any) -> bytes:
+    if type(value) is numpy.ndarray and not value.dtype.hasobject:
+        header = json.dumps({"dtype": value.dtype.str, "shape": list(value.shape)}).encode("utf-8")
+        data_bytes = numpy.ascontiguousarray(value).tobytes()
+        kind = _cached_value_array
+        if _g_compress_cached_values:
+            compressed_data_bytes = zlib.compress(data_bytes, 1)
+            if len(compressed_data_bytes) < len(data_bytes):
+                data_bytes = compressed_data_bytes
+                kind = _cached_value_array_zlib
+        return _cached_value_tag + struct.pack("<BBI", _cached_value_version, kind, len(header)) + header + data_bytes
+    return _cached_value_tag + struct.pack("<BBI", _cached_value_version, _cached_value_pickle, 0) + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_cached_value(value_bytes: bytes) -> typing.Tuple[typing.Any, bool]:
+    """Return the value and whether it is encoded in the current format."""
+    value_bytes = bytes(value_bytes)
+    if not value_bytes.startswith(_cached_value_tag):
+        return pickle.loads(value_bytes, encoding='latin1'), False
+    offset = len(_cached_value_tag)
+    version, kind, header_length = struct.unpack_from("<BBI", value_bytes, offset)
+    offset += struct.calcsize("<BBI")
+    if version != _cached_value_version:
+        raise ValueError(f"Unknown cached value version {version}")
+    if kind == _cached_value_pickle:
+        return pickle.loads(value_bytes[offset:]), True
+    header = json.loads(value_bytes[offset:offset + header_length].decode("utf-8"))
+    data_bytes = value_bytes[offset + header_length:]
+    if kind == _cached_value_array_zlib:
+        data_bytes = zlib.decompress(data_bytes)
+    # bytearray so that the array is writable, as with pickled arrays.
+    return numpy.frombuffer(bytearray(data_bytes), dtype=numpy.dtype(header["dtype"])).reshape(header["shape"]), True
+
+
+class _PendingCacheWrite:
+    """A write to a DbStorageCache that has been queued but not committed.
+
+    value is _removed_value if the value is removed and _unknown_value if only the dirty state is written.
+    """
+
+    def __init__(self, value: typing.Any, dirty: bool) -> None:
+        self.value = value
+        self.dirty = dirty
+
+
+_removed_value = object()
+_unknown_value = object()
+
+# the maximum number of uuids in a single query when reading many values.
+_db_query_uuid_count = 500
+
+# the maximum size of the values in a database cache. the least recently used values are removed beyond this size.
+_g_db_cache_max_bytes = 1024 * 1024 * 1024
+
+# the access time of a value is only updated when read if it is older than this, in seconds.
+_db_access_time_resolution = 60 * 60
+
 
 class DbStorageCache(CacheLike):
+    """Cache values in a sqlite database.
+
+    Writes are queued and performed on a dedicated thread; writes queued together are performed in a single
+    transaction. Reads use a separate connection and do not wait for queued writes. Values with a queued write are read
+    from the queue instead. The database uses write-ahead logging so that reads are not blocked by a write.
+
+    The time each value was last accessed is recorded. When the values are larger than max_bytes, the least recently
+    accessed values are removed on the write thread. This is checked when opened and after writes.
+    """
     count = 0  # useful for detecting leaks in tests
 
-    def __init__(self, cache_filename: pathlib.Path) -> None:
+    def __init__(self, cache_filename: pathlib.Path, max_bytes: typing.Optional[int] = None) -> None:
         DbStorageCache.count += 1
+        self.__max_bytes = max_bytes if max_bytes is not None else _g_db_cache_max_bytes
+        self.__written_bytes = 0
         # Python 3.9+: fix typing
         self.__queue: typing.Any = queue.Queue()
         self.__queue_lock = threading.RLock()
+        # writes which have been queued but not committed, keyed by uuid str and key.
+        self.__pending: typing.Dict[typing.Tuple[str, str], _PendingCacheWrite] = dict()
+        self.__pending_lock = threading.RLock()
+        self.__batch_writes: typing.List[typing.Tuple[typing.Tuple[str, str], _PendingCacheWrite]] = list()
+        self.__read_conn: typing.Optional[sqlite3.Connection] = None
+        self.__read_lock = threading.RLock()
         self.__started_event = threading.Event()
         self.__thread = threading.Thread(target=self.__run, args=[cache_filename])
         self.__thread.start()
         self.__started_event.wait()
+        # an in-memory database is only available to the connection that created it; reads are queued instead.
+        if str(cache_filename) != ":memory:":
+            self.__read_conn = sqlite3.connect(str(cache_filename), check_same_thread=False)
 
     def close(self) -> None:
         with self.__queue_lock:
@@ -399,6 +545,10 @@ class DbStorageCache(CacheLike):
             self.__queue = None
         self.__thread.join()
         self.__thread = typing.cast(typing.Any, None)
+        with self.__read_lock:
+            if self.__read_conn:
+                self.__read_conn.close()
+                self.__read_conn = None
         DbStorageCache.count -= 1
 
     def suspend_cache(self) -> None:
@@ -409,42 +559,91 @@ class DbStorageCache(CacheLike):
 
     def __run(self, cache_filename: pathlib.Path) -> None:
         self.conn = sqlite3.connect(str(cache_filename))
+        # auto vacuum only applies to new databases. it allows the file to shrink after values are evicted.
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
         self.conn.execute("PRAGMA synchronous = OFF")
         self.__create()
+        self.__evict()
         self.__started_event.set()
-        while True:
-            action = self.__queue.get()
-            item, result, event, action_name = action
-            # logging.debug("item %s  result %s  event %s  action %s", item, result, event, action_name)
-            if item:
-                try:
-                    # logging.debug("EXECUTE %s", action_name)
-                    # start = time.time()
-                    with Process.audit(f"cache.{action_name}"):
-                        if result is not None:
-                            result.append(item())
+        is_closing = False
+        while not is_closing:
+            # perform the actions queued together in a single transaction.
+            actions = [self.__queue.get()]
+            while actions[-1][0] and not self.__queue.empty():
+                actions.append(self.__queue.get_nowait())
+            try:
+                with self.conn:
+                    for item, result, event, action_name in actions:
+                        # logging.debug("item %s  result %s  event %s  action %s", item, result, event, action_name)
+                        if item:
+                            try:
+                                with Process.audit(f"cache.{action_name}"):
+                                    if result is not None:
+                                        result.append(item())
+                                    else:
+                                        item()
+                            except Exception as e:
+                                import traceback
+                                logging.debug("DB Error: %s", e)
+                                traceback.print_exc()
+                                traceback.print_stack()
                         else:
-                            item()
-                    # elapsed = time.time() - start
-                    # logging.debug("ELAPSED %s", elapsed)
-                except Exception as e:
-                    import traceback
-                    logging.debug("DB Error: %s", e)
-                    traceback.print_exc()
-                    traceback.print_stack()
-                finally:
-                    # logging.debug("FINISH")
+                            is_closing = True
+            except Exception as e:
+                logging.debug("DB Error: %s", e)
+            finally:
+                # committed writes are visible to the read connection.
+                with self.__pending_lock:
+                    for pending_key, pending_write in self.__batch_writes:
+                        if self.__pending.get(pending_key) is pending_write:
+                            self.__pending.pop(pending_key)
+                self.__batch_writes = list()
+                for item, result, event, action_name in actions:
                     if event:
                         event.set()
-            self.__queue.task_done()
-            if not item:
-                break
+                    self.__queue.task_done()
+            if not is_closing and self.__written_bytes > self.__max_bytes // 8:
+                self.__evict()
         self.conn.close()
         self.conn = typing.cast(typing.Any, None)
 
     def __create(self) -> None:
         with self.conn:
-            self.execute("CREATE TABLE IF NOT EXISTS cache(uuid STRING, key STRING, value BLOB, dirty INTEGER, PRIMARY KEY(uuid, key))")
+            self.execute("CREATE TABLE IF NOT EXISTS cache(uuid STRING, key STRING, value BLOB, dirty INTEGER, accessed INTEGER DEFAULT 0, PRIMARY KEY(uuid, key))")
+            # caches written before access times were recorded are treated as not accessed.
+            if "accessed" not in {row[1] for row in self.conn.execute("PRAGMA table_info(cache)")}:
+                self.execute("ALTER TABLE cache ADD COLUMN accessed INTEGER DEFAULT 0")
+            self.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+
+    def __evict(self) -> None:
+        # remove the least recently accessed values until the values are well below the maximum size.
+        self.__written_bytes = 0
+        try:
+            with Process.audit("cache.evict"):
+                with self.conn:
+                    n_bytes = self.conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache").fetchone()[0]
+                    if n_bytes <= self.__max_bytes:
+                        return
+                    n_excess_bytes = n_bytes - self.__max_bytes * 3 // 4
+                    row_ids = list()
+                    for row_id, value_n_bytes in self.conn.execute("SELECT rowid, LENGTH(value) FROM cache ORDER BY accessed"):
+                        row_ids.append(row_id)
+                        n_excess_bytes -= value_n_bytes or 0
+                        if n_excess_bytes <= 0:
+                            break
+                    for i in range(0, len(row_ids), _db_query_uuid_count):
+                        query_row_ids = row_ids[i:i + _db_query_uuid_count]
+                        self.execute(f"DELETE FROM cache WHERE rowid IN ({', '.join('?' * len(query_row_ids))})", query_row_ids)
+                self.conn.execute("PRAGMA incremental_vacuum")
+        except Exception as e:
+            logging.debug("DB Error: %s", e)
+
+    def __remove_other_targets(self, uuid_strs: typing.AbstractSet[str]) -> None:
+        other_uuid_strs = [row[0] for row in self.conn.execute("SELECT DISTINCT uuid FROM cache") if row[0] not in uuid_strs]
+        for i in range(0, len(other_uuid_strs), _db_query_uuid_count):
+            query_uuid_strs = other_uuid_strs[i:i + _db_query_uuid_count]
+            self.execute(f"DELETE FROM cache WHERE uuid IN ({', '.join('?' * len(query_uuid_strs))})", query_uuid_strs)
 
     def execute(self, stmt: str, args: typing.Any = None, log: bool = False) -> typing.Any:
         if args:
@@ -458,93 +657,315 @@ class DbStorageCache(CacheLike):
                 logging.debug("%s", stmt)
             return None
 
-    def __set_cached_value(self, target: typing.Any, key: str, value: typing.Any, dirty: bool = False) -> None:
-        with self.conn:
-            self.execute("INSERT OR REPLACE INTO cache (uuid, key, value, dirty) VALUES (?, ?, ?, ?)",
-                         (str(target.uuid), key, sqlite3.Binary(pickle.dumps(value, 0)), 1 if dirty else 0))
-
-    def __get_cached_value(self, target: typing.Any, key: str, default_value: typing.Any = None) -> typing.Any:
-        last_result = self.execute("SELECT value FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key))
-        value_row = last_result.fetchone()
-        if value_row is not None:
-            if sys.version < '3':
-                result = pickle.loads(bytes(bytearray(value_row[0])))
-            else:
-                result = pickle.loads(value_row[0], encoding='latin1')
-            return result
-        else:
-            return default_value
-
-    def __remove_cached_value(self, target: typing.Any, key: str) -> None:
-        with self.conn:
-            self.execute("DELETE FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key))
-
-    def __is_cached_value_dirty(self, target: typing.Any, key: str) -> bool:
-        last_result = self.execute("SELECT dirty FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key))
-        value_row = last_result.fetchone()
-        if value_row is not None:
-            return int(value_row[0]) != 0
-        else:
-            return True
-
-    def __set_cached_value_dirty(self, target: typing.Any, key: str, dirty: bool = True) -> None:
-        with self.conn:
-            self.execute("UPDATE cache SET dirty=? WHERE uuid=? AND key=?", (1 if dirty else 0, str(target.uuid), key))
-
-    def set_cached_value(self, target: typing.Any, key: str, value: typing.Any, dirty: bool = False) -> None:
-        assert target is not None
-        event = threading.Event()
+    def __queue_write(self, target: typing.Any, key: str, pending_write: _PendingCacheWrite, stmt: str, args: typing.Tuple[typing.Any, ...], action_name: str, *, is_value_written: bool = False) -> None:
+        pending_key = (str(target.uuid), key)
         with self.__queue_lock:
             _queue = self.__queue
-        if _queue:
-            _queue.put((functools.partial(self.__set_cached_value, target, key, value, dirty), None, event, "set_cached_value"))
-        # event.wait()
-
-    def get_cached_value(self, target: typing.Any, key: str, default_value: typing.Any = None) -> typing.Any:
-        assert target is not None
+            if _queue:
+                with self.__pending_lock:
+                    self.__pending[pending_key] = pending_write
+                _queue.put((functools.partial(self.__write, pending_key, pending_write, stmt, args, is_value_written), None, None, action_name))
+
+    def __write(self, pending_key: typing.Tuple[str, str], pending_write: _PendingCacheWrite, stmt: str, args: typing.Tuple[typing.Any, ...], is_value_written: bool) -> None:
+        # values are pickled on the write thread.
+        if is_value_written:
+            value_bytes = _encode_cached_value(pending_write.value)
+            self.__written_bytes += len(value_bytes)
+            args = (sqlite3.Binary(value_bytes),) + args + (int(time.time()),)
+        self.__batch_writes.append((pending_key, pending_write))
+        self.execute(stmt, args)
+
+    def __queue_action(self, fn: typing.Callable[[], None], action_name: str) -> None:
+        with self.__queue_lock:
+            _queue = self.__queue
+            if _queue:
+                _queue.put((fn, None, None, action_name))
+
+    def __get_pending_write(self, target: typing.Any, key: str) -> typing.Optional[_PendingCacheWrite]:
+        with self.__pending_lock:
+            return self.__pending.get((str(target.uuid), key))
+
+    def __read(self, fn: typing.Callable[[sqlite3.Connection], typing.Any], action_name: str, default_value: typing.Any) -> typing.Any:
+        with self.__read_lock:
+            read_conn = self.__read_conn
+            if read_conn:
+                with Process.audit(f"cache.{action_name}"):
+                    return fn(read_conn)
         event = threading.Event()
         result: typing.List[typing.Any] = list()
         with self.__queue_lock:
             _queue = self.__queue
+            if _queue:
+                _queue.put((lambda: fn(self.conn), result, event, action_name))
         if _queue:
-            _queue.put((functools.partial(self.__get_cached_value, target, key, default_value), result, event, "get_cached_value"))
             event.wait()
-        return result[0] if len(result) > 0 else None
+        return result[0] if len(result) > 0 else default_value
+
+    def __decode(self, uuid_str: str, key: str, value_bytes: bytes, accessed: typing.Optional[int]) -> typing.Any:
+        value, is_current = _decode_cached_value(value_bytes)
+        if not is_current:
+            # rewrite values in an old format, unless the value has been changed since it was read.
+            self.__queue_action(functools.partial(self.execute, "UPDATE cache SET value=? WHERE uuid=? AND key=? AND value=?",
+                                                  (sqlite3.Binary(_encode_cached_value(value)), uuid_str, key, value_bytes)),
+                                "migrate_cached_value")
+        now = int(time.time())
+        if (accessed or 0) < now - _db_access_time_resolution:
+            self.__queue_action(functools.partial(self.execute, "UPDATE cache SET accessed=? WHERE uuid=? AND key=?", (now, uuid_str, key)), "touch_cached_value")
+        return value
+
+    def __get_cached_value(self, conn: sqlite3.Connection, uuid_str: str, key: str, default_value: typing.Any) -> typing.Any:
+        value_row = conn.execute("SELECT value, accessed FROM cache WHERE uuid=? AND key=?", (uuid_str, key)).fetchone()
+        return self.__decode(uuid_str, key, value_row[0], value_row[1]) if value_row is not None else default_value
+
+    def __get_cached_values(self, conn: sqlite3.Connection, uuid_strs: typing.Sequence[str], key: str) -> typing.Dict[str, typing.Any]:
+        values: typing.Dict[str, typing.Any] = dict()
+        for i in range(0, len(uuid_strs), _db_query_uuid_count):
+            query_uuid_strs = list(uuid_strs[i:i + _db_query_uuid_count])
+            stmt = f"SELECT uuid, value, accessed FROM cache WHERE key=? AND uuid IN ({', '.join('?' * len(query_uuid_strs))})"
+            for uuid_str, value, accessed in conn.execute(stmt, [key] + query_uuid_strs):
+                values[uuid_str] = self.__decode(uuid_str, key, value, accessed)
+        return values
+
+    def __get_cached_dirty(self, conn: sqlite3.Connection, uuid_str: str, key: str) -> typing.Optional[bool]:
+        value_row = conn.execute("SELECT dirty FROM cache WHERE uuid=? AND key=?", (uuid_str, key)).fetchone()
+        return int(value_row[0]) != 0 if value_row is not None else None
+
+    def set_cached_value(self, target: typing.Any, key: str, value: typing.Any, dirty: bool = False) -> None:
+        assert target is not None
+        self.__queue_write(target, key, _PendingCacheWrite(value, dirty),
+                           "INSERT OR REPLACE INTO cache (value, uuid, key, dirty, accessed) VALUES (?, ?, ?, ?, ?)",
+                           (str(target.uuid), key, 1 if dirty else 0), "set_cached_value", is_value_written=True)
+
+    def get_cached_value(self, target: typing.Any, key: str, default_value: typing.Any = None) -> typing.Any:
+        assert target is not None
+        pending_write = self.__get_pending_write(target, key)
+        if pending_write and pending_write.value is _removed_value:
+            return default_value
+        if pending_write and pending_write.value is not _unknown_value:
+            return pending_write.value
+        uuid_str = str(target.uuid)
+        return self.__read(lambda conn: self.__get_cached_value(conn, uuid_str, key, default_value), "get_cached_value", None)
+
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]:
+        """Return the cached value for key for each target, reading all of the values with a few queries."""
+        values: typing.List[typing.Any] = list()
+        unread_uuid_strs: typing.List[str] = list()
+        with self.__pending_lock:
+            for target in targets:
+                assert target is not None
+                uuid_str = str(target.uuid)
+                pending_write = self.__pending.get((uuid_str, key))
+                if pending_write and pending_write.value is not _unknown_value:
+                    values.append(default_value if pending_write.value is _removed_value else pending_write.value)
+                else:
+                    values.append(_unknown_value)
+                    unread_uuid_strs.append(uuid_str)
+        read_values = self.__read(lambda conn: self.__get_cached_values(conn, unread_uuid_strs, key), "get_cached_values", dict()) if unread_uuid_strs else dict()
+        return [read_values.get(str(target.uuid), default_value) if value is _unknown_value else value for target, value in zip(targets, values)]
 
     def remove_cached_value(self, target: typing.Any, key: str) -> None:
         assert target is not None
-        event = threading.Event()
-        with self.__queue_lock:
-            _queue = self.__queue
-        if _queue:
-            _queue.put((functools.partial(self.__remove_cached_value, target, key), None, event, "remove_cached_value"))
-        # event.wait()
+        self.__queue_write(target, key, _PendingCacheWrite(_removed_value, True),
+                           "DELETE FROM cache WHERE uuid=? AND key=?", (str(target.uuid), key), "remove_cached_value")
 
     def is_cached_value_dirty(self, target: typing.Any, key: str) -> bool:
         assert target is not None
-        event = threading.Event()
-        result: typing.List[typing.Any] = list()
-        with self.__queue_lock:
-            _queue = self.__queue
-        if _queue:
-            _queue.put((functools.partial(self.__is_cached_value_dirty, target, key), result, event, "is_cached_value_dirty"))
-            event.wait()
-        return typing.cast(bool, result[0])
+        pending_write = self.__get_pending_write(target, key)
+        if pending_write and pending_write.value is not _unknown_value:
+            return pending_write.dirty if pending_write.value is not _removed_value else True
+        uuid_str = str(target.uuid)
+        dirty = self.__read(lambda conn: self.__get_cached_dirty(conn, uuid_str, key), "is_cached_value_dirty", None)
+        # a dirty state written for a value in the database applies to that value.
+        if pending_write and dirty is not None:
+            return pending_write.dirty
+        return dirty if dirty is not None else True
 
     def set_cached_value_dirty(self, target: typing.Any, key: str, dirty: bool = True) -> None:
         assert target is not None
+        with self.__pending_lock:
+            pending_write = self.__get_pending_write(target, key)
+            if pending_write and pending_write.value is _removed_value:
+                return  # there is no value to mark.
+            value = pending_write.value if pending_write else _unknown_value
+            self.__queue_write(target, key, _PendingCacheWrite(value, dirty),
+                               "UPDATE cache SET dirty=? WHERE uuid=? AND key=?", (1 if dirty else 0, str(target.uuid), key), "set_cached_value_dirty")
+
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        """Remove the values of targets other than target_uuids, such as values of items which have been deleted."""
+        # wait for the values to be removed so that they are not read afterwards.
         event = threading.Event()
         with self.__queue_lock:
             _queue = self.__queue
+            if _queue:
+                _queue.put((functools.partial(self.__remove_other_targets, {str(target_uuid) for target_uuid in target_uuids}), None, event, "prune_cached_values"))
         if _queue:
-            _queue.put((functools.partial(self.__set_cached_value_dirty, target, key, dirty), None, event, "set_cached_value_dirty"))
-        # event.wait()
+            event.wait()
+
+
+# the maximum size of values kept in memory by a memory cache in front of a database cache.
+_g_memory_cache_max_bytes = 256 * 1024 * 1024
+
+
+class _CacheTarget:
+    """A stand-in for a cache target, used to write values to the storage cache without retaining the target."""
+
+    def __init__(self, target_uuid: uuid.UUID) -> None:
+        self.uuid = target_uuid
+
+
+class _MemoryCacheEntry:
+    def __init__(self, target_uuid: uuid.UUID, value: typing.Any, dirty: typing.Optional[bool], is_modified: bool) -> None:
+        self.target_uuid = target_uuid
+        self.value = value  # _unknown_value if the storage cache does not have a value
+        self.dirty = dirty  # None if not known
+        self.is_modified = is_modified  # whether the entry must be written to the storage cache
+        self.n_bytes = _estimate_cached_value_n_bytes(value)
+
+
+def _estimate_cached_value_n_bytes(value: typing.Any) -> int:
+    if isinstance(value, numpy.ndarray):
+        return int(value.nbytes) + 128
+    if isinstance(value, (bytes, str)):
+        return len(value) + 64
+    return 256
+
+
+class MemoryCache(CacheLike):
+    """Keep recently used values in memory in front of a storage cache, up to max_bytes.
+
+    Values are written to the storage cache when they are evicted or when the cache is closed. Removed values are
+    removed from the storage cache immediately. Values not in the storage cache are also remembered so that
+    repeated reads of missing values do not go to the storage cache.
+
+    Closing this cache closes the storage cache.
+    """
+
+    def __init__(self, storage_cache: CacheLike, max_bytes: typing.Optional[int] = None) -> None:
+        self.__storage_cache = storage_cache
+        self.__max_bytes = max_bytes if max_bytes is not None else _g_memory_cache_max_bytes
+        self.__entries: collections.OrderedDict[typing.Tuple[uuid.UUID, str], _MemoryCacheEntry] = collections.OrderedDict()
+        self.__n_bytes = 0
+        self.__lock = threading.RLock()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+
+    def close(self) -> None:
+        with self.__lock:
+            entries = list(self.__entries.items())
+            self.__entries.clear()
+            self.__n_bytes = 0
+        for (target_uuid, key), entry in entries:
+            self.__spill_entry(key, entry)
+        self.__storage_cache.close()
+
+    @property
+    def storage_cache(self) -> CacheLike:
+        return self.__storage_cache
+
+    @property
+    def n_bytes(self) -> int:
+        return self.__n_bytes
+
+    def suspend_cache(self) -> None:
+        self.__storage_cache.suspend_cache()
+
+    def spill_cache(self) -> None:
+        self.__storage_cache.spill_cache()
+
+    def __spill_entry(self, key: str, entry: _MemoryCacheEntry) -> None:
+        if entry.is_modified and entry.value is not _unknown_value:
+            self.__storage_cache.set_cached_value(_CacheTarget(entry.target_uuid), key, entry.value, bool(entry.dirty))
+
+    def __put_entry(self, key: str, entry: _MemoryCacheEntry, replace: bool = True) -> _MemoryCacheEntry:
+        # add or replace the entry, then evict the least recently used entries beyond the size limit. an entry read
+        # from the storage cache does not replace an entry written meanwhile. returns the entry in the cache.
+        with self.__lock:
+            entry_key = (entry.target_uuid, key)
+            old_entry = self.__entries.get(entry_key)
+            if old_entry and not replace:
+                return old_entry
+            if old_entry:
+                self.__entries.pop(entry_key)
+                self.__n_bytes -= old_entry.n_bytes
+            self.__entries[entry_key] = entry
+            self.__n_bytes += entry.n_bytes
+            while self.__n_bytes > self.__max_bytes and len(self.__entries) > 1:
+                (evicted_target_uuid, evicted_key), evicted_entry = self.__entries.popitem(last=False)
+                self.__n_bytes -= evicted_entry.n_bytes
+                self.eviction_count += 1
+                self.__spill_entry(evicted_key, evicted_entry)
+            return entry
+
+    def __get_entry(self, target: typing.Any, key: str) -> typing.Optional[_MemoryCacheEntry]:
+        with self.__lock:
+            entry = self.__entries.get((target.uuid, key))
+            if entry:
+                self.__entries.move_to_end((target.uuid, key))
+                self.hit_count += 1
+            else:
+                self.miss_count += 1
+            return entry
+
+    def set_cached_value(self, target: typing.Any, key: str, value: typing.Any, dirty: bool = False) -> None:
+        self.__put_entry(key, _MemoryCacheEntry(target.uuid, value, dirty, True))
+
+    def get_cached_value(self, target: typing.Any, key: str, default_value: typing.Any = None) -> typing.Any:
+        entry = self.__get_entry(target, key)
+        if not entry:
+            value = self.__storage_cache.get_cached_value(target, key, _unknown_value)
+            entry = self.__put_entry(key, _MemoryCacheEntry(target.uuid, value, None, False), False)
+        return entry.value if entry.value is not _unknown_value else default_value
+
+    def get_cached_values(self, targets: typing.Sequence[typing.Any], key: str, default_value: typing.Any = None) -> typing.List[typing.Any]:
+        entries = [self.__get_entry(target, key) for target in targets]
+        unread_targets = [target for target, entry in zip(targets, entries) if not entry]
+        if unread_targets:
+            unread_values = iter(self.__storage_cache.get_cached_values(unread_targets, key, _unknown_value))
+            for index, target in enumerate(targets):
+                if not entries[index]:
+                    entries[index] = self.__put_entry(key, _MemoryCacheEntry(target.uuid, next(unread_values), None, False), False)
+        return [entry.value if entry and entry.value is not _unknown_value else default_value for entry in entries]
+
+    def remove_cached_value(self, target: typing.Any, key: str) -> None:
+        self.__put_entry(key, _MemoryCacheEntry(target.uuid, _unknown_value, None, False))
+        self.__storage_cache.remove_cached_value(target, key)
+
+    def is_cached_value_dirty(self, target: typing.Any, key: str) -> bool:
+        entry = self.__get_entry(target, key)
+        if entry and entry.value is _unknown_value:
+            return True
+        if entry and entry.dirty is not None:
+            return entry.dirty
+        dirty = self.__storage_cache.is_cached_value_dirty(target, key)
+        if entry:
+            entry.dirty = dirty
+        return dirty
+
+    def set_cached_value_dirty(self, target: typing.Any, key: str, dirty: bool = True) -> None:
+        with self.__lock:
+            entry = self.__entries.get((target.uuid, key))
+            if entry and entry.value is _unknown_value:
+                return  # there is no value to mark.
+            if entry and entry.is_modified:
+                entry.dirty = dirty
+                return
+            if entry:
+                entry.dirty = dirty
+        self.__storage_cache.set_cached_value_dirty(target, key, dirty)
+
+    def prune_cached_values(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        with self.__lock:
+            for entry_key in [entry_key for entry_key in self.__entries if entry_key[0] not in target_uuids]:
+                self.__n_bytes -= self.__entries.pop(entry_key).n_bytes
+        self.__storage_cache.prune_cached_values(target_uuids)
 
 
 class DbCacheFactory(CacheFactory):
-    def __init__(self, cache_dir_path: pathlib.Path, identifier: str) -> None:
+    def __init__(self, cache_dir_path: pathlib.Path, identifier: str, max_bytes: typing.Optional[int] = None) -> None:
         self.__cache_dir_path = cache_dir_path
         self.__identifier = identifier
+        self.__max_bytes = max_bytes
 
     def __purge(self, cache_path: pathlib.Path) -> None:
         try:
@@ -557,6 +978,9 @@ class DbCacheFactory(CacheFactory):
                     if time_delta.days > 30:
                         logging.getLogger("loader").info(f"Purging cache file {file_path}")
                         file_path.unlink(True)
+                        # the write-ahead log files of the database are left behind if the cache was not closed.
+                        for suffix in ("-wal", "-shm"):
+                            file_path.with_name(file_path.name + suffix).unlink(True)
         except Exception as e:
             pass
 
@@ -564,7 +988,7 @@ class DbCacheFactory(CacheFactory):
         cache_path = (self.__cache_dir_path / (self.__identifier)).with_suffix(".nscache")
         self.__purge(cache_path)
         logging.getLogger("loader").info(f"Using cache {cache_path}")
-        return DbStorageCache(cache_path)
+        return MemoryCache(DbStorageCache(cache_path, self.__max_bytes))
 
     def release_cache(self, cache: CacheLike) -> None:
         cache.close()
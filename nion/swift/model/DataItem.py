@@ -2,6 +2,7 @@ from __future__ import annotations
 
 # standard libraries
 import abc
+import collections
 import contextlib
 import copy
 import datetime
@@ -132,6 +133,44 @@ class SessionManager(abc.ABC):
 # daylight savings times are time offset (east of UTC) in format "+MM" or "-MM"
 # time zone name is for display only and has no specified format
 
+class DataSliceReader:
+    """An array-like view of the data of a data item which reads only the indexed regions from storage.
+
+    Used by the display pipeline so that a frame of a large sequence or collection can be displayed without loading
+    all of the data. Converting to an array reads all of the data.
+    """
+
+    def __init__(self, data_item: DataItem, data_shape: DataAndMetadata.ShapeType, data_dtype: numpy.typing.DTypeLike) -> None:
+        self.__data_item = data_item
+        self.shape = tuple(data_shape)
+        self.dtype = numpy.dtype(data_dtype)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(numpy.prod(self.shape, dtype=numpy.int64))
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key: typing.Any) -> _ImageDataType:
+        data = self.__data_item.read_data_slice(key)
+        if data is None:
+            raise IOError("Data is not available.")
+        return data
+
+    def __array__(self, dtype: typing.Optional[numpy.typing.DTypeLike] = None, copy: typing.Optional[bool] = None) -> _ImageDataType:
+        data = self[...]
+        return data.astype(dtype) if dtype is not None else data
+
+
 class DataItem(Persistence.PersistentObject):
     """
     Data items represent a data, description, display, and graphics within a library.
@@ -220,6 +259,15 @@ class DataItem(Persistence.PersistentObject):
         self.__data_and_metadata_unloadable = False
         self.__data_and_metadata_first_update_after_reserve = False
         self.__data_and_metadata_lock = threading.RLock()
+        # the data generation changes whenever the data changes. a copy records the source and both generations so
+        # that storage can copy the source file while neither has changed.
+        self.__data_generation = 0
+        self.__data_copy_source: typing.Optional[typing.Tuple[weakref.ReferenceType[DataItem], int, int]] = None
+        # whether the data array is owned by this item (read from storage or copied here) and not by the caller who
+        # set it. only owned data can be shared with copies, since the caller may modify its array in place.
+        self.__data_is_owned = False
+        # the data generation and destination slices of the most recent partial updates. cleared by other changes.
+        self.__data_updated_slices: collections.deque[typing.Tuple[int, typing.Tuple[slice, ...]]] = collections.deque(maxlen=64)
         self.__intensity_calibration: typing.Optional[Calibration.Calibration] = None
         self.__dimensional_calibrations: typing.List[Calibration.Calibration] = list()
         self.__metadata: typing.Dict[str, typing.Any] = dict()
@@ -339,8 +387,15 @@ class DataItem(Persistence.PersistentObject):
             data_item_copy.session_id = self.session_id
             data_item_copy.session_data = copy.deepcopy(self.session_data)
             data_item_copy.category = self.category
-            # data and metadata
-            data_item_copy.set_data_and_metadata(copy.deepcopy(self.data_and_metadata), self.data_modified)
+            # data and metadata. numpy data is shared copy-on-write; see __share_data.
+            data_and_metadata = self.data_and_metadata
+            if data_and_metadata and isinstance(data_and_metadata.data, numpy.ndarray) and self.__data_is_owned:
+                data_item_copy.set_data_and_metadata(self.__share_data(data_and_metadata), self.data_modified)
+                data_item_copy.__data_is_owned = True
+            else:
+                data_item_copy.set_data_and_metadata(copy.deepcopy(data_and_metadata), self.data_modified)
+            if data_and_metadata:
+                data_item_copy.__data_copy_source = weakref.ref(self), self.__data_generation, data_item_copy.__data_generation
             # copy this last and avoid making an extra unnecessary copy
             data_item_copy.__set_dynamic_title(copy.deepcopy(self.__dynamic_title) if self.__dynamic_title else None)
             memo[id(self)] = data_item_copy
@@ -349,8 +404,67 @@ class DataItem(Persistence.PersistentObject):
             data_item_copy.close()
             raise
 
+    def __share_data(self, data_and_metadata: DataAndMetadata.DataAndMetadata) -> DataAndMetadata.DataAndMetadata:
+        # return a copy of data_and_metadata sharing the data. the shared data is marked read-only in both this item
+        # and the copy. either item copies the data before writing to it in place (see __ensure_data_writable).
+        data = data_and_metadata.data
+        shared_data = data.view()
+        shared_data.flags.writeable = False
+        if self.__data is data:
+            self.__data = shared_data
+        return DataAndMetadata.DataAndMetadata.from_data(
+            data=shared_data,
+            intensity_calibration=data_and_metadata.intensity_calibration,
+            dimensional_calibrations=data_and_metadata.dimensional_calibrations,
+            metadata=data_and_metadata.metadata,
+            timestamp=data_and_metadata.timestamp,
+            data_descriptor=data_and_metadata.data_descriptor,
+            timezone=data_and_metadata.timezone,
+            timezone_offset=data_and_metadata.timezone_offset)
+
+    def __ensure_data_writable(self) -> None:
+        # copy data which is shared with another data item (or otherwise read-only) before writing to it in place.
+        data = self.__data
+        if isinstance(data, numpy.ndarray) and not data.flags.writeable:
+            self.__data = numpy.copy(data)
+            self.__data_is_owned = True
+
+    @property
+    def _data_generation(self) -> int:
+        """Return the number of changes to the data since this item was created or read."""
+        return self.__data_generation
+
+    def _get_data_updated_slices(self, data_generation: int) -> typing.Optional[typing.List[typing.Tuple[slice, ...]]]:
+        """Return the slices of the data changed since the data generation, or None if they are not known.
+
+        Only partial updates record the slices they change; any other change to the data makes them unknown.
+        """
+        with self.__data_and_metadata_lock:
+            current_data_generation = self.__data_generation
+            updated_slices = [dst for generation, dst in self.__data_updated_slices if generation > data_generation]
+            if len(updated_slices) == current_data_generation - data_generation:
+                return updated_slices
+            return None
+
+    @property
+    def data_copy_source(self) -> typing.Optional[DataItem]:
+        """Return the data item this item was copied from, if the data of neither item has changed since the copy.
+
+        Used by storage to copy the file of the source instead of writing the data again.
+        """
+        if self.__data_copy_source:
+            source_ref, source_data_generation, data_generation = self.__data_copy_source
+            source = source_ref()
+            if source and not source._closed and source.__data_generation == source_data_generation and self.__data_generation == data_generation:
+                return source
+        return None
+
     def snapshot(self) -> DataItem:
-        """Return a new library item which is a copy of this one with any dynamic behavior made static."""
+        """Return a new library item which is a copy of this one with any dynamic behavior made static.
+
+        The data array read from storage is shared with the snapshot instead of being copied. The data arrays of both
+        items are read-only until the data is written through data_ref or replaced.
+        """
         data_item_snapshot = copy.deepcopy(self)
         data_item_snapshot.category = "persistent"
         return data_item_snapshot
@@ -966,6 +1080,41 @@ class DataItem(Persistence.PersistentObject):
         finally:
             self.decrement_data_ref_count()
 
+    @property
+    def lazy_xdata(self) -> typing.Optional[DataAndMetadata.DataAndMetadata]:
+        """Return the data and metadata without loading the data.
+
+        If the data is loaded or the data item is not stored, this is the same as xdata. Otherwise the data is a
+        DataSliceReader which reads only the regions which are indexed from storage.
+        """
+        data_metadata = self.__data_metadata
+        data_dtype = data_metadata.data_dtype if data_metadata else None
+        if self.__data is not None or not data_metadata or data_dtype is None or not self.persistent_object_context:
+            return self.xdata
+        return DataAndMetadata.DataAndMetadata(
+            data=typing.cast(_ImageDataType, DataSliceReader(self, data_metadata.data_shape, data_dtype)),
+            data_shape_and_dtype=data_metadata.data_shape_and_dtype,
+            intensity_calibration=data_metadata.intensity_calibration,
+            dimensional_calibrations=data_metadata.dimensional_calibrations,
+            metadata=data_metadata.metadata,
+            timestamp=data_metadata.timestamp,
+            data_descriptor=data_metadata.data_descriptor,
+            timezone=data_metadata.timezone,
+            timezone_offset=data_metadata.timezone_offset
+        )
+
+    def read_data_slice(self, key: typing.Any) -> typing.Optional[_ImageDataType]:
+        """Return the region of the data given by the index key.
+
+        If the data is not loaded, only the region is read from storage and the data stays unloaded.
+        """
+        data = self.__data
+        if data is not None:
+            return numpy.asarray(data[key])
+        if self.persistent_object_context and self.__data_metadata:
+            return typing.cast(typing.Optional[_ImageDataType], self.read_external_data_slice("data", key))
+        return None
+
     @property
     def source_file_path(self) -> typing.Optional[pathlib.Path]:
         return self.__source_file_path
@@ -1002,6 +1151,11 @@ class DataItem(Persistence.PersistentObject):
 
     @property
     def data(self) -> typing.Optional[_ImageDataType]:
+        """Return the data array.
+
+        The data array of a data item which shares its data with a copy (see snapshot) is read-only. Use data_ref to
+        get a writable data array.
+        """
         return self.__get_data()
 
     def set_data(self, data: _ImageDataType, data_modified: typing.Optional[datetime.datetime] = None) -> None:
@@ -1044,12 +1198,21 @@ class DataItem(Persistence.PersistentObject):
     # should use the data property. writing data (if allowed) should
     # assign to the data property.
     def data_ref(self) -> contextlib.AbstractContextManager[DataItem.DataAccessor]:
-        return DataItem.DataAccessor(self, self.__get_data, self.__set_data)
+        return DataItem.DataAccessor(self, self.__get_writable_data, self.__set_data)
 
     def __get_data(self) -> typing.Optional[_ImageDataType]:
         xdata = self.xdata
         return xdata.data if xdata else None
 
+    def __get_writable_data(self) -> typing.Optional[_ImageDataType]:
+        # the data reference may be used to write to the data in place, so stop sharing it first.
+        self.increment_data_ref_count()
+        try:
+            self.__ensure_data_writable()
+            return self.__get_data()
+        finally:
+            self.decrement_data_ref_count()
+
     def __set_data(self, data: typing.Optional[_ImageDataType], data_modified: typing.Optional[datetime.datetime] = None) -> None:
         with self.data_source_changes():
             if data is not None:
@@ -1183,6 +1346,7 @@ class DataItem(Persistence.PersistentObject):
     def __load_data(self) -> None:
         if self.persistent_object_context and self.__data is None and self.__data_metadata:
             self.__data = typing.cast(typing.Optional[_ImageDataType], self.read_external_data("data"))
+            self.__data_is_owned = True
 
     def __unload_data(self) -> None:
         if self.__data_and_metadata_unloadable:
@@ -1228,6 +1392,9 @@ class DataItem(Persistence.PersistentObject):
                                        data_modified: typing.Optional[datetime.datetime] = None) -> None:
         assert self.__data_ref_count > 0
         self.__data = data_and_metadata.data if data_and_metadata else None
+        self.__data_is_owned = False
+        self.__data_generation += 1
+        self.__data_updated_slices.clear()
         if data_and_metadata:
             self.__set_data_metadata_direct(data_and_metadata.data_metadata, data_modified)
         self.__change_changed = True
@@ -1278,6 +1445,8 @@ class DataItem(Persistence.PersistentObject):
                 timezone_offset = Utility.TimezoneMinutesToStringConverter().convert(Utility.local_utcoffset_minutes())
                 data_metadata = DataAndMetadata.DataMetadata(data_shape_and_dtype=data_shape_and_dtype, data_descriptor=data_descriptor, metadata=self.metadata, timezone=timezone, timezone_offset=timezone_offset)
                 self.__set_data_metadata_direct(data_metadata, data_modified)
+                self.__data_generation += 1
+                self.__data_updated_slices.clear()
                 self.__load_data()
                 self.__data_and_metadata_unloadable = True
                 self.__data_and_metadata_first_update_after_reserve = True
@@ -1292,6 +1461,8 @@ class DataItem(Persistence.PersistentObject):
         with self.data_source_changes():
             self.increment_data_ref_count()
             try:
+                # if the data is created here, it must be written in full; otherwise only the updated slice is written.
+                is_data_created = self.__data is None
                 if self.__data is None:
                     data: numpy.typing.NDArray[typing.Any] = numpy.zeros(data_metadata.data_shape, data_metadata.data_dtype)
                     data_shape_and_dtype = data_metadata.data_shape_and_dtype
@@ -1312,6 +1483,7 @@ class DataItem(Persistence.PersistentObject):
                                                                             timezone=timezone,
                                                                             timezone_offset=timezone_offset)
                     self.__set_data_and_metadata_direct(new_data_and_metadata, data_modified)
+                    self.__data_is_owned = True
                 if self.__data is not None:
                     date_modified = data_metadata.timestamp if self.__data_and_metadata_first_update_after_reserve else self.__data_metadata.timestamp if self.__data_metadata else None
                     self.__data_and_metadata_first_update_after_reserve = False
@@ -1320,7 +1492,11 @@ class DataItem(Persistence.PersistentObject):
                     assert self.data_shape == data_metadata.data_shape
                     assert self.data_dtype == data_metadata.data_dtype
                     assert self.data_dtype == data_and_metadata.data_dtype, f"{self.data_dtype=} == {data_and_metadata.data_dtype=}"
+                    self.__ensure_data_writable()
                     self.__data[tuple(dst)] = data_and_metadata._data_ex[tuple(src)]
+                    with self.__data_and_metadata_lock:
+                        self.__data_generation += 1
+                        self.__data_updated_slices.append((self.__data_generation, tuple(dst)))
                     # mark changes and update session
                     self.__change_changed = True
                     self.__change_data_changed = True
@@ -1330,7 +1506,10 @@ class DataItem(Persistence.PersistentObject):
                     # set data_shape as a way to update 'modified' property
                     self._set_persistent_property_value("data_shape", self.data_shape)
                     if self.persistent_object_context and not self.is_write_delayed:
-                        self.write_external_data("data", self.__data)
+                        if is_data_created:
+                            self.write_external_data("data", self.__data)
+                        else:
+                            self.write_external_data_slice("data", dst, self.__data)
                         self.__data_and_metadata_unloadable = True
             finally:
                 self.decrement_data_ref_count()
@@ -15,6 +15,7 @@ from __future__ import annotations
 
 # standard libraries
 import asyncio
+import collections
 import concurrent.futures
 import contextlib
 import copy
@@ -27,11 +28,14 @@ import numbers
 import weakref
 
 import numpy
+import numpy.typing
 import operator
+import sys
 import threading
 import types
 import typing
 import uuid
+import warnings
 
 # local libraries
 from nion.data import Calibration
@@ -66,6 +70,10 @@ DisplayLimitsType = typing.Optional[typing.Tuple[typing.Optional[typing.Union[fl
 
 _ = gettext.gettext
 
+# displayed sequence and collection data larger than this is not held in memory. the display reads only the frame or
+# slice it needs from storage instead.
+_g_lazy_display_data_nbytes = 256 * 1024 * 1024
+
 
 class GraphicSelection:
     def __init__(self, indexes: typing.Optional[typing.Set[int]] = None, anchor_index: typing.Optional[int] = None) -> None:
@@ -352,7 +360,7 @@ class CalibratedSizeFloatToStringConverter(Converter.ConverterLike[float, str]):
 
 
 class AdjustmentType(typing.Protocol):
-    def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float]) -> _ImageDataType: ...
+    def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float], out: typing.Optional[_ImageDataType] = None) -> _ImageDataType: ...
 
 
 def adjustment_factory(adjustment_d: Persistence.PersistentDictType) -> typing.Optional[AdjustmentType]:
@@ -361,21 +369,28 @@ def adjustment_factory(adjustment_d: Persistence.PersistentDictType) -> typing.O
             def __init__(self, gamma: float) -> None:
                 self.__gamma = gamma
 
-            def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float]) -> _ImageDataType:
-                return numpy.power(numpy.clip(data, 0.0, 1.0), self.__gamma, dtype=numpy.float32)
+            def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float], out: typing.Optional[_ImageDataType] = None) -> _ImageDataType:
+                out = out if out is not None else numpy.empty(data.shape, numpy.float32)
+                numpy.clip(data, 0.0, 1.0, out=out)
+                return numpy.power(out, self.__gamma, out=out)
 
         return AdjustGamma(adjustment_d.get("gamma", 1.0))
     elif adjustment_d.get("type", None) == "log":
         class AdjustLog:
-            def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float]) -> _ImageDataType:
+            def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float], out: typing.Optional[_ImageDataType] = None) -> _ImageDataType:
                 range = display_limits[1] - display_limits[0]
                 c = 1.0 / (numpy.log2(1 + range))
-                return c * numpy.log2(1 + range * numpy.clip(data, 0.0, 1.0), dtype=numpy.float32)  # type: ignore
+                out = out if out is not None else numpy.empty(data.shape, numpy.float32)
+                numpy.clip(data, 0.0, 1.0, out=out)
+                numpy.multiply(out, range, out=out)
+                numpy.add(out, 1.0, out=out)
+                numpy.log2(out, out=out)
+                return typing.cast(_ImageDataType, numpy.multiply(out, c, out=out))
 
         return AdjustLog()
     elif adjustment_d.get("type", None) == "equalized":
         class AdjustEqualized:
-            def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float]) -> _ImageDataType:
+            def transform(self, data: _ImageDataType, display_limits: typing.Tuple[float, float], out: typing.Optional[_ImageDataType] = None) -> _ImageDataType:
                 data = numpy.clip(data, 0.0, 1.0)
                 histogram, bins = numpy.histogram(data.flatten(), 256, density=True)
                 histogram_cdf = histogram.cumsum()
@@ -539,14 +554,182 @@ class DisplayDataProcessor(ProcessorBase):
         self.set_result("data", data_and_metadata)
 
 
+class DisplayStatisticsCache:
+    """Stores statistics of the display data in the display cache so that they are available in later sessions.
+
+    The statistics are valid while the data item data (by its data modified timestamp) and the display slice are
+    unchanged. Stored statistics are only used while the data has not changed since it was read, since the data
+    modified timestamp does not change with partial updates and may not resolve quick successive changes. Each
+    statistic is stored under its own key so that statistics calculated on different threads do not overwrite each
+    other.
+    """
+
+    def __init__(self, cache: Cache.CacheLike, target: typing.Any, data_item: DataItem.DataItem,
+                 signature: typing.Tuple[typing.Any, ...]) -> None:
+        self.__cache = cache
+        self.__target = target
+        self.__key_prefix = f"display_statistics_{data_item.uuid}_"
+        data_modified = data_item.data_modified
+        self.__signature = (data_modified.isoformat() if data_modified else None,) + tuple(signature)
+        self.__is_data_as_read = data_item._data_generation == 0
+
+    def get_value(self, name: str) -> typing.Any:
+        if not self.__is_data_as_read:
+            return None
+        cached_value = self.__cache.get_cached_value(self.__target, self.__key_prefix + name)
+        if isinstance(cached_value, tuple) and len(cached_value) == 2 and cached_value[0] == self.__signature:
+            return cached_value[1]
+        return None
+
+    def set_value(self, name: str, value: typing.Any) -> None:
+        self.__cache.set_cached_value(self.__target, self.__key_prefix + name, (self.__signature, value))
+
+
+# the number of elements scanned at once when calculating the data range. a block of this size stays in the processor
+# cache while both its minimum and maximum are calculated, so the data is read from memory only once.
+_data_range_block_size = 64 * 1024
+
+# the minimum, the maximum, and their flat indexes, if known.
+DataExtentType = typing.Tuple[typing.Any, typing.Any, typing.Optional[int], typing.Optional[int]]
+
+
+def _calculate_data_extent(data: _ImageDataType) -> typing.Tuple[typing.Any, typing.Any, int, int]:
+    """Return the minimum and maximum of the data and their flat (C order) indexes.
+
+    Floating point data is scanned once, in blocks, and the indexes are found in the blocks holding the minimum and
+    maximum. Integer data is scanned faster by argmin and argmax. If the data contains NaN, the NaN is returned as both
+    the minimum and maximum.
+    """
+    data = numpy.asarray(data)
+    if data.dtype.kind in "biu" and data.size > 0:
+        flat_data = numpy.ravel(data)
+        min_index = int(numpy.argmin(flat_data))
+        max_index = int(numpy.argmax(flat_data))
+        return flat_data[min_index], flat_data[max_index], min_index, max_index
+    min_value: typing.Any = None
+    max_value: typing.Any = None
+    min_block = (0, 0)
+    max_block = (0, 0)
+    offset = 0
+    for block in numpy.nditer(data, flags=["external_loop", "buffered", "zerosize_ok"], order="C", buffersize=_data_range_block_size):
+        block_array = typing.cast(_ImageDataType, block)
+        block_min = numpy.amin(block_array)
+        block_max = numpy.amax(block_array)
+        if block_min != block_min or block_max != block_max:  # nan
+            nan_value = block_min if block_min != block_min else block_max
+            return nan_value, nan_value, 0, 0
+        block_size = block_array.shape[0]
+        if min_value is None or block_min < min_value:
+            min_value, min_block = block_min, (offset, block_size)
+        if max_value is None or block_max > max_value:
+            max_value, max_block = block_max, (offset, block_size)
+        offset += block_size
+    if min_value is None:
+        # match numpy.amin and numpy.amax for empty data.
+        raise ValueError("zero-size array has no data range")
+    min_index = min_block[0] + int(numpy.argmin(data.flat[min_block[0]:min_block[0] + min_block[1]]))
+    max_index = max_block[0] + int(numpy.argmax(data.flat[max_block[0]:max_block[0] + max_block[1]]))
+    return min_value, max_value, min_index, max_index
+
+
+def _update_data_extent(data: _ImageDataType, extent: DataExtentType, updated_slices: typing.Sequence[typing.Tuple[slice, ...]]) -> typing.Optional[DataExtentType]:
+    """Return the extent of the data after the updated slices changed, or None if the data must be scanned again.
+
+    The previous extent stays valid outside the updated slices, so the updated slices can only grow the range. This is
+    not the case if the updated slices contain the previous minimum or maximum, since those values may be gone.
+    """
+    min_value, max_value, min_index, max_index = extent
+    if min_value != min_value or max_value != max_value:  # nan
+        return None
+    if not updated_slices:
+        return extent
+    if min_index is None or max_index is None:
+        return None
+    shape = data.shape
+    min_position = numpy.unravel_index(min_index, shape)
+    max_position = numpy.unravel_index(max_index, shape)
+    for updated_slice in updated_slices:
+        if len(updated_slice) > len(shape):
+            return None
+        updated_slice = tuple(updated_slice) + (slice(None),) * (len(shape) - len(updated_slice))
+        if not all(isinstance(s, slice) for s in updated_slice):
+            return None
+        ranges = [range(*s.indices(n)) for s, n in zip(updated_slice, shape)]
+        if any(r.step != 1 for r in ranges):
+            return None
+        starts = [r.start for r in ranges]
+        if all(p in r for p, r in zip(min_position, ranges)) or all(p in r for p, r in zip(max_position, ranges)):
+            return None
+        slab = numpy.asarray(data[updated_slice])
+        if slab.size == 0:
+            continue
+        slab_min, slab_max, slab_min_index, slab_max_index = _calculate_data_extent(slab)
+        if slab_min != slab_min:  # nan
+            return slab_min, slab_max, 0, 0
+        if slab_min < min_value:
+            min_position = tuple(start + p for start, p in zip(starts, numpy.unravel_index(slab_min_index, slab.shape)))
+            min_value, min_index = slab_min, int(numpy.ravel_multi_index(min_position, shape))
+        if slab_max > max_value:
+            max_position = tuple(start + p for start, p in zip(starts, numpy.unravel_index(slab_max_index, slab.shape)))
+            max_value, max_index = slab_max, int(numpy.ravel_multi_index(max_position, shape))
+    return min_value, max_value, min_index, max_index
+
+
+class DataRangeState:
+    """Holds the extent of the display data most recently calculated for a display data channel.
+
+    Used when the display data is the data of the data item itself, so that partial updates of the data only need to
+    scan the updated slices.
+    """
+
+    def __init__(self, data_item: DataItem.DataItem) -> None:
+        self.__data_item_ref = weakref.ref(data_item)
+        self.__lock = threading.RLock()
+        self.__data_generation = 0
+        self.__data_shape: typing.Optional[DataAndMetadata.ShapeType] = None
+        self.__extent: typing.Optional[DataExtentType] = None
+
+    @property
+    def data_item(self) -> typing.Optional[DataItem.DataItem]:
+        return self.__data_item_ref()
+
+    def get_previous_extent(self, data_shape: DataAndMetadata.ShapeType) -> typing.Optional[typing.Tuple[DataExtentType, typing.List[typing.Tuple[slice, ...]]]]:
+        """Return the previous extent and the slices of the data updated since, or None if they are not known."""
+        with self.__lock:
+            data_item = self.__data_item_ref()
+            if self.__extent is None or data_item is None or self.__data_shape != data_shape:
+                return None
+            updated_slices = data_item._get_data_updated_slices(self.__data_generation)
+            return (self.__extent, updated_slices) if updated_slices is not None else None
+
+    def set_extent(self, data_generation: int, data_shape: DataAndMetadata.ShapeType, extent: DataExtentType) -> None:
+        with self.__lock:
+            if self.__extent is None or data_generation >= self.__data_generation:
+                self.__data_generation = data_generation
+                self.__data_shape = data_shape
+                self.__extent = extent
+
+
 class DataRangeProcessor(ProcessorBase):
     def __init__(self, *,
                  data_metadata: DataAndMetadata.DataMetadata | ProcessorConnection | None = None,
-                 display_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None) -> None:
-        super().__init__(data_metadata=data_metadata, display_data=display_data)
+                 display_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
+                 statistics_cache: DisplayStatisticsCache | None = None,
+                 data_range_state: DataRangeState | None = None,
+                 data_generation: int = 0) -> None:
+        super().__init__(data_metadata=data_metadata, display_data=display_data, statistics_cache=statistics_cache,
+                         data_range_state=data_range_state, data_generation=data_generation)
 
     def _execute(self) -> None:
+        # the data range from an earlier session avoids reading and scanning the display data.
+        statistics_cache = typing.cast(DisplayStatisticsCache | None, self._get_parameter("statistics_cache"))
+        if statistics_cache:
+            cached_data_range = statistics_cache.get_value("data_range")
+            if cached_data_range is not None:
+                self.set_result("data_range", tuple(cached_data_range))
+                return
         data_metadata = typing.cast(DataAndMetadata.DataMetadata | None, self._get_parameter("data_metadata"))
+        data_range_state = typing.cast(DataRangeState | None, self._get_parameter("data_range_state"))
         display_data_and_metadata = self._get_data_and_metadata_like("display_data")
         display_data = display_data_and_metadata.data if display_data_and_metadata else None
         data_range: typing.Optional[typing.Tuple[float, float]]
@@ -555,10 +738,19 @@ class DataRangeProcessor(ProcessorBase):
             data_dtype = data_metadata.data_dtype
             if Image.is_shape_and_dtype_rgb_type(data_shape, data_dtype):
                 data_range = (0, 255)
-            elif Image.is_shape_and_dtype_complex_type(data_shape, data_dtype):
-                data_range = (numpy.amin(display_data), numpy.amax(display_data))
             else:
-                data_range = (numpy.amin(display_data), numpy.amax(display_data))
+                # partial updates of the data only scan the updated slices, if the previous extent is known.
+                previous_extent = data_range_state.get_previous_extent(display_data.shape) if data_range_state else None
+                extent = _update_data_extent(display_data, *previous_extent) if previous_extent else None
+                if extent is None and previous_extent:
+                    # the data is being updated partially. find the indexes of the minimum and maximum so that the next
+                    # partial updates only scan the updated slices.
+                    extent = _calculate_data_extent(display_data)
+                elif extent is None:
+                    extent = (numpy.amin(display_data), numpy.amax(display_data), None, None)
+                if data_range_state:
+                    data_range_state.set_extent(self._get_int("data_generation"), display_data.shape, extent)
+                data_range = (extent[0], extent[1])
         else:
             data_range = None
         if data_range is not None:
@@ -569,9 +761,358 @@ class DataRangeProcessor(ProcessorBase):
                 data_range = (int(data_range[0]), data_range[1])
             if numpy.issubdtype(type(data_range[1]), numpy.bool_):
                 data_range = (data_range[0], int(data_range[1]))
+            if statistics_cache:
+                statistics_cache.set_value("data_range", data_range)
         self.set_result("data_range", data_range)
 
 
+# display data at least this large in either dimension gets a pyramid of decimated levels.
+_g_display_data_pyramid_minimum_size = 2048
+
+# levels are decimated until they would be smaller than this in both dimensions.
+_display_data_pyramid_level_minimum_size = 256
+
+
+def _decimate_data(data: _ImageDataType) -> _ImageDataType:
+    """Return the 2D data reduced by two in each dimension by averaging blocks of 2x2 pixels.
+
+    A trailing odd row or column is averaged over the pixels it has.
+    """
+    height, width = data.shape
+    dtype = numpy.result_type(data.dtype, numpy.float32)
+    row_starts = numpy.arange(0, height, 2)
+    column_starts = numpy.arange(0, width, 2)
+    decimated_data = numpy.add.reduceat(numpy.add.reduceat(data, row_starts, axis=0, dtype=dtype), column_starts, axis=1)
+    decimated_data /= numpy.multiply.outer(numpy.minimum(height - row_starts, 2), numpy.minimum(width - column_starts, 2)).astype(dtype)
+    return decimated_data
+
+
+class DisplayDataPyramid:
+    """Holds the display data of a display data channel decimated by powers of two.
+
+    Used when the display data is the 2D data of the data item itself, so that large data shown at a reduced scale
+    only needs to be processed at about the size of the screen. Level 0 is the display data; level n is decimated by
+    2**n. Levels are built on a thread and the level ready event fires when they are available. Partial updates of the
+    data only update the affected regions of each level.
+    """
+    _executor = concurrent.futures.ThreadPoolExecutor()
+
+    def __init__(self, data_item: DataItem.DataItem) -> None:
+        self.__data_item_ref = weakref.ref(data_item)
+        self.__lock = threading.RLock()
+        self.__closed = False
+        self.__data_generation = 0
+        self.__data_shape: typing.Optional[DataAndMetadata.ShapeType] = None
+        self.__data_dtype: typing.Optional[numpy.dtype[typing.Any]] = None
+        self.__levels: typing.List[_ImageDataType] = list()
+        self.__build_future: typing.Optional[concurrent.futures.Future[typing.Any]] = None
+        self.__build_data_generation = 0
+        self.level_ready_event = Event.Event()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__closed = True
+            if self.__build_future:
+                self.__build_future.cancel()
+                self.__build_future = None
+            self.__levels = list()
+
+    @property
+    def data_item(self) -> typing.Optional[DataItem.DataItem]:
+        return self.__data_item_ref()
+
+    @staticmethod
+    def get_level_count(data_shape: DataAndMetadata.ShapeType) -> int:
+        """Return the number of decimated levels for display data with the shape, not counting level 0."""
+        if len(data_shape) != 2 or max(data_shape) < _g_display_data_pyramid_minimum_size:
+            return 0
+        level_count = 0
+        while max(data_shape) >> (level_count + 1) >= _display_data_pyramid_level_minimum_size:
+            level_count += 1
+        return level_count
+
+    @staticmethod
+    def get_level(data_shape: DataAndMetadata.ShapeType, screen_pixel_per_image_pixel: float) -> int:
+        """Return the coarsest level with at least one pixel per screen pixel when displayed at the scale."""
+        if not 0.0 < screen_pixel_per_image_pixel < 1.0:
+            return 0
+        return min(int(math.floor(math.log2(1.0 / screen_pixel_per_image_pixel))), DisplayDataPyramid.get_level_count(data_shape))
+
+    def get_level_data(self, display_data_and_metadata: DataAndMetadata.DataAndMetadata, data_generation: int, level: int) -> typing.Optional[_ImageDataType]:
+        """Return the display data decimated to the level, or None if the level is not available yet.
+
+        If the levels are not available for the data generation, they are updated from the partial updates since
+        the last data generation, if known, or else built on a thread.
+        """
+        if level <= 0:
+            return display_data_and_metadata.data
+        with self.__lock:
+            if self.__closed:
+                return None
+            data_shape = display_data_and_metadata.data_shape
+            data_dtype = display_data_and_metadata.data_dtype
+            if self.__levels and self.__data_shape == data_shape and self.__data_dtype == data_dtype:
+                if data_generation > self.__data_generation:
+                    data_item = self.__data_item_ref()
+                    updated_slices = data_item._get_data_updated_slices(self.__data_generation) if data_item else None
+                    if updated_slices is not None and self.__update_levels(numpy.asarray(display_data_and_metadata.data), updated_slices):
+                        self.__data_generation = data_generation
+                if data_generation <= self.__data_generation:
+                    return self.__levels[min(level, len(self.__levels)) - 1]
+            if not self.__build_future or self.__build_future.done() or self.__build_data_generation != data_generation:
+                if self.__build_future:
+                    self.__build_future.cancel()
+                self.__build_data_generation = data_generation
+                self.__build_future = self._executor.submit(self.__build_levels, numpy.asarray(display_data_and_metadata.data), data_generation)
+            return None
+
+    def __build_levels(self, data: _ImageDataType, data_generation: int) -> None:
+        levels = list()
+        level_data = data
+        for _ in range(self.get_level_count(data.shape)):
+            if self.__closed:
+                return
+            level_data = _decimate_data(level_data)
+            levels.append(level_data)
+        with self.__lock:
+            if self.__closed or (self.__levels and self.__data_shape == data.shape and data_generation < self.__data_generation):
+                return
+            self.__data_generation = data_generation
+            self.__data_shape = data.shape
+            self.__data_dtype = data.dtype
+            self.__levels = levels
+        self.level_ready_event.fire()
+
+    def __update_levels(self, data: _ImageDataType, updated_slices: typing.Sequence[typing.Tuple[slice, ...]]) -> bool:
+        # returns False if the updated slices cannot be mapped to regions of the levels.
+        regions = list()
+        for updated_slice in updated_slices:
+            if len(updated_slice) > 2:
+                return False
+            updated_slice = tuple(updated_slice) + (slice(None),) * (2 - len(updated_slice))
+            if not all(isinstance(s, slice) for s in updated_slice):
+                return False
+            ranges = [range(*s.indices(n)) for s, n in zip(updated_slice, data.shape)]
+            if any(r.step != 1 for r in ranges):
+                return False
+            regions.append([(r.start, r.stop) for r in ranges])
+        source_data = data
+        for level_data in self.__levels:
+            regions = [[(start // 2, (stop + 1) // 2) for start, stop in region] for region in regions]
+            for (top, bottom), (left, right) in regions:
+                if bottom > top and right > left:
+                    level_data[top:bottom, left:right] = _decimate_data(source_data[top * 2:bottom * 2, left * 2:right * 2])
+            source_data = level_data
+        return True
+
+
+# the size of the tiles rendered when only part of large display data is visible.
+_display_tile_size = 256
+
+# the maximum number of tiles kept by each display tile cache.
+_g_display_tile_cache_count = 256
+
+
+class DisplayTileCache:
+    """Caches RGBA tiles of the display data of a display data channel.
+
+    Used when only part of large 2D data is visible, e.g. when zoomed in, so that only the visible tiles are rendered.
+    Tiles are keyed by the data generation, the display parameters, the pyramid level and the tile index, so that
+    panning reuses the tiles rendered earlier.
+    """
+
+    def __init__(self, data_item: DataItem.DataItem) -> None:
+        self.__data_item_ref = weakref.ref(data_item)
+        self.__lock = threading.RLock()
+        self.__tiles: collections.OrderedDict[typing.Any, _RGBA32Type] = collections.OrderedDict()
+        self.__lookup_table: typing.Optional[typing.Tuple[typing.Any, _ImageDataType]] = None
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__tiles.clear()
+            self.__lookup_table = None
+
+    @property
+    def data_item(self) -> typing.Optional[DataItem.DataItem]:
+        return self.__data_item_ref()
+
+    @property
+    def _tile_count(self) -> int:
+        return len(self.__tiles)
+
+    def get_tile_indexes(self, display_data_info: DisplayDataInfo, visible_rect: Geometry.FloatRect) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+        """Return the indexes of the tiles of the display data intersecting the visible rect.
+
+        The visible rect is in coordinates normalized to the display data. Returns None if the display data cannot be
+        rendered in tiles, i.e. when an adjustment depends on all of the display data.
+        """
+        display_data_and_metadata = display_data_info.display_data_and_metadata
+        if not display_data_and_metadata or len(display_data_and_metadata.data_shape) != 2:
+            return None
+        if any(adjustment_d.get("type", None) == "equalized" for adjustment_d in display_data_info.adjustments):
+            return None
+        height, width = display_data_and_metadata.data_shape
+        top = max(int(math.floor(visible_rect.top * height)), 0) // _display_tile_size
+        left = max(int(math.floor(visible_rect.left * width)), 0) // _display_tile_size
+        bottom = (min(int(math.ceil(visible_rect.bottom * height)), height) + _display_tile_size - 1) // _display_tile_size
+        right = (min(int(math.ceil(visible_rect.right * width)), width) + _display_tile_size - 1) // _display_tile_size
+        return [(row, column) for row in range(top, bottom) for column in range(left, right)]
+
+    @staticmethod
+    def get_tile_rect(data_shape: DataAndMetadata.ShapeType, tile_index: typing.Tuple[int, int]) -> Geometry.IntRect:
+        """Return the rect of the tile in the display data, clipped to the display data."""
+        top = tile_index[0] * _display_tile_size
+        left = tile_index[1] * _display_tile_size
+        return Geometry.IntRect.from_tlbr(top, left, min(top + _display_tile_size, data_shape[0]), min(left + _display_tile_size, data_shape[1]))
+
+    def get_tile_rgba(self, display_data_info: DisplayDataInfo, level: int, tile_index: typing.Tuple[int, int]) -> typing.Optional[_RGBA32Type]:
+        """Return the RGBA tile of the display data, rendering it if it is not cached.
+
+        The display data info holds the display data at the pyramid level.
+        """
+        display_data_and_metadata = display_data_info.display_data_and_metadata
+        if not display_data_and_metadata:
+            return None
+        color_map_data = display_data_info.color_map_data
+        adjustments = tuple(tuple(sorted(adjustment_d.items())) for adjustment_d in display_data_info.adjustments)
+        key = (display_data_info.data_generation, display_data_and_metadata.data_shape, display_data_info.display_range,
+               display_data_info.brightness, display_data_info.contrast, adjustments,
+               color_map_data.tobytes() if color_map_data is not None else None, level, tile_index)
+        with self.__lock:
+            tile_rgba = self.__tiles.get(key)
+            if tile_rgba is not None:
+                self.__tiles.move_to_end(key)
+                return tile_rgba
+        tile_rect = self.get_tile_rect(display_data_and_metadata.data_shape, tile_index)
+        tile_data = display_data_and_metadata.data[tile_rect.top:tile_rect.bottom, tile_rect.left:tile_rect.right]
+        if _is_lookup_table_display_data(display_data_info):
+            # the lookup table is shared by all tiles with the same display parameters.
+            lookup_table_key = (display_data_and_metadata.data_dtype,) + key[2:-2]
+            with self.__lock:
+                lookup_table = self.__lookup_table[1] if self.__lookup_table and self.__lookup_table[0] == lookup_table_key else None
+            if lookup_table is None:
+                lookup_table = _get_lookup_table(display_data_info, color_map_data, display_data_info.brightness, display_data_info.contrast, display_data_info.adjustments)
+                if lookup_table is not None:
+                    with self.__lock:
+                        self.__lookup_table = lookup_table_key, lookup_table
+            tile_rgba = _take_lookup_table(lookup_table, numpy.asarray(tile_data)) if lookup_table is not None else None
+        else:
+            tile_rgba = display_data_info._replace_display_data(tile_data).derived_display_values.display_rgba
+        if tile_rgba is not None:
+            with self.__lock:
+                self.__tiles[key] = tile_rgba
+                while len(self.__tiles) > _g_display_tile_cache_count:
+                    self.__tiles.popitem(last=False)
+        return tile_rgba
+
+
+# the number of buffers of each name, shape and dtype kept by a display buffer pool. two buffers let the display hold
+# on to the arrays of the last frame while the next frame is calculated.
+_display_buffer_pool_buffer_count = 2
+
+# the maximum number of buffer names, shapes and dtypes kept by a display buffer pool.
+_display_buffer_pool_key_count = 16
+
+
+def _get_buffer_refcount(buffers: typing.List[_ImageDataType], index: int) -> int:
+    return sys.getrefcount(buffers[index])
+
+
+# the reference count of a buffer referenced only by its pool, measured the same way as for the buffers of a pool.
+_free_buffer_refcount = _get_buffer_refcount([numpy.empty(0)], 0)
+
+
+class DisplayBufferPool:
+    """Reuses the arrays calculated for the display of a display data channel from one frame to the next.
+
+    A buffer is handed out again only when the pool holds the only reference to it, so arrays still used elsewhere,
+    such as the bitmap of the last frame or a view of it, are never overwritten.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.RLock()
+        self.__buffers: collections.OrderedDict[typing.Tuple[str, typing.Tuple[int, ...], numpy.dtype[typing.Any]], typing.List[_ImageDataType]] = collections.OrderedDict()
+        self._request_count = 0
+        self._allocation_count = 0
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__buffers.clear()
+
+    def get_buffer(self, name: str, shape: typing.Tuple[int, ...], dtype: numpy.typing.DTypeLike) -> _ImageDataType:
+        """Return an uninitialized array of the shape and dtype, reusing an array of an earlier frame if possible."""
+        key = (name, tuple(shape), numpy.dtype(dtype))
+        with self.__lock:
+            self._request_count += 1
+            buffers = self.__buffers.setdefault(key, list())
+            self.__buffers.move_to_end(key)
+            for index in range(len(buffers)):
+                if _get_buffer_refcount(buffers, index) == _free_buffer_refcount:
+                    return buffers[index]
+            self._allocation_count += 1
+            buffer: _ImageDataType = numpy.empty(key[1], key[2])
+            if len(buffers) < _display_buffer_pool_buffer_count:
+                buffers.append(buffer)
+            while len(self.__buffers) > _display_buffer_pool_key_count:
+                self.__buffers.popitem(last=False)
+            return buffer
+
+
+def _get_display_buffer(display_buffer_pool: typing.Optional[DisplayBufferPool], name: str, shape: typing.Tuple[int, ...], dtype: numpy.typing.DTypeLike) -> _ImageDataType:
+    return display_buffer_pool.get_buffer(name, shape, dtype) if display_buffer_pool else numpy.empty(shape, dtype)
+
+
+def _get_display_values_dtype(display_buffer_pool: typing.Optional[DisplayBufferPool]) -> numpy.typing.DTypeLike:
+    # the normalized, adjusted and transformed data calculated for the display, into buffers from the pool, is float32.
+    # calculated without a pool, for instance for computations, it keeps the float64 precision.
+    return numpy.float32 if display_buffer_pool else numpy.float64
+
+
+# the number of values taken from a table at once. numpy.take converts all of its indexes to intp, so taking them in
+# blocks bounds the size of that conversion.
+_take_block_size = 64 * 1024
+
+
+def _take_rows(table: _ImageDataType, indexes: _ImageDataType, out: _ImageDataType) -> _ImageDataType:
+    # take the values of a table at 2d indexes into out, in blocks of rows. the indexes are always within the table.
+    row_count = max(_take_block_size // max(indexes.shape[-1], 1), 1)
+    for row in range(0, indexes.shape[0], row_count):
+        numpy.take(table, indexes[row:row + row_count], out=out[row:row + row_count], mode="clip")
+    return out
+
+
+def _make_rgba_table(color_map_data: typing.Optional[_ImageDataType]) -> _RGBA32Type:
+    # make a table of 256 rgba values from the rgb color map or grayscale, packed as they are in rgba display data.
+    rgba_table = numpy.empty((256, 4), numpy.uint8)
+    rgba_table[..., 0:3] = color_map_data if color_map_data is not None else numpy.arange(256, dtype=numpy.uint8)[..., numpy.newaxis]
+    rgba_table[..., 3] = 255
+    return typing.cast(_RGBA32Type, rgba_table.view(numpy.uint32).reshape(256))
+
+
+_grayscale_rgba_table = _make_rgba_table(None)
+
+
+def _calculate_display_rgba(data: _ImageDataType, display_range: typing.Tuple[float, float], color_map_data: typing.Optional[_ImageDataType],
+                            display_buffer_pool: typing.Optional[DisplayBufferPool]) -> _RGBA32Type:
+    # map 2d scalar data to rgba the same way as Image.create_rgba_image_from_array, but in float32 and into buffers
+    # from the pool. the display range is subtracted before converting to float32 so that no precision is lost when
+    # the display range is narrow relative to the data values.
+    display_limit_low, display_limit_high = display_range
+    m = 255.0 / (display_limit_high - display_limit_low) if display_limit_high != display_limit_low else 1.0
+    scaled_data = _get_display_buffer(display_buffer_pool, "display_rgba_scaled", data.shape, numpy.float32)
+    numpy.subtract(data, display_limit_low, out=scaled_data)
+    numpy.multiply(scaled_data, m, out=scaled_data)
+    numpy.clip(scaled_data, 0.0, 255.0, out=scaled_data)
+    indexes = _get_display_buffer(display_buffer_pool, "display_rgba_indexes", data.shape, numpy.uint8)
+    with warnings.catch_warnings():
+        # scaled data may have NaNs; ignore the warnings, they get treated as zero.
+        warnings.simplefilter("ignore")
+        numpy.copyto(indexes, scaled_data, casting="unsafe")
+    rgba_table = _make_rgba_table(color_map_data) if color_map_data is not None else _grayscale_rgba_table
+    display_rgba = _get_display_buffer(display_buffer_pool, "display_rgba", data.shape, numpy.uint32)
+    return _take_rows(rgba_table, indexes, display_rgba)
+
+
 class DisplayRangeProcessor(ProcessorBase):
     def __init__(self, *,
                  element_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
@@ -600,39 +1141,49 @@ class DisplayRGBProcessor(ProcessorBase):
                  adjusted_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
                  data_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None,
                  display_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None,
-                 color_map_data: typing.Union[typing.Optional[_ImageDataType], ProcessorConnection] = None) -> None:
-        super().__init__(adjusted_data=adjusted_data, data_range=data_range, display_range=display_range, color_map_data=color_map_data)
+                 color_map_data: typing.Union[typing.Optional[_ImageDataType], ProcessorConnection] = None,
+                 display_buffer_pool: typing.Union[typing.Optional[DisplayBufferPool], ProcessorConnection] = None) -> None:
+        super().__init__(adjusted_data=adjusted_data, data_range=data_range, display_range=display_range, color_map_data=color_map_data, display_buffer_pool=display_buffer_pool)
 
     def _execute(self) -> None:
         adjusted_data_and_metadata = self._get_data_and_metadata_like("adjusted_data")
         data_range = typing.cast(typing.Optional[typing.Tuple[float, float]], self._get_parameter("data_range"))
         display_range = typing.cast(typing.Optional[typing.Tuple[float, float]], self._get_parameter("display_range"))
         color_map_data = typing.cast(typing.Optional[_ImageDataType], self._get_parameter("color_map_data"))
+        display_buffer_pool = typing.cast(typing.Optional[DisplayBufferPool], self._get_parameter("display_buffer_pool"))
         display_rgba_data: typing.Optional[_ImageDataType] = None
         if adjusted_data_and_metadata:
             if data_range is not None:  # workaround until validating and retrieving data stats is an atomic operation
                 # display_range is just display_limits but calculated if display_limits is None
-                display_rgba = Core.function_display_rgba(adjusted_data_and_metadata, display_range, color_map_data)
-                display_rgba_data = display_rgba.data if display_rgba else None
+                if len(adjusted_data_and_metadata.data_shape) == 2 and not adjusted_data_and_metadata.is_data_rgb_type and display_range is not None:
+                    display_rgba_data = _calculate_display_rgba(numpy.asarray(adjusted_data_and_metadata.data), display_range, color_map_data, display_buffer_pool)
+                else:
+                    display_rgba = Core.function_display_rgba(adjusted_data_and_metadata, display_range, color_map_data)
+                    display_rgba_data = display_rgba.data if display_rgba else None
         self.set_result("display_rgba", display_rgba_data)
 
 
 class NormalizedDataProcessor(ProcessorBase):
     def __init__(self, *,
                  display_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
-                 display_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None) -> None:
-        super().__init__(display_data=display_data, display_range=display_range)
+                 display_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None,
+                 display_buffer_pool: typing.Union[typing.Optional[DisplayBufferPool], ProcessorConnection] = None) -> None:
+        super().__init__(display_data=display_data, display_range=display_range, display_buffer_pool=display_buffer_pool)
 
     def _execute(self) -> None:
         display_data_and_metadata = self._get_data_and_metadata_like("display_data")
         display_range = typing.cast(typing.Optional[typing.Tuple[float, float]], self._get_parameter("display_range"))
+        display_buffer_pool = typing.cast(typing.Optional[DisplayBufferPool], self._get_parameter("display_buffer_pool"))
         data_and_metadata: typing.Optional[DataAndMetadata.DataAndMetadata] = None
         if display_range is not None and display_data_and_metadata:
             display_limit_low, display_limit_high = display_range
-            # normalize the data to [0, 1].
+            # normalize the data to [0, 1]. the display range is subtracted in the precision of the data.
             m = 1 / (display_limit_high - display_limit_low) if display_limit_high != display_limit_low else 0.0
-            b = -display_limit_low
-            data_and_metadata = DataAndMetadata.new_data_and_metadata(data=float(m) * (display_data_and_metadata.data + float(b)),
+            display_data = numpy.asarray(display_data_and_metadata.data)
+            normalized_data = _get_display_buffer(display_buffer_pool, "normalized", display_data.shape, _get_display_values_dtype(display_buffer_pool))
+            numpy.subtract(display_data, float(display_limit_low), out=normalized_data)
+            numpy.multiply(normalized_data, float(m), out=normalized_data)
+            data_and_metadata = DataAndMetadata.new_data_and_metadata(data=normalized_data,
                                                                       dimensional_calibrations=display_data_and_metadata.dimensional_calibrations,
                                                                       timestamp=display_data_and_metadata.timestamp,
                                                                       timezone=display_data_and_metadata.timezone,
@@ -645,13 +1196,15 @@ class AdjustedDataProcessor(ProcessorBase):
                  normalized_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
                  display_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
                  display_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None,
-                 adjustments: typing.Union[typing.Optional[typing.Sequence[Persistence.PersistentDictType]], ProcessorConnection] = None) -> None:
-        super().__init__(normalized_data=normalized_data, display_data=display_data, display_range=display_range, adjustments=adjustments)
+                 adjustments: typing.Union[typing.Optional[typing.Sequence[Persistence.PersistentDictType]], ProcessorConnection] = None,
+                 display_buffer_pool: typing.Union[typing.Optional[DisplayBufferPool], ProcessorConnection] = None) -> None:
+        super().__init__(normalized_data=normalized_data, display_data=display_data, display_range=display_range, adjustments=adjustments, display_buffer_pool=display_buffer_pool)
 
     def _execute(self) -> None:
         display_data_and_metadata = self._get_data_and_metadata_like("display_data")
         display_range = typing.cast(typing.Optional[typing.Tuple[float, float]], self._get_parameter("display_range"))
         adjustments = typing.cast(typing.Optional[typing.Sequence[Persistence.PersistentDictType]], self._get_parameter("adjustments"))
+        display_buffer_pool = typing.cast(typing.Optional[DisplayBufferPool], self._get_parameter("display_buffer_pool"))
         adjusted_data_and_metadata: typing.Optional[DataAndMetadata.DataAndMetadata] = display_data_and_metadata
         if adjustments:
             # only request normalized data and metadata if required
@@ -664,8 +1217,10 @@ class AdjustedDataProcessor(ProcessorBase):
                     if adjusted_data_and_metadata and display_range is not None:
                         display_data = adjusted_data_and_metadata.data
                         if display_data is not None:
+                            # the adjustments are applied one after another to the same buffer.
+                            adjusted_data = _get_display_buffer(display_buffer_pool, "adjusted", display_data.shape, _get_display_values_dtype(display_buffer_pool))
                             adjusted_data_and_metadata = DataAndMetadata.new_data_and_metadata(
-                                adjustment.transform(display_data, display_range),
+                                adjustment.transform(display_data, display_range, out=adjusted_data),
                                 dimensional_calibrations=adjusted_data_and_metadata.dimensional_calibrations,
                                 timestamp=adjusted_data_and_metadata.timestamp,
                                 timezone=adjusted_data_and_metadata.timezone,
@@ -715,18 +1270,101 @@ class TransformedDisplayRangeProcessor(ProcessorBase):
 class TransformedDataProcessor(ProcessorBase):
     def __init__(self, *,
                  adjusted_data: typing.Union[typing.Optional[DataAndMetadata._DataAndMetadataLike], ProcessorConnection] = None,
-                 transformed_display_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None) -> None:
-        super().__init__(adjusted_data=adjusted_data, transformed_display_range=transformed_display_range)
+                 transformed_display_range: typing.Union[typing.Optional[typing.Tuple[float, float]], ProcessorConnection] = None,
+                 display_buffer_pool: typing.Union[typing.Optional[DisplayBufferPool], ProcessorConnection] = None) -> None:
+        super().__init__(adjusted_data=adjusted_data, transformed_display_range=transformed_display_range, display_buffer_pool=display_buffer_pool)
 
     def _execute(self) -> None:
         adjusted_data_and_metadata = self._get_data_and_metadata_like("adjusted_data")
         transformed_display_range = typing.cast(typing.Optional[typing.Tuple[float, float]], self._get_parameter("transformed_display_range"))
+        display_buffer_pool = typing.cast(typing.Optional[DisplayBufferPool], self._get_parameter("display_buffer_pool"))
         transformed_data_and_metadata: typing.Optional[DataAndMetadata.DataAndMetadata] = None
-        if adjusted_data_and_metadata:
-            transformed_data_and_metadata = Core.function_rescale(adjusted_data_and_metadata, data_range=(0.0, 1.0), in_range=transformed_display_range)
+        if adjusted_data_and_metadata and transformed_display_range is not None:
+            # rescale the transformed display range to [0, 1], equivalent to Core.function_rescale.
+            display_limit_low, display_limit_high = transformed_display_range
+            m = 1.0 / (display_limit_high - display_limit_low) if display_limit_high != display_limit_low else 1.0
+            adjusted_data = numpy.asarray(adjusted_data_and_metadata.data)
+            transformed_data = _get_display_buffer(display_buffer_pool, "transformed", adjusted_data.shape, _get_display_values_dtype(display_buffer_pool))
+            numpy.subtract(adjusted_data, float(display_limit_low), out=transformed_data)
+            numpy.multiply(transformed_data, float(m), out=transformed_data)
+            transformed_data_and_metadata = DataAndMetadata.new_data_and_metadata(data=transformed_data,
+                                                                                  intensity_calibration=Calibration.Calibration(),
+                                                                                  dimensional_calibrations=adjusted_data_and_metadata.dimensional_calibrations,
+                                                                                  timestamp=adjusted_data_and_metadata.timestamp,
+                                                                                  timezone=adjusted_data_and_metadata.timezone,
+                                                                                  timezone_offset=adjusted_data_and_metadata.timezone_offset)
         self.set_result("data", transformed_data_and_metadata)
 
 
+# integer display data of these types is mapped to RGBA through a lookup table covering all of its values. the lookup
+# table is indexed by the unsigned type of the same size.
+_lookup_table_index_dtypes: typing.Dict[numpy.dtype[typing.Any], numpy.dtype[typing.Any]] = {
+    numpy.dtype(numpy.uint8): numpy.dtype(numpy.uint8),
+    numpy.dtype(numpy.uint16): numpy.dtype(numpy.uint16),
+    numpy.dtype(numpy.int16): numpy.dtype(numpy.uint16),
+}
+
+
+def _is_lookup_table_display_data(display_data_info: typing.Optional[DisplayDataInfo]) -> bool:
+    # the adjustments must map each value independently of the others, which equalization does not.
+    display_data_and_metadata = display_data_info.display_data_and_metadata if display_data_info else None
+    if not display_data_info or not display_data_and_metadata or len(display_data_and_metadata.data_shape) != 2:
+        return False
+    if display_data_and_metadata.data_dtype not in _lookup_table_index_dtypes:
+        return False
+    return not any(adjustment_d.get("type", None) == "equalized" for adjustment_d in display_data_info.adjustments)
+
+
+def _get_lookup_table(display_data_info: DisplayDataInfo, color_map_data: typing.Optional[_RGBA32Type], brightness: float,
+                      contrast: float, adjustments: typing.Sequence[Persistence.PersistentDictType]) -> typing.Optional[_ImageDataType]:
+    # the lookup table is the display of all possible values of the display data, indexed by their unsigned view. the
+    # values are converted to float so that they are displayed the same way as the data, without using a lookup table.
+    display_data_and_metadata = display_data_info.display_data_and_metadata
+    assert display_data_and_metadata
+    data_dtype = numpy.dtype(display_data_and_metadata.data_dtype)
+    index_dtype = _lookup_table_index_dtypes[data_dtype]
+    values = numpy.arange(1 << (8 * index_dtype.itemsize), dtype=index_dtype).view(data_dtype).astype(numpy.float64)
+    lookup_table = DerivedDisplayValues(display_data_info._replace_display_data(values.reshape(1, -1)), color_map_data, brightness, contrast, adjustments).display_rgba
+    return lookup_table.reshape(-1) if lookup_table is not None else None
+
+
+def _take_lookup_table(lookup_table: _ImageDataType, data: _ImageDataType, out: typing.Optional[_ImageDataType] = None) -> _ImageDataType:
+    out = out if out is not None else numpy.empty(data.shape, lookup_table.dtype)
+    return _take_rows(lookup_table, data.view(_lookup_table_index_dtypes[data.dtype]), out)
+
+
+class LookupTableRGBProcessor(ProcessorBase):
+    """Map integer display data to RGBA with a lookup table.
+
+    The lookup table combines the display range, adjustments, brightness, contrast and color map exactly as the display
+    of the data itself would.
+    """
+
+    def __init__(self, *,
+                 display_data_info: typing.Union[typing.Optional[DisplayDataInfo], ProcessorConnection] = None,
+                 color_map_data: typing.Union[typing.Optional[_RGBA32Type], ProcessorConnection] = None,
+                 brightness: typing.Union[typing.Optional[float], ProcessorConnection] = None,
+                 contrast: typing.Union[typing.Optional[float], ProcessorConnection] = None,
+                 adjustments: typing.Union[typing.Optional[typing.Sequence[Persistence.PersistentDictType]], ProcessorConnection] = None,
+                 display_buffer_pool: typing.Union[typing.Optional[DisplayBufferPool], ProcessorConnection] = None) -> None:
+        super().__init__(display_data_info=display_data_info, color_map_data=color_map_data, brightness=brightness, contrast=contrast, adjustments=adjustments, display_buffer_pool=display_buffer_pool)
+
+    def _execute(self) -> None:
+        display_data_info = typing.cast(typing.Optional[DisplayDataInfo], self._get_parameter("display_data_info"))
+        display_data_and_metadata = display_data_info.display_data_and_metadata if display_data_info else None
+        display_rgba_data: typing.Optional[_ImageDataType] = None
+        if display_data_info and display_data_and_metadata:
+            lookup_table = _get_lookup_table(display_data_info,
+                                             typing.cast(typing.Optional[_RGBA32Type], self._get_parameter("color_map_data")),
+                                             self._get_float("brightness"), self._get_float("contrast"),
+                                             typing.cast(typing.Sequence[Persistence.PersistentDictType], self._get_parameter("adjustments") or list()))
+            if lookup_table is not None:
+                display_data = numpy.asarray(display_data_and_metadata.data)
+                display_rgba = _get_display_buffer(typing.cast(typing.Optional[DisplayBufferPool], self._get_parameter("display_buffer_pool")), "display_rgba", display_data.shape, numpy.uint32)
+                display_rgba_data = _take_lookup_table(lookup_table, display_data, out=display_rgba)
+        self.set_result("display_rgba", display_rgba_data)
+
+
 class DisplayValues:
     """Calculates element, display data, range, display range, all used to render the display."""
 
@@ -736,10 +1374,20 @@ class DisplayValues:
                  collection_index: DataAndMetadata.PositionType | None, slice_center: int, slice_width: int,
                  display_limits: DisplayLimitsType, complex_display_type: str | None,
                  color_map_data: _RGBA32Type | None, brightness: float, contrast: float,
-                 adjustments: typing.Sequence[Persistence.PersistentDictType]) -> None:
+                 adjustments: typing.Sequence[Persistence.PersistentDictType],
+                 statistics_cache: DisplayStatisticsCache | None = None,
+                 data_range_state: DataRangeState | None = None, data_generation: int = 0,
+                 display_data_pyramid: DisplayDataPyramid | None = None,
+                 display_tile_cache: DisplayTileCache | None = None,
+                 display_buffer_pool: DisplayBufferPool | None = None) -> None:
         DisplayValues._count += 1
 
         self.__data_and_metadata = data_and_metadata
+        self.__statistics_cache = statistics_cache
+        self.__data_generation = data_generation
+        self.__display_data_pyramid = display_data_pyramid
+        self.__display_tile_cache = display_tile_cache
+        self.__display_buffer_pool = display_buffer_pool
 
         data_metadata = data_and_metadata.data_metadata if data_and_metadata else None
 
@@ -756,6 +1404,9 @@ class DisplayValues:
         self.__data_range_processor = DataRangeProcessor(
             data_metadata=data_metadata,
             display_data=ProcessorConnection(self.__display_data_processor, "data", "display_data"),
+            statistics_cache=statistics_cache,
+            data_range_state=data_range_state,
+            data_generation=data_generation,
         )
 
         self.__display_range_processor = DisplayRangeProcessor(
@@ -798,6 +1449,22 @@ class DisplayValues:
     def data_range(self) -> tuple[float, float] | None:
         return typing.cast(tuple[float, float] | None, self.__data_range_processor.get_result("data_range"))
 
+    @property
+    def statistics_cache(self) -> DisplayStatisticsCache | None:
+        return self.__statistics_cache
+
+    @property
+    def display_data_pyramid(self) -> DisplayDataPyramid | None:
+        return self.__display_data_pyramid
+
+    @property
+    def display_tile_cache(self) -> DisplayTileCache | None:
+        return self.__display_tile_cache
+
+    @property
+    def display_buffer_pool(self) -> DisplayBufferPool | None:
+        return self.__display_buffer_pool
+
     @property
     def display_range(self) -> tuple[float, float] | None:
         return typing.cast(tuple[float, float] | None, self.__display_range_processor.get_result("display_range"))
@@ -825,7 +1492,12 @@ class DisplayValues:
             self.color_map_data,
             self.brightness,
             self.contrast,
-            self.adjustments
+            self.adjustments,
+            self.statistics_cache,
+            self.display_data_pyramid,
+            self.__data_generation,
+            self.display_tile_cache,
+            self.display_buffer_pool
         )
 
 
@@ -844,6 +1516,15 @@ class DisplayDataInfo:
     brightness: float
     contrast: float
     adjustments: typing.Sequence[Persistence.PersistentDictType]
+    # for reusing statistics of the display data from earlier sessions; not part of the comparison
+    statistics_cache: DisplayStatisticsCache | None = None
+    # for displaying the display data at a reduced scale; not part of the comparison
+    display_data_pyramid: DisplayDataPyramid | None = None
+    data_generation: int = 0
+    # for rendering the visible tiles of the display data; not part of the comparison
+    display_tile_cache: DisplayTileCache | None = None
+    # for reusing the arrays calculated for the display from frame to frame; not part of the comparison
+    display_buffer_pool: DisplayBufferPool | None = None
 
     def __eq__(self, other: typing.Any) -> bool:
         if not isinstance(other, DisplayDataInfo):
@@ -867,6 +1548,33 @@ class DisplayDataInfo:
     def derived_display_values(self) -> DerivedDisplayValues:
         return DerivedDisplayValues(self, self.color_map_data, self.brightness, self.contrast, self.adjustments)
 
+    def get_level_display_data_info(self, level: int) -> DisplayDataInfo | None:
+        """Return the display data info with the display data decimated to the pyramid level.
+
+        Returns None if the level is not available yet. The data range is the one of the full display data so that the
+        display looks the same at each level.
+        """
+        display_data_and_metadata = self.display_data_and_metadata
+        if level <= 0 or not display_data_and_metadata:
+            return self
+        if not self.display_data_pyramid:
+            return None
+        level_data = self.display_data_pyramid.get_level_data(display_data_and_metadata, self.data_generation, level)
+        if level_data is None:
+            return None
+        return self._replace_display_data(level_data)
+
+    def _replace_display_data(self, data: _ImageDataType) -> DisplayDataInfo:
+        # return a copy with the display data replaced by a reduced or partial version of it, keeping the ranges.
+        display_data_and_metadata = self.display_data_and_metadata
+        assert display_data_and_metadata
+        data_and_metadata = DataAndMetadata.new_data_and_metadata(data=data,
+                                                                  intensity_calibration=display_data_and_metadata.intensity_calibration,
+                                                                  timestamp=display_data_and_metadata.timestamp,
+                                                                  timezone=display_data_and_metadata.timezone,
+                                                                  timezone_offset=display_data_and_metadata.timezone_offset)
+        return dataclasses.replace(self, display_data_and_metadata=data_and_metadata)
+
 
 class DerivedDisplayValues:
     """Calculate derived display values such as normalized data, adjusted data, display rgba, and transformed display range based on the provided display data info."""
@@ -881,9 +1589,12 @@ class DerivedDisplayValues:
         self.__display_data_info = display_data_info
         self.__color_map_data = color_map_data
 
+        display_buffer_pool = display_data_info.display_buffer_pool if display_data_info else None
+
         self.__normalized_data_processor = NormalizedDataProcessor(
             display_data=display_data_info.display_data_and_metadata if display_data_info else None,
             display_range=display_data_info.display_range if display_data_info else None,
+            display_buffer_pool=display_buffer_pool,
         )
 
         self.__adjusted_data_processor = AdjustedDataProcessor(
@@ -891,6 +1602,7 @@ class DerivedDisplayValues:
             display_data=display_data_info.display_data_and_metadata if display_data_info else None,
             display_range=display_data_info.display_range if display_data_info else None,
             adjustments=adjustments,
+            display_buffer_pool=display_buffer_pool,
         )
 
         self.__adjusted_display_range_processor = AdjustedDisplayRangeProcessor(
@@ -908,20 +1620,40 @@ class DerivedDisplayValues:
             adjusted_data=ProcessorConnection(self.__adjusted_data_processor, "data", "adjusted_data"),
             data_range=display_data_info.data_range if display_data_info else None,
             display_range=ProcessorConnection(self.__transformed_display_range_processor, "display_range"),
-            color_map_data=color_map_data
+            color_map_data=color_map_data,
+            display_buffer_pool=display_buffer_pool,
         )
 
         self.__transformed_data_processor = TransformedDataProcessor(
             adjusted_data=ProcessorConnection(self.__adjusted_data_processor, "data", "adjusted_data"),
             transformed_display_range=ProcessorConnection(self.__transformed_display_range_processor, "display_range", "transformed_display_range"),
+            display_buffer_pool=display_buffer_pool,
         )
 
+        # integer display data skips the normalized and adjusted data when mapped to rgba.
+        self.__lookup_table_rgb_processor: typing.Optional[LookupTableRGBProcessor] = None
+        if _is_lookup_table_display_data(display_data_info):
+            self.__lookup_table_rgb_processor = LookupTableRGBProcessor(
+                display_data_info=display_data_info,
+                color_map_data=color_map_data,
+                brightness=brightness,
+                contrast=contrast,
+                adjustments=adjustments,
+                display_buffer_pool=display_buffer_pool,
+            )
+
     @property
     def color_map_data(self) -> typing.Optional[_RGBA32Type]:
         return self.__color_map_data
 
+    @property
+    def uses_lookup_table(self) -> bool:
+        return self.__lookup_table_rgb_processor is not None
+
     @property
     def display_rgba(self) -> typing.Optional[_ImageDataType]:
+        if self.__lookup_table_rgb_processor:
+            return typing.cast(typing.Optional[_ImageDataType], self.__lookup_table_rgb_processor.get_result("display_rgba"))
         return typing.cast(typing.Optional[_ImageDataType], self.__display_rgb_processor.get_result("display_rgba"))
 
     @property
@@ -969,6 +1701,7 @@ class DisplayDataChannel(Persistence.PersistentObject):
         self.__current_data_item: typing.Optional[DataItem.DataItem] = None
         self.__current_data_item_modified_count = 0
         self.__display_ref_count = 0
+        self.__held_data_ref_count = 0
 
         self.__slice_interval: typing.Optional[typing.Tuple[float, float]] = None
 
@@ -998,6 +1731,10 @@ class DisplayDataChannel(Persistence.PersistentObject):
         self.__data_item_description_changed_listener: typing.Optional[Event.EventListener] = None
 
         self.__last_data_item: typing.Optional[DataItem.DataItem] = None
+        self.__data_range_state: typing.Optional[DataRangeState] = None
+        self.__display_data_pyramid: typing.Optional[DisplayDataPyramid] = None
+        self.__display_tile_cache: typing.Optional[DisplayTileCache] = None
+        self.__display_buffer_pool = DisplayBufferPool()
 
         self.__is_data_item_connected = False
 
@@ -1005,8 +1742,9 @@ class DisplayDataChannel(Persistence.PersistentObject):
             data_item = typing.cast(DataItem.DataItem, data_item_)
             self.__disconnect_data_item_events()
             if self.__last_data_item:
-                for _ in range(self.__display_ref_count):
+                for _ in range(self.__held_data_ref_count):
                     self.__last_data_item.decrement_data_ref_count()
+                self.__held_data_ref_count = 0
             self.__connect_data_item_events()
             self.__validate_slice_indexes()
             # tell the data item that this display data channel is referencing it
@@ -1014,8 +1752,7 @@ class DisplayDataChannel(Persistence.PersistentObject):
                 data_item.add_display_data_channel(self)
                 self.__is_data_item_connected = True
             if self.__data_item:
-                for _ in range(self.__display_ref_count):
-                    self.__data_item.increment_data_ref_count()
+                self.__hold_data(self.__display_ref_count)
             self.__last_data_item = self.__data_item
             # until this gets cleaned up, the data_item changed notification needs to go before the proxy changed
             # event. the notification ensures that the 'data_items_model' is updated properly first. when
@@ -1048,6 +1785,13 @@ class DisplayDataChannel(Persistence.PersistentObject):
         # continue close.
         self.__disconnect_data_item_events()
         self.__current_data_item = None
+        if self.__display_data_pyramid:
+            self.__display_data_pyramid.close()
+            self.__display_data_pyramid = None
+        if self.__display_tile_cache:
+            self.__display_tile_cache.close()
+            self.__display_tile_cache = None
+        self.__display_buffer_pool.close()
         super().close()
 
     def update_uuids(self, uuid_map: dict[uuid.UUID, uuid.UUID]) -> None:
@@ -1577,7 +2321,7 @@ class DisplayDataChannel(Persistence.PersistentObject):
     @property
     def display_values(self) -> DisplayValues | None:
         if self.__data_item:
-            return DisplayValues(self.__data_item.xdata,
+            return DisplayValues(self.__data_item.lazy_xdata if self.__is_data_read_in_slices() else self.__data_item.xdata,
                                  self.sequence_index,
                                  self.collection_index,
                                  self.slice_center, self.slice_width,
@@ -1586,24 +2330,102 @@ class DisplayDataChannel(Persistence.PersistentObject):
                                  self.__color_map_data,
                                  self.brightness,
                                  self.contrast,
-                                 self.adjustments)
+                                 self.adjustments,
+                                 self.__get_statistics_cache(),
+                                 self.__get_data_range_state(),
+                                 self.__data_item._data_generation,
+                                 self.__get_display_data_pyramid(),
+                                 self.__get_display_tile_cache(),
+                                 self.__display_buffer_pool)
+        return None
+
+    def __get_data_range_state(self) -> DataRangeState | None:
+        # the data range is updated incrementally only when the display data is the data itself.
+        data_item = self.__data_item
+        data_metadata = data_item.data_metadata if data_item else None
+        if data_item and data_metadata and not data_metadata.is_sequence and not data_metadata.is_collection and data_metadata.datum_dimension_count in (1, 2) and not data_metadata.is_data_complex_type and not data_metadata.is_data_rgb_type:
+            if not self.__data_range_state or self.__data_range_state.data_item is not data_item:
+                self.__data_range_state = DataRangeState(data_item)
+            return self.__data_range_state
+        self.__data_range_state = None
+        return None
+
+    def __is_large_image_data_displayed(self) -> bool:
+        # whether the display data is large 2D data which is the data itself.
+        data_item = self.__data_item
+        data_metadata = data_item.data_metadata if data_item else None
+        return bool(data_metadata and not data_metadata.is_sequence and not data_metadata.is_collection and data_metadata.datum_dimension_count == 2 and not data_metadata.is_data_complex_type and not data_metadata.is_data_rgb_type and DisplayDataPyramid.get_level_count(data_metadata.data_shape) > 0)
+
+    def __get_display_data_pyramid(self) -> DisplayDataPyramid | None:
+        # decimated levels are only kept for large 2D display data which is the data itself. they are not built for
+        # data which is changing with each frame during live acquisition or transactions.
+        data_item = self.__data_item
+        if data_item and self.__is_large_image_data_displayed() and not data_item.is_live and not data_item.in_transaction_state:
+            if not self.__display_data_pyramid or self.__display_data_pyramid.data_item is not data_item:
+                if self.__display_data_pyramid:
+                    self.__display_data_pyramid.close()
+                self.__display_data_pyramid = DisplayDataPyramid(data_item)
+            return self.__display_data_pyramid
+        if self.__display_data_pyramid:
+            self.__display_data_pyramid.close()
+            self.__display_data_pyramid = None
+        return None
+
+    def __get_display_tile_cache(self) -> DisplayTileCache | None:
+        # tiles are keyed by data generation, so they are only cached for display data which is the data itself.
+        data_item = self.__data_item
+        if data_item and self.__is_large_image_data_displayed():
+            if not self.__display_tile_cache or self.__display_tile_cache.data_item is not data_item:
+                self.__display_tile_cache = DisplayTileCache(data_item)
+            return self.__display_tile_cache
+        self.__display_tile_cache = None
+        return None
+
+    def __get_statistics_cache(self) -> DisplayStatisticsCache | None:
+        # statistics are not stored for data which is changing with each frame during live acquisition or transactions.
+        data_item = self.__data_item
+        display_item = self.container
+        if data_item and isinstance(display_item, DisplayItem) and not data_item.is_live and not data_item.in_transaction_state:
+            collection_index = tuple(self.collection_index) if self.collection_index is not None else None
+            signature = (self.sequence_index, collection_index, self.slice_center, self.slice_width, self.complex_display_type)
+            return DisplayStatisticsCache(display_item._display_cache, display_item, data_item, signature)
         return None
 
     def increment_display_ref_count(self, amount: int = 1) -> None:
         """Increment display reference count to indicate this library item is currently displayed."""
         self.__display_ref_count += amount
         if self.__data_item:
-            for _ in range(amount):
-                self.__data_item.increment_data_ref_count()
+            self.__hold_data(amount)
 
     def decrement_display_ref_count(self, amount: int = 1) -> None:
         """Decrement display reference count to indicate this library item is no longer displayed."""
         assert not self._closed
         self.__display_ref_count -= amount
         if self.__data_item:
+            amount = min(amount, self.__held_data_ref_count)
+            self.__held_data_ref_count -= amount
             for _ in range(amount):
                 self.__data_item.decrement_data_ref_count()
 
+    def __is_data_read_in_slices(self) -> bool:
+        # a large sequence or collection which has not been loaded is not loaded for display. the display values read
+        # only the slices they need from it.
+        data_item = self.__data_item
+        data_metadata = data_item.data_metadata if data_item else None
+        if data_item and data_metadata and (data_metadata.is_sequence or data_metadata.is_collection) and not data_item.is_data_loaded:
+            return bool(numpy.prod(data_metadata.data_shape, dtype=numpy.int64) * numpy.dtype(data_metadata.data_dtype).itemsize > _g_lazy_display_data_nbytes)
+        return False
+
+    def __hold_data(self, amount: int) -> None:
+        # keep the data loaded while displayed, unless it is read in slices.
+        data_item = self.__data_item
+        assert data_item
+        if self.__is_data_read_in_slices():
+            return
+        self.__held_data_ref_count += amount
+        for _ in range(amount):
+            data_item.increment_data_ref_count()
+
     @property
     def _display_ref_count(self) -> int:
         return self.__display_ref_count
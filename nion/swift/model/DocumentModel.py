@@ -1066,6 +1066,8 @@ class DocumentModel(Observable.Observable, ReferenceCounting.ReferenceCounted, D
             data_item.source_data_items_changed(self.get_source_data_items(data_item))
         for display_item in self.__display_items:
             display_item.finish_project_read()
+        # the cache only holds values for display items; remove values of display items no longer in the project.
+        self._project.prune_storage_cache({display_item.uuid for display_item in self.__display_items})
         self.project_loaded_event.fire()
         self.__is_loading = False
         # special cleanup after project is loaded to remove computations with targets that are not in the project.
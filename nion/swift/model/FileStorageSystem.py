@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import abc
+import concurrent.futures
 import contextlib
 import copy
 import dataclasses
 import datetime
 import gettext
+import hashlib
+import itertools
 import json
 import logging
 import traceback
@@ -15,7 +18,9 @@ import numpy.typing
 import os.path
 import pathlib
 import shutil
+import stat
 import threading
+import time
 import typing
 import uuid
 
@@ -36,6 +41,18 @@ _ = gettext.gettext
 PROFILE_VERSION = 2
 PROJECT_VERSION = 3
 PROJECT_VERSION_0_14 = 2
+MANIFEST_VERSION = 1
+JOURNAL_VERSION = 1
+
+
+# files changed more recently than this when the manifest is written are not added to the manifest.
+_g_manifest_minimum_age_ns = 2 * 1000 * 1000 * 1000
+
+# the project journal is compacted into the project file once it is larger than both the project file and this size.
+_g_journal_compaction_size = 1024 * 1024
+
+# appends to the project journal are synced to disk in batches at this interval, in seconds.
+_g_journal_sync_interval = 0.5
 
 
 PersistentDictType = typing.Dict[str, typing.Any]
@@ -45,6 +62,12 @@ _CreateStorageHandlerFn = typing.Type[StorageHandler.StorageHandler]
 
 _g_large_format_size = 16 * 1024 * 1024
 
+# write data item data on a background thread for storage systems which support it.
+_g_write_behind_enabled = True
+
+# the data held by the background writer before writers must wait.
+_g_write_behind_max_bytes = 512 * 1024 * 1024
+
 
 @dataclasses.dataclass(frozen=True)
 class ProjectNameResult:
@@ -74,12 +97,131 @@ class ReaderInfo:
         self.identifier = identifier
 
 
+class DataBlobStore:
+    """Content addressed storage of data arrays so that identical data is stored once.
+
+    Each array is stored in a numpy file named by the hash of its content. The data items referencing an array are
+    counted. An array is removed when it is no longer referenced, unless a data item in the trash references it; those
+    arrays are removed when the project is next read. No array is removed while the references are incomplete, which is
+    the case when some data items could not be read.
+    """
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+        self.__lock = threading.RLock()
+        self.__reference_counts: typing.Dict[str, int] = dict()
+        self.__trashed_reference_counts: typing.Dict[str, int] = dict()
+        self.__references_complete = True
+
+    @staticmethod
+    def get_key(data: _NDArray) -> str:
+        data = numpy.ascontiguousarray(data)
+        h = hashlib.sha256(json.dumps([data.dtype.str, list(data.shape)]).encode("utf-8"))
+        data_bytes = data.reshape(-1).view(numpy.uint8)
+        chunk_size = 16 * 1024 * 1024
+        for i in range(0, data_bytes.shape[0], chunk_size):
+            h.update(data_bytes[i:i + chunk_size])
+        return h.hexdigest()
+
+    def get_path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.npy"
+
+    @property
+    def reference_counts(self) -> typing.Mapping[str, int]:
+        with self.__lock:
+            return dict(self.__reference_counts)
+
+    def clear_references(self, *, complete: bool = True) -> None:
+        # complete is False when the references about to be added are not all of the references.
+        with self.__lock:
+            self.__reference_counts.clear()
+            self.__trashed_reference_counts.clear()
+            self.__references_complete = complete
+
+    def add_reference(self, key: str, data: typing.Optional[_NDArray] = None) -> None:
+        # data is written if the array is not already stored.
+        with self.__lock:
+            file_path = self.get_path(key)
+            if data is not None and not file_path.exists():
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temp_file_path = file_path.with_name("." + file_path.name)
+                with temp_file_path.open("wb") as fp:
+                    NDataHandler.write_npy(fp, data)
+                os.replace(temp_file_path, file_path)
+            self.__reference_counts[key] = self.__reference_counts.get(key, 0) + 1
+
+    def remove_reference(self, key: str, *, trashed: bool = False) -> None:
+        with self.__lock:
+            reference_count = self.__reference_counts.get(key, 0) - 1
+            if reference_count > 0:
+                self.__reference_counts[key] = reference_count
+            else:
+                self.__reference_counts.pop(key, None)
+            if trashed:
+                self.__trashed_reference_counts[key] = self.__trashed_reference_counts.get(key, 0) + 1
+            elif reference_count <= 0 and not self.__trashed_reference_counts.get(key) and self.__references_complete:
+                self.__remove_file(key)
+
+    def restore_reference(self, key: str) -> None:
+        with self.__lock:
+            trashed_reference_count = self.__trashed_reference_counts.get(key, 0) - 1
+            if trashed_reference_count > 0:
+                self.__trashed_reference_counts[key] = trashed_reference_count
+            else:
+                self.__trashed_reference_counts.pop(key, None)
+            self.__reference_counts[key] = self.__reference_counts.get(key, 0) + 1
+
+    def remove_unreferenced(self) -> None:
+        # called when the trash is emptied.
+        with self.__lock:
+            self.__trashed_reference_counts.clear()
+            if self.__references_complete and self.directory.exists():
+                for file_path in self.directory.iterdir():
+                    if file_path.suffix == ".npy" and (file_path.name.startswith(".") or file_path.stem not in self.__reference_counts):
+                        self.__remove_file(file_path.stem, file_path)
+
+    def read_data(self, key: str) -> typing.Optional[_NDArray]:
+        file_path = self.get_path(key)
+        if not file_path.exists():
+            return None
+        if NDataHandler._g_memory_map_data:
+            try:
+                return typing.cast(_NDArray, numpy.load(file_path, mmap_mode="c"))
+            except ValueError:
+                pass  # empty arrays cannot be mapped
+        return typing.cast(_NDArray, numpy.load(file_path))
+
+    def read_data_slice(self, key: str, data_key: typing.Any) -> typing.Optional[_NDArray]:
+        file_path = self.get_path(key)
+        if not file_path.exists():
+            return None
+        try:
+            data = numpy.load(file_path, mmap_mode="r")
+        except ValueError:
+            data = numpy.load(file_path)  # empty arrays cannot be mapped
+        return numpy.array(data[data_key])
+
+    def __remove_file(self, key: str, file_path: typing.Optional[pathlib.Path] = None) -> None:
+        file_path = file_path or self.get_path(key)
+        try:
+            file_path.unlink(missing_ok=True)
+        except OSError as e:
+            # the file may be open (mapped) on some platforms; it will be removed when the project is pruned.
+            logging.debug("Unable to remove data file %s (%s)", file_path, e)
+
+
 class DataItemStorageAdapter:
-    """Persistent storage for writing data item properties, relationships, and data to its storage handler."""
+    """Persistent storage for writing data item properties, relationships, and data to its storage handler.
+
+    If data_blob_key is set, the data is stored in the data blob store of the project rather than the storage handler.
+    """
 
-    def __init__(self, storage_handler: StorageHandler.StorageHandler, properties: PersistentDictType) -> None:
+    def __init__(self, storage_handler: StorageHandler.StorageHandler, properties: PersistentDictType, data_blob_key: typing.Optional[str] = None) -> None:
         self.__storage_handler = storage_handler
         self.__properties = properties
+        self.data_blob_key = data_blob_key
+        # the data blob key may be changed on the data writer thread; the lock keeps the properties in step with it.
+        self.__lock = threading.RLock()
 
     def close(self) -> None:
         if self.__storage_handler:
@@ -96,20 +238,202 @@ class DataItemStorageAdapter:
 
     def rewrite_item(self, item: Persistence.PersistentObject) -> None:
         file_datetime = getattr(item, "created_local")
-        self.__storage_handler.write_properties(Migration.transform_from_latest(copy.deepcopy(self.__properties)), file_datetime)
+        with self.__lock:
+            properties = Migration.transform_from_latest(copy.deepcopy(self.__properties))
+            if self.data_blob_key:
+                properties["data_blob"] = self.data_blob_key
+            self.__storage_handler.write_properties(properties, file_datetime)
 
     def update_data(self, item: Persistence.PersistentObject, data: _NDArray | None, data_descriptor: DataAndMetadata.DataDescriptor | None) -> None:
         file_datetime = getattr(item, "created_local")
         if data is not None and data_descriptor:
             self.__storage_handler.write_data(data, data_descriptor, file_datetime)
 
+    def update_data_slice(self, item: Persistence.PersistentObject, dst_slice: typing.Sequence[slice], data: _NDArray | None, data_descriptor: DataAndMetadata.DataDescriptor | None) -> None:
+        file_datetime = getattr(item, "created_local")
+        if data is not None and data_descriptor:
+            self.__storage_handler.write_data_slice(dst_slice, data, data_descriptor, file_datetime)
+
     def reserve_data(self, item: Persistence.PersistentObject, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: DataAndMetadata.DataDescriptor) -> None:
         file_datetime = getattr(item, "created_local")
         self.__storage_handler.reserve_data(data_shape, data_dtype, data_descriptor, file_datetime)
 
+    def update_data_blob(self, item: Persistence.PersistentObject, data: _NDArray, data_blob_store: DataBlobStore) -> None:
+        # store the data in the data blob store, unless it is stored there already. hashing the data is expensive, so
+        # this is done by the data writer when there is one.
+        self.set_data_blob(item, data_blob_store, data_blob_store.get_key(data), data)
+
+    def set_data_blob(self, item: Persistence.PersistentObject, data_blob_store: DataBlobStore, data_blob_key: str, data: typing.Optional[_NDArray]) -> None:
+        with self.__lock:
+            old_data_blob_key = self.data_blob_key
+            if data_blob_key == old_data_blob_key:
+                return
+            data_blob_store.add_reference(data_blob_key, data)
+            if not old_data_blob_key:
+                # remove the data in the storage handler; the properties are rewritten below.
+                self.__storage_handler.remove()
+            self.data_blob_key = data_blob_key
+            self.rewrite_item(item)
+        if old_data_blob_key:
+            data_blob_store.remove_reference(old_data_blob_key)
+
+    def copy_data(self, item: Persistence.PersistentObject, storage_adapter: DataItemStorageAdapter) -> bool:
+        if self.__storage_handler.copy_from(storage_adapter.storage_handler):
+            self.rewrite_item(item)
+            return True
+        return False
+
     def load_data(self, item: Persistence.PersistentObject) -> typing.Optional[_NDArray]:
         return self.__storage_handler.read_data()
 
+    def load_data_slice(self, item: Persistence.PersistentObject, key: typing.Any) -> typing.Optional[_NDArray]:
+        return self.__storage_handler.read_data_slice(key)
+
+
+class PendingDataWrite:
+    """A data write waiting in a data write queue.
+
+    dst_slices is None for a full write. data_blob_store is set for a full write to the data blob store.
+    """
+
+    def __init__(self, storage_adapter: DataItemStorageAdapter, item: Persistence.PersistentObject, data: _NDArray,
+                 data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor], dst_slices: typing.Optional[typing.List[typing.Tuple[slice, ...]]],
+                 index: int, data_blob_store: typing.Optional[DataBlobStore] = None) -> None:
+        self.storage_adapter = storage_adapter
+        self.item = item
+        self.data = data
+        self.data_descriptor = data_descriptor
+        self.dst_slices = dst_slices
+        self.index = index
+        self.data_blob_store = data_blob_store
+        # only count memory; the data may be a dataset in the file itself.
+        self.n_bytes = data.nbytes if isinstance(data, numpy.ndarray) else 0
+
+    def write(self) -> None:
+        if self.data_blob_store:
+            self.storage_adapter.update_data_blob(self.item, self.data, self.data_blob_store)
+        elif self.dst_slices is None:
+            self.storage_adapter.update_data(self.item, self.data, self.data_descriptor)
+        else:
+            for dst_slice in self.dst_slices:
+                self.storage_adapter.update_data_slice(self.item, dst_slice, self.data, self.data_descriptor)
+
+
+class DataWriteQueue:
+    """Write data to storage adapters on a dedicated thread (write-behind).
+
+    Writes are keyed by data item uuid. A new write for a key replaces a pending write for that key, so only the latest
+    data is written. Slice writes of the same data are combined. Callers block while the data held by the queue exceeds
+    max_bytes. The data for a key remains available from `get_pending_data` until it is written.
+
+    Callers must flush a key before closing or replacing its storage adapter.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.__max_bytes = max_bytes
+        self.__condition = threading.Condition()
+        self.__pending: typing.Dict[uuid.UUID, PendingDataWrite] = dict()
+        self.__active: typing.Dict[uuid.UUID, PendingDataWrite] = dict()
+        self.__n_bytes = 0
+        self.__index = 0
+        self.__closing = False
+        self.__thread: typing.Optional[threading.Thread] = None
+
+    def close(self) -> None:
+        self.wait_idle()
+        with self.__condition:
+            self.__closing = True
+            thread = self.__thread
+            self.__thread = None
+            self.__condition.notify_all()
+        if thread:
+            thread.join()
+
+    def write_data(self, key: uuid.UUID, storage_adapter: DataItemStorageAdapter, item: Persistence.PersistentObject, data: _NDArray, data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor]) -> None:
+        with self.__condition:
+            self.__append(PendingDataWrite(storage_adapter, item, data, data_descriptor, None, self.__index), key)
+
+    def write_data_blob(self, key: uuid.UUID, storage_adapter: DataItemStorageAdapter, item: Persistence.PersistentObject, data: _NDArray, data_blob_store: DataBlobStore) -> None:
+        with self.__condition:
+            self.__append(PendingDataWrite(storage_adapter, item, data, None, None, self.__index, data_blob_store), key)
+
+    def write_data_slice(self, key: uuid.UUID, storage_adapter: DataItemStorageAdapter, item: Persistence.PersistentObject, dst_slice: typing.Sequence[slice], data: _NDArray, data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor]) -> None:
+        with self.__condition:
+            pending_data_write = self.__pending.get(key)
+            if pending_data_write and pending_data_write.data is data and pending_data_write.storage_adapter is storage_adapter and not pending_data_write.data_blob_store:
+                # the pending write has not started and will write the current values of the data.
+                if pending_data_write.dst_slices is not None:
+                    pending_data_write.dst_slices.append(tuple(dst_slice))
+                pending_data_write.data_descriptor = data_descriptor
+                return
+            # data is the complete data. if a write of other data is pending, replace it with a full write.
+            dst_slices = None if pending_data_write else [tuple(dst_slice)]
+            self.__append(PendingDataWrite(storage_adapter, item, data, data_descriptor, dst_slices, self.__index), key)
+
+    def get_pending_data(self, key: uuid.UUID) -> typing.Optional[_NDArray]:
+        """Return the data for the key if it has not been written yet."""
+        with self.__condition:
+            pending_data_write = self.__pending.get(key) or self.__active.get(key)
+            return pending_data_write.data if pending_data_write else None
+
+    def is_writing_data_blob(self, key: uuid.UUID) -> bool:
+        """Return whether a write of the data for the key to the data blob store is pending."""
+        with self.__condition:
+            pending_data_write = self.__pending.get(key) or self.__active.get(key)
+            return bool(pending_data_write and pending_data_write.data_blob_store)
+
+    def flush(self, key: typing.Optional[uuid.UUID] = None) -> None:
+        """Wait until the writes for key, or all writes queued before this call, are finished."""
+        with self.__condition:
+            if key is not None:
+                self.__condition.wait_for(lambda: key not in self.__pending and key not in self.__active)
+            else:
+                index = self.__index
+                self.__condition.wait_for(lambda: all(w.index >= index for w in itertools.chain(self.__pending.values(), self.__active.values())))
+
+    def wait_idle(self) -> None:
+        """Wait until there are no pending writes."""
+        with self.__condition:
+            self.__condition.wait_for(lambda: not self.__pending and not self.__active)
+
+    def __append(self, pending_data_write: PendingDataWrite, key: uuid.UUID) -> None:
+        # call with the condition held.
+        assert not self.__closing
+        # bound the memory held by the queue by waiting for the writer.
+        self.__condition.wait_for(lambda: self.__n_bytes + pending_data_write.n_bytes <= self.__max_bytes or (not self.__pending and not self.__active))
+        old_pending_data_write = self.__pending.pop(key, None)
+        if old_pending_data_write:
+            self.__n_bytes -= old_pending_data_write.n_bytes
+        self.__pending[key] = pending_data_write
+        self.__n_bytes += pending_data_write.n_bytes
+        self.__index += 1
+        if not self.__thread:
+            self.__thread = threading.Thread(target=self.__run, name="data writer", daemon=True)
+            self.__thread.start()
+        self.__condition.notify_all()
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: bool(self.__pending) or self.__closing)
+                if not self.__pending:
+                    return
+                # writes for a key are never concurrent since there is a single writer thread.
+                key = next(iter(self.__pending))
+                pending_data_write = self.__pending.pop(key)
+                self.__active[key] = pending_data_write
+            try:
+                pending_data_write.write()
+            except Exception as e:
+                logging.error("Unable to write data for %s", key)
+                logging.error(str(e))
+                traceback.print_exc()
+            finally:
+                with self.__condition:
+                    self.__active.pop(key, None)
+                    self.__n_bytes -= pending_data_write.n_bytes
+                    self.__condition.notify_all()
+
 
 class MigrationReader(typing.Protocol):
 
@@ -405,7 +729,29 @@ class PersistentStorageSystem(Persistence.PersistentStorageInterface):
                 with self.__properties_lock:
                     self._write_untransformed_properties(self._untransform_properties(self.__properties))
         else:
-            self.__write_properties_if_not_delayed(persistent_object_parent.parent)
+            # if the item is directly contained in a relationship of the root and nothing is write delayed, give the
+            # subclass a chance to write only the item. otherwise write the parent.
+            parent = persistent_object_parent.parent
+            name = persistent_object_parent.relationship_name
+            if item and parent and name and not parent.persistent_object_parent and self.__write_delay_count == 0 and self.__write_delay_counts.get(parent, 0) == 0:
+                with self.__properties_lock:
+                    item_properties = self._get_persistent_dict(item)
+                    if item_properties is not None and self._write_untransformed_item_properties(name, self._untransform_item_properties(name, item_properties), self.__properties.get("modified")):
+                        return
+            self.__write_properties_if_not_delayed(parent)
+
+    def _write_untransformed_item_properties(self, name: str, untransformed_item_properties: PersistentDictType, modified: typing.Optional[str]) -> bool:
+        """Write the internal properties of a single item in the root relationship name to persistent storage.
+
+        The modified value is the modified property of the root. Return False to write all properties instead.
+        Subclasses may override.
+        """
+        return False
+
+    def _untransform_item_properties(self, name: str, item_properties: PersistentDictType) -> PersistentDictType:
+        # subclasses can override to implement un-transformations to the properties of an item in the root relationship
+        # name; must be consistent with _untransform_properties.
+        return copy.deepcopy(item_properties)
 
     def _transform_properties(self, properties: PersistentDictType) -> PersistentDictType:
         # subclasses can override to implement transformations to the properties before writing to disk, often for backwards compatibility.
@@ -501,9 +847,15 @@ class PersistentStorageSystem(Persistence.PersistentStorageInterface):
     def read_external_data(self, item: Persistence.PersistentObject, name: str) -> typing.Any:
         return None
 
+    def read_external_data_slice(self, item: Persistence.PersistentObject, name: str, key: typing.Any) -> typing.Any:
+        return None
+
     def write_external_data(self, item: Persistence.PersistentObject, name: str, value: _NDArray) -> None:
         pass
 
+    def write_external_data_slice(self, item: Persistence.PersistentObject, name: str, dst_slice: typing.Sequence[slice], value: _NDArray) -> None:
+        pass
+
     def reserve_external_data(self, item: Persistence.PersistentObject, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: tuple[bool, int, int]) -> None:
         pass
 
@@ -611,11 +963,22 @@ def make_storage_handler_attributes(data_item: DataItem.DataItem, n_bytes_overri
 class ProjectStorageSystem(PersistentStorageSystem):
     """Persistent storage system to provide special handling of data items."""
 
+    # whether data item data is written on a background thread. subclasses may enable.
+    _write_behind = False
+
     def __init__(self) -> None:
         super().__init__()
         self.__storage_adapter_map: typing.Dict[uuid.UUID, DataItemStorageAdapter] = dict()
+        self.__data_write_queue = DataWriteQueue(_g_write_behind_max_bytes) if self._write_behind and _g_write_behind_enabled else None
+        self.__restored_data_blob_keys: typing.Dict[uuid.UUID, str] = dict()
+        # the name of the compression used for newly written data, if any. set from the project.
+        self.storage_compression: typing.Optional[str] = None
+        # whether identical data is stored once in the data blob store. set from the project.
+        self.storage_deduplication = False
 
     def close(self) -> None:
+        if self.__data_write_queue:
+            self.__data_write_queue.close()
         for storage_adapter in self.__storage_adapter_map.values():
             storage_adapter.close()
         self.__storage_adapter_map.clear()
@@ -641,6 +1004,10 @@ class ProjectStorageSystem(PersistentStorageSystem):
     @abc.abstractmethod
     def _prune(self) -> None: ...
 
+    def _get_data_blob_store(self) -> typing.Optional[DataBlobStore]:
+        """Return the data blob store used for deduplicated data. Subclasses may override."""
+        return None
+
     # for migration
 
     @abc.abstractmethod
@@ -669,8 +1036,19 @@ class ProjectStorageSystem(PersistentStorageSystem):
         self.__storage_adapter_map = dict()
 
     def _get_persistence_write_count(self, item: Persistence.PersistentObject) -> typing.Optional[int]:
+        self.flush_data(item.uuid)
         return getattr(self._data_properties_map[item.uuid].storage_handler, "_write_count", None)
 
+    def flush_data(self, data_item_uuid: typing.Optional[uuid.UUID] = None) -> None:
+        """Wait until the background writes of data item data, for the data item or all data items, are finished."""
+        if self.__data_write_queue:
+            self.__data_write_queue.flush(data_item_uuid)
+
+    def wait_data_idle(self) -> None:
+        """Wait until there are no background writes of data item data."""
+        if self.__data_write_queue:
+            self.__data_write_queue.wait_idle()
+
     def _get_relationship_persistent_dict(self, container: Persistence.PersistentObject, item: Persistence.PersistentObject, key: str, index: int) -> typing.Optional[PersistentDictType]:
         if key == "data_items":
             return self._data_properties_map[item.uuid].properties
@@ -694,28 +1072,43 @@ class ProjectStorageSystem(PersistentStorageSystem):
 
         The dict may contain keys for data_items, display_items, data_structures, connections, and computations.
         """
-        storage_handlers = self._find_storage_handlers()
-
         reader_info_list = list()
         reader_error_list = list()
-        for storage_handler in storage_handlers:
+        data_blob_keys: typing.Dict[uuid.UUID, str] = dict()
+        self.flush_data()
+        for storage_handler, storage_handler_properties, exception in self._read_storage_handler_properties_list():
             try:
-                storage_handler_properties = storage_handler.read_properties()
-                storage_handler.prepare_move()
+                if exception:
+                    raise exception
                 assert storage_handler_properties is not None
+                storage_handler_properties = dict(storage_handler_properties)
+                data_blob_key = storage_handler_properties.pop("data_blob", None)
                 combined_properties = Migration.transform_to_latest(storage_handler_properties)
                 assert combined_properties.get("uuid")
+                if data_blob_key:
+                    data_blob_keys[uuid.UUID(combined_properties["uuid"])] = data_blob_key
                 reader_info = ReaderInfo(combined_properties, [False], storage_handler, storage_handler.reference)
                 reader_info_list.append(reader_info)
             except Exception as e:
                 reader_error_list.append(Persistence.ReaderError(storage_handler.reference, e, traceback.extract_stack()))
+                storage_handler.close()
+
+        # count the references to deduplicated data. the project is pruned before it is read, so the deduplicated data
+        # of the trashed data items is no longer referenced and can be removed now. data items which could not be read
+        # may still reference deduplicated data, so nothing is removed in that case.
+        data_blob_store = self._get_data_blob_store()
+        if data_blob_store:
+            data_blob_store.clear_references(complete=not reader_error_list)
+            for data_blob_key in data_blob_keys.values():
+                data_blob_store.add_reference(data_blob_key)
+            data_blob_store.remove_unreferenced()
 
         # to allow later writing back to storage, associate the data items with their storage adapters
         for reader_info in reader_info_list:
             storage_handler = reader_info.storage_handler
             combined_properties = reader_info.properties
             data_item_uuid = uuid.UUID(combined_properties["uuid"])
-            storage_adapter = DataItemStorageAdapter(storage_handler, combined_properties)
+            storage_adapter = DataItemStorageAdapter(storage_handler, combined_properties, data_blob_keys.get(data_item_uuid))
             old_storage_adapter = self.__storage_adapter_map.pop(data_item_uuid, None)
             if old_storage_adapter:
                 old_storage_adapter.close()
@@ -749,6 +1142,27 @@ class ProjectStorageSystem(PersistentStorageSystem):
 
         return combined_properties, reader_error_list
 
+    def _read_storage_handler_properties_list(self) -> typing.Sequence[typing.Tuple[StorageHandler.StorageHandler, typing.Optional[PersistentDictType], typing.Optional[Exception]]]:
+        """Find the storage handlers and read their properties.
+
+        Returns a list of storage handler, properties, exception tuples. Either properties or exception will be None.
+
+        Subclasses may override to cache or parallelize reading.
+        """
+        results: typing.List[typing.Tuple[StorageHandler.StorageHandler, typing.Optional[PersistentDictType], typing.Optional[Exception]]] = list()
+        for storage_handler in self._find_storage_handlers():
+            try:
+                storage_handler_properties = storage_handler.read_properties()
+                storage_handler.prepare_move()
+                results.append((storage_handler, storage_handler_properties, None))
+            except Exception as e:
+                results.append((storage_handler, None, e))
+        return results
+
+    def _storage_handler_will_write(self, storage_handler: StorageHandler.StorageHandler) -> None:
+        """Called before the storage handler of a data item is written. Subclasses may override to invalidate caches."""
+        pass
+
     # override
     def _write_item_properties(self, item: typing.Optional[Persistence.PersistentObject]) -> None:
         if item and isinstance(item, DataItem.DataItem):
@@ -764,6 +1178,10 @@ class ProjectStorageSystem(PersistentStorageSystem):
         # called by the base class to untransform properties before writing to storage. this is where we can apply any transformations needed for the data item properties.
         return Model.transform_backward(copy.deepcopy(properties))
 
+    def _untransform_item_properties(self, name: str, item_properties: PersistentDictType) -> PersistentDictType:
+        # the transformations are applied to each item in the root relationships independently.
+        return typing.cast(PersistentDictType, Model.transform_backward({name: [copy.deepcopy(item_properties)]})[name][0])
+
     # override
     def _insert_item(self, parent: Persistence.PersistentObject, name: str, before_index: int, item: Persistence.PersistentObject) -> None:
         if isinstance(item, DataItem.DataItem):
@@ -772,7 +1190,12 @@ class ProjectStorageSystem(PersistentStorageSystem):
             assert item_uuid not in self.__storage_adapter_map
             persistent_dict = self._get_persistent_dict(item)
             assert persistent_dict is not None
-            storage_adapter = DataItemStorageAdapter(storage_handler, persistent_dict)
+            # a data item restored from the trash references its deduplicated data again.
+            data_blob_key = self.__restored_data_blob_keys.pop(item_uuid, None)
+            data_blob_store = self._get_data_blob_store()
+            if data_blob_key and data_blob_store:
+                data_blob_store.restore_reference(data_blob_key)
+            storage_adapter = DataItemStorageAdapter(storage_handler, persistent_dict, data_blob_key if data_blob_store else None)
             self.__storage_adapter_map[item_uuid] = storage_adapter
         else:
             super()._insert_item(parent, name, before_index, item)
@@ -781,8 +1204,13 @@ class ProjectStorageSystem(PersistentStorageSystem):
     def _remove_item(self, parent: Persistence.PersistentObject, name: str, index: int, item: Persistence.PersistentObject) -> None:
         if isinstance(item, DataItem.DataItem):
             assert item.uuid in self.__storage_adapter_map
+            self.flush_data(item.uuid)
             storage = self.__storage_adapter_map.get(item.uuid)
             assert storage
+            # the deduplicated data is kept while the data item is in the trash.
+            data_blob_store = self._get_data_blob_store()
+            if storage.data_blob_key and data_blob_store:
+                data_blob_store.remove_reference(storage.data_blob_key, trashed=True)
             self._remove_storage_handler(storage.storage_handler, safe=True)
             self.__storage_adapter_map.pop(item.uuid).close()
         else:
@@ -800,6 +1228,12 @@ class ProjectStorageSystem(PersistentStorageSystem):
             return self.__read_data_item_data(item)
         return super().read_external_data(item, name)
 
+    # override
+    def read_external_data_slice(self, item: Persistence.PersistentObject, name: str, key: typing.Any) -> typing.Any:
+        if isinstance(item, DataItem.DataItem) and name == "data":
+            return self.__read_data_item_data_slice(item, key)
+        return super().read_external_data_slice(item, name, key)
+
     # override
     def write_external_data(self, item: Persistence.PersistentObject, name: str, value: _NDArray) -> None:
         if isinstance(item, DataItem.DataItem) and name == "data":
@@ -807,6 +1241,13 @@ class ProjectStorageSystem(PersistentStorageSystem):
         else:
             super().write_external_data(item, name, value)
 
+    # override
+    def write_external_data_slice(self, item: Persistence.PersistentObject, name: str, dst_slice: typing.Sequence[slice], value: _NDArray) -> None:
+        if isinstance(item, DataItem.DataItem) and name == "data":
+            self.__write_data_item_data_slice(item, dst_slice, value)
+        else:
+            super().write_external_data_slice(item, name, dst_slice, value)
+
     # override
     def reserve_external_data(self, item: Persistence.PersistentObject, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: tuple[bool, int, int]) -> None:
         if isinstance(item, DataItem.DataItem) and name == "data":
@@ -845,10 +1286,28 @@ class ProjectStorageSystem(PersistentStorageSystem):
         return None
 
     def __read_data_item_data(self, data_item: DataItem.DataItem) -> typing.Optional[_NDArray]:
+        # data waiting to be written is the latest data.
+        data = self.__data_write_queue.get_pending_data(data_item.uuid) if self.__data_write_queue else None
+        if data is not None:
+            return data
         storage_adapter = self.__storage_adapter_map.get(data_item.uuid)
         assert storage_adapter
+        data_blob_store = self._get_data_blob_store()
+        if storage_adapter.data_blob_key and data_blob_store:
+            return data_blob_store.read_data(storage_adapter.data_blob_key)
         return storage_adapter.load_data(data_item)
 
+    def __read_data_item_data_slice(self, data_item: DataItem.DataItem, key: typing.Any) -> typing.Optional[_NDArray]:
+        data = self.__data_write_queue.get_pending_data(data_item.uuid) if self.__data_write_queue else None
+        if data is not None:
+            return numpy.array(data[key])
+        storage_adapter = self.__storage_adapter_map.get(data_item.uuid)
+        assert storage_adapter
+        data_blob_store = self._get_data_blob_store()
+        if storage_adapter.data_blob_key and data_blob_store:
+            return data_blob_store.read_data_slice(storage_adapter.data_blob_key, key)
+        return storage_adapter.load_data_slice(data_item, key)
+
     def __ensure_valid_storage_adapter(self, data_item: DataItem.DataItem, n_bytes: int, force_large_format: bool) -> DataItemStorageAdapter:
         # check to see if the existing storage adapter is still suitable for the data item with the new size n_bytes
         # if not, create a new storage adapter and replace the old one.
@@ -858,11 +1317,13 @@ class ProjectStorageSystem(PersistentStorageSystem):
         storage_handler_attributes = make_storage_handler_attributes(data_item, n_bytes)
         storage_handler_type = self._get_storage_handler_factory(storage_handler_attributes).get_storage_handler_type()
         if storage_handler_type != storage_handler.storage_handler_type:
+            self.flush_data(data_item.uuid)
             properties = storage_adapter.properties
             new_storage_handler = self._replace_storage_handler(storage_handler, storage_handler_attributes)
             storage_handler.close()
-            new_storage_adapter = DataItemStorageAdapter(new_storage_handler, properties)
+            new_storage_adapter = DataItemStorageAdapter(new_storage_handler, properties, storage_adapter.data_blob_key)
             self.__storage_adapter_map[data_item.uuid] = new_storage_adapter
+            self._storage_handler_will_write(new_storage_handler)
             new_storage_adapter.rewrite_item(data_item)
             return new_storage_adapter
         return storage_adapter
@@ -870,22 +1331,104 @@ class ProjectStorageSystem(PersistentStorageSystem):
     def __write_data_item_data(self, data_item: DataItem.DataItem, data: typing.Optional[_NDArray]) -> None:
         if not self.is_write_delayed(data_item):
             n_bytes = typing.cast(int, numpy.prod(data.shape, dtype=numpy.int64)) * numpy.dtype(data.dtype).itemsize if data is not None else 0
+            old_storage_adapter = self.__storage_adapter_map.get(data_item.uuid)
             storage_adapter = self.__ensure_valid_storage_adapter(data_item, n_bytes, False)
-            storage_adapter.update_data(data_item, data, data_item.data_descriptor)
+            self._storage_handler_will_write(storage_adapter.storage_handler)
+            if data is not None and self.__copy_data_item_data(data_item, storage_adapter):
+                return
+            if data is not None and self.__write_data_item_blob(data_item, storage_adapter, data, storage_adapter is old_storage_adapter):
+                return
+            if self.__release_data_item_blob(data_item, storage_adapter, data):
+                return
+            # when the file format changes, the old file has been removed; write the new file before returning.
+            if self.__data_write_queue and data is not None and storage_adapter is old_storage_adapter:
+                self.__data_write_queue.write_data(data_item.uuid, storage_adapter, data_item, data, data_item.data_descriptor)
+            else:
+                storage_adapter.update_data(data_item, data, data_item.data_descriptor)
+
+    def __copy_data_item_data(self, data_item: DataItem.DataItem, storage_adapter: DataItemStorageAdapter) -> bool:
+        # a data item copied from another data item in this project, with the data of neither changed since, copies
+        # the storage of the source instead of writing the data.
+        source_data_item = data_item.data_copy_source
+        source_storage_adapter = self.__storage_adapter_map.get(source_data_item.uuid) if source_data_item else None
+        if source_data_item and source_storage_adapter and not self.is_write_delayed(source_data_item):
+            self.flush_data(source_data_item.uuid)
+            self.flush_data(data_item.uuid)
+            data_blob_store = self._get_data_blob_store()
+            if source_storage_adapter.data_blob_key and data_blob_store:
+                storage_adapter.set_data_blob(data_item, data_blob_store, source_storage_adapter.data_blob_key, None)
+                return True
+            return storage_adapter.copy_data(data_item, source_storage_adapter)
+        return False
+
+    def __write_data_item_blob(self, data_item: DataItem.DataItem, storage_adapter: DataItemStorageAdapter, data: _NDArray, is_write_behind: bool) -> bool:
+        # with deduplication, the data is stored in the data blob store and the storage handler only stores properties.
+        # the data is hashed and stored by the data writer, if there is one.
+        data_blob_store = self._get_data_blob_store() if self.storage_deduplication else None
+        if not data_blob_store:
+            return False
+        if self.__data_write_queue and is_write_behind:
+            self.__data_write_queue.write_data_blob(data_item.uuid, storage_adapter, data_item, data, data_blob_store)
+        else:
+            self.flush_data(data_item.uuid)
+            storage_adapter.update_data_blob(data_item, data, data_blob_store)
+        return True
+
+    def __release_data_item_blob(self, data_item: DataItem.DataItem, storage_adapter: DataItemStorageAdapter, data: typing.Optional[_NDArray]) -> bool:
+        # move the data of a data item from the data blob store back to its storage handler, if required. the data is
+        # written before the properties so that the data item has data in storage at all times.
+        data_blob_store = self._get_data_blob_store()
+        if not data_blob_store:
+            return False
+        if self.__data_write_queue and self.__data_write_queue.is_writing_data_blob(data_item.uuid):
+            # the data is about to be stored in the data blob store.
+            self.flush_data(data_item.uuid)
+        data_blob_key = storage_adapter.data_blob_key
+        if not data_blob_key:
+            return False
+        self.flush_data(data_item.uuid)
+        storage_adapter.update_data(data_item, data, data_item.data_descriptor)
+        storage_adapter.data_blob_key = None
+        storage_adapter.rewrite_item(data_item)
+        data_blob_store.remove_reference(data_blob_key)
+        return True
+
+    def __write_data_item_data_slice(self, data_item: DataItem.DataItem, dst_slice: typing.Sequence[slice], data: _NDArray) -> None:
+        if not self.is_write_delayed(data_item):
+            n_bytes = typing.cast(int, numpy.prod(data.shape, dtype=numpy.int64)) * numpy.dtype(data.dtype).itemsize
+            old_storage_adapter = self.__storage_adapter_map.get(data_item.uuid)
+            storage_adapter = self.__ensure_valid_storage_adapter(data_item, n_bytes, False)
+            self._storage_handler_will_write(storage_adapter.storage_handler)
+            # partial writes are not deduplicated. data is the complete data, so write all of it.
+            if self.__release_data_item_blob(data_item, storage_adapter, data):
+                return
+            if self.__data_write_queue and storage_adapter is old_storage_adapter:
+                self.__data_write_queue.write_data_slice(data_item.uuid, storage_adapter, data_item, dst_slice, data, data_item.data_descriptor)
+            else:
+                storage_adapter.update_data_slice(data_item, dst_slice, data, data_item.data_descriptor)
 
     def __reserve_data_item_data(self, data_item: DataItem.DataItem, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: DataAndMetadata.DataDescriptor) -> None:
         n_bytes = typing.cast(int, numpy.prod(data_shape, dtype=numpy.int64)) * numpy.dtype(data_dtype).itemsize
         storage_adapter = self.__ensure_valid_storage_adapter(data_item, n_bytes, False)
+        self._storage_handler_will_write(storage_adapter.storage_handler)
+        self.flush_data(data_item.uuid)
+        self.__release_data_item_blob(data_item, storage_adapter, None)
         storage_adapter.reserve_data(data_item, data_shape, data_dtype, data_descriptor)
 
     def __rewrite_data_item_properties(self, data_item: DataItem.DataItem) -> None:
         if not self.is_write_delayed(data_item):
             storage_adapter = self.__storage_adapter_map.get(data_item.uuid)
             assert storage_adapter
+            self._storage_handler_will_write(storage_adapter.storage_handler)
             storage_adapter.rewrite_item(data_item)
 
     def __restore_item(self, data_item_uuid: uuid.UUID) -> typing.Optional[PersistentDictType]:
-        return self._restore_item(data_item_uuid)
+        properties = self._restore_item(data_item_uuid)
+        if properties is not None:
+            data_blob_key = properties.pop("data_blob", None)
+            if data_blob_key:
+                self.__restored_data_blob_keys[data_item_uuid] = data_blob_key
+        return properties
 
 
 class FileProjectStorageSystemMigrationStage(ProjectStorageSystemMigrationStage):
@@ -897,12 +1440,46 @@ class FileProjectStorageSystemMigrationStage(ProjectStorageSystemMigrationStage)
 
 class FileProjectStorageSystem(ProjectStorageSystem):
 
+    _write_behind = True
+
     _file_handler_factories: typing.List[StorageHandler.StorageHandlerFactoryLike] = [NDataHandler.NDataHandlerFactory(), HDF5Handler.HDF5HandlerFactory()]
 
     def __init__(self, project_path: pathlib.Path, project_data_path: typing.Optional[pathlib.Path] = None) -> None:
         super().__init__()
         self.__project_path = project_path
         self.__project_data_path = project_data_path
+        self.__manifest_items: typing.Dict[str, PersistentDictType] = dict()
+        self.__manifest_written_references: typing.Set[str] = set()
+        # the journal records changes to individual items so that the project file does not need to be rewritten
+        # for each change. the snapshot lock serializes writes to the project file. the journal condition protects
+        # the journal file and wakes the journal thread, which syncs the journal and compacts it into the project file.
+        self.__journal_path = project_path.with_name(project_path.name + ".journal")
+        self.__journal_fp: typing.Optional[typing.BinaryIO] = None
+        self.__journal_generation = 0
+        self.__journal_snapshot_size = 0
+        self.__journal_needs_sync = False
+        self.__journal_replayed = False
+        self.__journal_closing = False
+        self.__journal_condition = threading.Condition(threading.RLock())
+        self.__journal_thread: typing.Optional[threading.Thread] = None
+        self.__snapshot_lock = threading.RLock()
+        self.__data_blob_store: typing.Optional[DataBlobStore] = None
+
+    def close(self) -> None:
+        self.__close_journal()
+        # items written during this session were removed from the manifest on disk when first written. rewrite the
+        # manifest with the remaining items; the written items will be read again (in parallel) when next opened.
+        if self.__manifest_written_references and self.__project_data_path:
+            project_data_path = self.__project_data_path
+            written_keys = set()
+            for reference in self.__manifest_written_references:
+                try:
+                    written_keys.add(pathlib.Path(reference).relative_to(project_data_path).as_posix())
+                except ValueError:
+                    pass
+            self.__write_manifest({k: v for k, v in self.__manifest_items.items() if k not in written_keys})
+            self.__manifest_written_references = set()
+        super().close()
 
     def normalize_project_data_path(self) -> None:
         # in order to be resilient to name changes, first make a list of folders in project_data_folders which
@@ -938,31 +1515,174 @@ class FileProjectStorageSystem(ProjectStorageSystem):
     def project_path(self) -> pathlib.Path:
         return self.__project_path
 
+    @property
+    def _journal_path(self) -> pathlib.Path:
+        return self.__journal_path
+
     def _read_untransformed_properties(self) -> PersistentDictType:
         properties = dict()
         if self.__project_path and self.__project_path.exists():
             with self.__project_path.open("r") as fp:
                 properties = json.load(fp)
+                snapshot_id = _get_journal_snapshot_id(os.fstat(fp.fileno()))
+            # a journal remains if the project was not closed or is open elsewhere. apply it, but do not write here.
+            # the first write will fold it into the project file.
+            if self.__journal_path.exists():
+                with self.__journal_condition:
+                    self.__journal_replayed = _replay_journal(properties, self.__journal_path.read_bytes(), snapshot_id)
         return properties
 
     def _write_untransformed_properties(self, untransformed_properties: PersistentDictType) -> None:
         self.__write_properties_inner(untransformed_properties)
 
+    def _write_untransformed_item_properties(self, name: str, untransformed_item_properties: PersistentDictType, modified: typing.Optional[str]) -> bool:
+        # append the item to the journal. the project file is rewritten when the journal is compacted.
+        untransformed_item_properties = Utility.clean_dict(untransformed_item_properties)
+        if not self.__project_path or "uuid" not in untransformed_item_properties:
+            return False
+        journal_entry: PersistentDictType = {"name": name, "properties": untransformed_item_properties}
+        if modified:
+            journal_entry["modified"] = modified
+        try:
+            with self.__journal_condition:
+                if not self.__journal_fp:
+                    if self.__journal_replayed or not self.__project_path.exists():
+                        return False
+                    stat_result = self.__project_path.stat()
+                    journal_fp = self.__journal_path.open("wb")
+                    journal_fp.write(_encode_journal_line({"version": JOURNAL_VERSION, "snapshot": _get_journal_snapshot_id(stat_result)}))
+                    self.__journal_fp = journal_fp
+                    self.__journal_snapshot_size = stat_result.st_size
+                self.__journal_fp.write(_encode_journal_line(journal_entry))
+                self.__journal_fp.flush()
+                self.__journal_needs_sync = True
+                if not self.__journal_thread:
+                    self.__journal_closing = False
+                    self.__journal_thread = threading.Thread(target=self.__run_journal, name="project journal", daemon=True)
+                    self.__journal_thread.start()
+                self.__journal_condition.notify_all()
+            return True
+        except OSError as e:
+            logging.debug("Unable to write journal %s (%s)", self.__journal_path, e)
+            return False
+
+    def __prepare_properties(self, properties: PersistentDictType) -> PersistentDictType:
+        properties = Utility.clean_dict(properties)
+        project_data_paths = list()
+        for project_data_path in [self.__project_data_path] if self.__project_data_path else []:
+            if project_data_path.parent == self.__project_path.parent:
+                project_data_path = project_data_path.relative_to(project_data_path.parent)
+            project_data_paths.append(project_data_path)
+        project_uuid = uuid.uuid4()
+        properties.setdefault("uuid", str(project_uuid))
+        properties.setdefault("version", PROJECT_VERSION)
+        properties["project_data_folders"] = [str(project_data_path) for project_data_path in project_data_paths]
+        return properties
+
     def __write_properties_inner(self, properties: PersistentDictType) -> None:
         if self.__project_path:
-            # atomically overwrite
-            with Utility.AtomicFileWriter(self.__project_path) as fp:
-                properties = Utility.clean_dict(properties)
-                project_data_paths = list()
-                for project_data_path in [self.__project_data_path] if self.__project_data_path else []:
-                    if project_data_path.parent == self.__project_path.parent:
-                        project_data_path = project_data_path.relative_to(project_data_path.parent)
-                    project_data_paths.append(project_data_path)
-                project_uuid = uuid.uuid4()
-                properties.setdefault("uuid", str(project_uuid))
-                properties.setdefault("version", PROJECT_VERSION)
-                properties["project_data_folders"] = [str(project_data_path) for project_data_path in project_data_paths]
+            with self.__snapshot_lock:
+                # atomically overwrite
+                with Utility.AtomicFileWriter(self.__project_path) as fp:
+                    json.dump(self.__prepare_properties(properties), fp)
+                # the project file contains all changes; the journal is no longer needed.
+                with self.__journal_condition:
+                    self.__reset_journal()
+                    self.__journal_path.unlink(missing_ok=True)
+                    self.__journal_replayed = False
+
+    def __reset_journal(self) -> None:
+        # close the journal file. a compaction in progress will be abandoned. call with the journal condition held.
+        self.__journal_generation += 1
+        if self.__journal_fp:
+            self.__journal_fp.close()
+            self.__journal_fp = None
+        self.__journal_needs_sync = False
+
+    def __close_journal(self) -> None:
+        # stop the journal thread and compact the journal into the project file.
+        with self.__journal_condition:
+            journal_thread = self.__journal_thread
+            self.__journal_thread = None
+            self.__journal_closing = True
+            self.__journal_condition.notify_all()
+        if journal_thread:
+            journal_thread.join()
+        if self.__journal_fp:
+            self.__write_properties_inner(self._untransform_properties(self.get_properties()))
+
+    def __run_journal(self) -> None:
+        while True:
+            with self.__journal_condition:
+                self.__journal_condition.wait_for(lambda: self.__journal_needs_sync or self.__journal_closing)
+                if self.__journal_closing:
+                    return
+                # wait so that appends during the interval are synced together.
+                if self.__journal_condition.wait_for(lambda: self.__journal_closing, _g_journal_sync_interval):
+                    return
+            try:
+                self.__sync_journal()
+                self.__compact_journal_if_needed()
+            except Exception as e:
+                logging.debug("Unable to update journal %s (%s)", self.__journal_path, e)
+
+    def __sync_journal(self) -> None:
+        with self.__journal_condition:
+            if not self.__journal_fp or not self.__journal_needs_sync:
+                return
+            # sync a duplicate descriptor so that appends are not blocked during the sync.
+            fd = os.dup(self.__journal_fp.fileno())
+            self.__journal_needs_sync = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __compact_journal_if_needed(self) -> None:
+        with self.__journal_condition:
+            if not self.__journal_fp:
+                return
+            journal_size = self.__journal_fp.tell()
+            if journal_size < max(self.__journal_snapshot_size, _g_journal_compaction_size):
+                return
+            journal_generation = self.__journal_generation
+        # entries up to journal_size are contained in the properties. later entries are kept in the journal.
+        properties = self.__prepare_properties(self._untransform_properties(self.get_properties()))
+        with self.__snapshot_lock:
+            with self.__journal_condition:
+                if journal_generation != self.__journal_generation:
+                    return
+            temp_path = self.__project_path.with_suffix(".temp")
+            with temp_path.open("w") as fp:
                 json.dump(properties, fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+                snapshot_id = _get_journal_snapshot_id(os.fstat(fp.fileno()))
+            with self.__journal_condition:
+                journal_fp = self.__journal_fp
+                assert journal_fp
+                # allow the journal to be replayed over the new project file in case the journal cannot be rewritten.
+                journal_fp.write(_encode_journal_line({"snapshot": snapshot_id}))
+                journal_fp.flush()
+                os.fsync(journal_fp.fileno())
+            os.replace(temp_path, self.__project_path)
+            with self.__journal_condition:
+                journal_fp = self.__journal_fp
+                assert journal_fp
+                journal_fp.flush()
+                with self.__journal_path.open("rb") as fp:
+                    fp.seek(journal_size)
+                    journal_tail = fp.read()
+                journal_temp_path = self.__journal_path.with_name(self.__journal_path.name + ".temp")
+                with journal_temp_path.open("wb") as fp:
+                    fp.write(_encode_journal_line({"version": JOURNAL_VERSION, "snapshot": snapshot_id}))
+                    fp.write(journal_tail)
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                journal_fp.close()
+                os.replace(journal_temp_path, self.__journal_path)
+                self.__journal_fp = self.__journal_path.open("ab")
+                self.__journal_snapshot_size = snapshot_id[1]
 
     def get_identifier(self) -> str:
         return str(self.__project_path)
@@ -970,6 +1690,9 @@ class FileProjectStorageSystem(ProjectStorageSystem):
     def _get_storage_handler_factory(self, storage_handler_attributes: StorageHandler.StorageHandlerAttributes) -> StorageHandler.StorageHandlerFactoryLike:
         # if there are two handlers, first is small, second is large
         # if there is only one handler, it is used in all cases
+        # if the project uses compression, all data is written to hdf5 since ndata files must be uncompressed.
+        if self.storage_compression in HDF5Handler.compression_options:
+            return HDF5Handler.HDF5HandlerFactory(self.storage_compression)
         is_large_format = storage_handler_attributes.n_bytes > _g_large_format_size
         return self._file_handler_factories[-1] if is_large_format else self._file_handler_factories[0]
 
@@ -981,6 +1704,117 @@ class FileProjectStorageSystem(ProjectStorageSystem):
     def _find_storage_handlers(self) -> typing.Sequence[StorageHandler.StorageHandler]:
         return self.__find_storage_handlers(self.__project_data_path)
 
+    def _get_data_blob_store(self) -> typing.Optional[DataBlobStore]:
+        if not self.__project_data_path:
+            return None
+        # the project data path may change when normalized.
+        data_blob_directory = self.__project_data_path / "blobs"
+        if not self.__data_blob_store:
+            self.__data_blob_store = DataBlobStore(data_blob_directory)
+        self.__data_blob_store.directory = data_blob_directory
+        return self.__data_blob_store
+
+    @property
+    def _manifest_path(self) -> pathlib.Path:
+        # the manifest is a sidecar to the project file. the name avoids clashing with the temporary file used when
+        # writing the project file.
+        return self.__project_path.with_name(self.__project_path.name + ".manifest")
+
+    def __read_manifest(self) -> typing.Dict[str, PersistentDictType]:
+        manifest_path = self._manifest_path
+        if manifest_path.exists():
+            try:
+                with manifest_path.open("r") as fp:
+                    manifest = json.load(fp)
+                if manifest.get("version") == MANIFEST_VERSION:
+                    return typing.cast(typing.Dict[str, PersistentDictType], manifest.get("items", dict()))
+            except Exception as e:
+                logging.debug("Ignoring unreadable manifest %s (%s)", manifest_path, e)
+        return dict()
+
+    def __write_manifest(self, manifest_items: typing.Dict[str, PersistentDictType]) -> None:
+        try:
+            with Utility.AtomicFileWriter(self._manifest_path) as fp:
+                json.dump({"version": MANIFEST_VERSION, "items": manifest_items}, fp)
+        except Exception as e:
+            # the manifest is only a cache; failing to write it is not an error.
+            logging.debug("Unable to write manifest %s (%s)", self._manifest_path, e)
+
+    def _read_storage_handler_properties_list(self) -> typing.Sequence[typing.Tuple[StorageHandler.StorageHandler, typing.Optional[PersistentDictType], typing.Optional[Exception]]]:
+        # read the storage handler properties, using the manifest for files which have not changed (same size, mtime,
+        # and ctime) since the manifest was written. the remaining files are read in parallel. the manifest is then
+        # rewritten if anything changed.
+        directory = self.__project_data_path
+        if not directory or not directory.exists():
+            return list()
+        file_handler_factory_map = {file_handler_factory.get_storage_handler_type(): file_handler_factory for file_handler_factory in self._file_handler_factories}
+        manifest_items = self.__read_manifest()
+        new_manifest_items: typing.Dict[str, PersistentDictType] = dict()
+        results: typing.List[typing.Tuple[StorageHandler.StorageHandler, typing.Optional[PersistentDictType], typing.Optional[Exception]]] = list()
+        unread_file_paths: typing.List[typing.Tuple[pathlib.Path, str, os.stat_result]] = list()
+        for file_path in directory.rglob("*"):
+            if file_path.parent.name not in ("trash", "blobs") and not file_path.name.startswith("."):
+                stat_result = file_path.stat()
+                if not stat.S_ISREG(stat_result.st_mode):
+                    continue
+                key = file_path.relative_to(directory).as_posix()
+                manifest_item = manifest_items.get(key)
+                file_handler_factory = file_handler_factory_map.get(manifest_item.get("type", str())) if manifest_item else None
+                if manifest_item and file_handler_factory and manifest_item.get("stat") == _get_manifest_stat(stat_result):
+                    storage_handler = file_handler_factory.make(file_path)
+                    results.append((storage_handler, copy.deepcopy(manifest_item["properties"]), None))
+                    new_manifest_items[key] = manifest_item
+                else:
+                    unread_file_paths.append((file_path, key, stat_result))
+
+        manifest_time_ns = time.time_ns() - _g_manifest_minimum_age_ns
+
+        def read_file(file_path: pathlib.Path) -> typing.Optional[typing.Tuple[StorageHandler.StorageHandler, typing.Optional[PersistentDictType], typing.Optional[Exception]]]:
+            for file_handler_factory in self._file_handler_factories:
+                if file_handler_factory.is_matching(str(file_path)):
+                    try:
+                        storage_handler = file_handler_factory.make(file_path)
+                        assert storage_handler.is_valid
+                    except Exception as e:
+                        logging.error("Exception reading file: %s", file_path)
+                        logging.error(str(e))
+                        raise
+                    try:
+                        storage_handler_properties = storage_handler.read_properties()
+                        storage_handler.prepare_move()
+                        return storage_handler, storage_handler_properties, None
+                    except Exception as e:
+                        return storage_handler, None, e
+            return None
+
+        if unread_file_paths:
+            with concurrent.futures.ThreadPoolExecutor(thread_name_prefix="read_properties") as executor:
+                read_results = list(executor.map(read_file, [file_path for file_path, key, stat_result in unread_file_paths]))
+            for (file_path, key, stat_result), read_result in zip(unread_file_paths, read_results):
+                if read_result:
+                    results.append(read_result)
+                    storage_handler, storage_handler_properties, exception = read_result
+                    # files changed very recently may change again without changing the stat (coarse time
+                    # resolution). do not add them to the manifest.
+                    if storage_handler_properties is not None and max(stat_result.st_mtime_ns, stat_result.st_ctime_ns) < manifest_time_ns:
+                        new_manifest_items[key] = {"type": storage_handler.storage_handler_type, "stat": _get_manifest_stat(stat_result), "properties": storage_handler_properties}
+        # write the manifest before the properties are passed on since they may be modified during migration.
+        if new_manifest_items != manifest_items:
+            self.__write_manifest(new_manifest_items)
+        self.__manifest_items = new_manifest_items
+        self.__manifest_written_references = set()
+        return results
+
+    def _storage_handler_will_write(self, storage_handler: StorageHandler.StorageHandler) -> None:
+        # the manifest on disk may have a stale entry after the write; remove the manifest when the first item is
+        # written. on Windows, the file change time cannot be used to detect changes, so this is required.
+        if not self.__manifest_written_references:
+            self._manifest_path.unlink(missing_ok=True)
+        self.__manifest_written_references.add(storage_handler.reference)
+        # datasets created by the write use the current compression of the project.
+        if isinstance(storage_handler, HDF5Handler.HDF5Handler):
+            storage_handler.compression = self.storage_compression
+
     def _remove_storage_handler(self, storage_handler: StorageHandler.StorageHandler, *, safe: bool = False) -> None:
         assert self.__project_data_path is not None
         file_path = pathlib.Path(storage_handler.reference)
@@ -1061,6 +1895,7 @@ class FileProjectStorageSystem(ProjectStorageSystem):
                 if target_storage_handler and storage_handler.reference != target_storage_handler.reference:
                     os.makedirs(os.path.dirname(target_storage_handler.reference), exist_ok=True)
                     target_storage_handler.prepare_move()
+                    self._storage_handler_will_write(target_storage_handler)
                     shutil.copyfile(storage_handler.reference, target_storage_handler.reference)
                     shutil.copystat(storage_handler.reference, target_storage_handler.reference)
                     target_storage_handler.write_properties(Migration.transform_from_latest(copy.deepcopy(properties)), datetime.datetime.now())
@@ -1082,6 +1917,7 @@ class FileProjectStorageSystem(ProjectStorageSystem):
                 # close it by "prepare for move".
                 # this should be redesigned so that storage handler lifetime is well defined.
                 # TODO: storage handler open/close is bad design.
+                self._storage_handler_will_write(reader_info.storage_handler)
                 reader_info.storage_handler.write_properties(reader_info.properties, file_datetime)
                 reader_info.storage_handler.prepare_move()
 
@@ -1164,6 +2000,65 @@ class FileProjectStorageSystem(ProjectStorageSystem):
         return storage_handlers
 
 
+def _get_journal_snapshot_id(stat_result: os.stat_result) -> typing.List[int]:
+    # the identity of a project file. replacing the project file changes its identity.
+    return [stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns]
+
+
+def _encode_journal_line(d: PersistentDictType) -> bytes:
+    return (json.dumps(d) + "\n").encode("utf-8")
+
+
+def _replay_journal(properties: PersistentDictType, journal_bytes: bytes, snapshot_id: typing.List[int]) -> bool:
+    """Apply the journal entries to the untransformed properties read from the project file.
+
+    The journal is only applied if it was written for the project file, identified by snapshot id. Each entry replaces
+    an item, identified by uuid, in a root relationship. Entries are idempotent so the journal can be replayed over a
+    project file which already contains some of them. Reading stops at the first incomplete entry.
+
+    Returns whether any entries were applied.
+    """
+    lines = journal_bytes.split(b"\n")[:-1]
+    try:
+        header = json.loads(lines[0]) if lines else dict()
+    except ValueError:
+        return False
+    if not isinstance(header, dict) or header.get("version") != JOURNAL_VERSION:
+        return False
+    snapshot_ids = [header.get("snapshot")]
+    journal_entries = list()
+    for line in lines[1:]:
+        try:
+            journal_entry = json.loads(line)
+        except ValueError:
+            break
+        if not isinstance(journal_entry, dict):
+            break
+        if "snapshot" in journal_entry:
+            snapshot_ids.append(journal_entry["snapshot"])
+        elif isinstance(journal_entry.get("properties"), dict) and isinstance(journal_entry.get("name"), str):
+            journal_entries.append(journal_entry)
+    if snapshot_id not in snapshot_ids:
+        return False
+    for journal_entry in journal_entries:
+        item_properties = journal_entry["properties"]
+        item_list = properties.get(journal_entry["name"], list())
+        for index, item_d in enumerate(item_list):
+            if item_d.get("uuid") == item_properties.get("uuid"):
+                item_list[index] = item_properties
+                break
+        if "modified" in journal_entry:
+            properties["modified"] = journal_entry["modified"]
+    return len(journal_entries) > 0
+
+
+def _get_manifest_stat(stat_result: os.stat_result) -> typing.List[int]:
+    # size, modification time, and change time identify an unchanged file. ndata files have their modification time set
+    # to the data item creation time, so the change time (not settable) is also used. on Windows, the change time is the
+    # creation time and changes are detected by size and modification time only.
+    return [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ctime_ns]
+
+
 def check_file_project_name_is_available(name: str, directory: str) -> ProjectNameResult:
     """Check if the provided project name is available for use.
 
@@ -1223,7 +2118,13 @@ class MemoryStorageHandler(StorageHandler.StorageHandler):
 
     def read_data(self) -> typing.Optional[_NDArray]:
         self.__data_read_event.fire(self.__uuid)
-        return self.__data_map.get(self.__uuid)
+        data = self.__data_map.get(self.__uuid)
+        # the stored array is written in place by partial writes; return a new array, like data read from a file.
+        return numpy.copy(data) if data is not None else None
+
+    def read_data_slice(self, key: typing.Any) -> typing.Optional[_NDArray]:
+        data = self.__data_map.get(self.__uuid)
+        return numpy.array(data[key]) if data is not None else None
 
     def write_properties(self, properties: PersistentDictType, file_datetime: datetime.datetime) -> None:
         self.__data_properties_map[self.__uuid] = Utility.clean_dict(properties)
@@ -1231,9 +2132,23 @@ class MemoryStorageHandler(StorageHandler.StorageHandler):
     def write_data(self, data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
         self.__data_map[self.__uuid] = numpy.copy(data)
 
+    def write_data_slice(self, dst_slice: typing.Sequence[slice], data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
+        existing_data = self.__data_map.get(self.__uuid)
+        if existing_data is not None and existing_data.shape == data.shape and existing_data.dtype == data.dtype:
+            existing_data[tuple(dst_slice)] = data[tuple(dst_slice)]
+        else:
+            self.write_data(data, data_descriptor, file_datetime)
+
     def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
         self.__data_map[self.__uuid] = numpy.zeros(data_shape, data_dtype)
 
+    def copy_from(self, storage_handler: StorageHandler.StorageHandler) -> bool:
+        if not isinstance(storage_handler, MemoryStorageHandler) or storage_handler.__data_map.get(storage_handler.__uuid) is None:
+            return False
+        self.__data_map[self.__uuid] = numpy.copy(storage_handler.__data_map[storage_handler.__uuid])
+        self.__data_properties_map[self.__uuid] = copy.deepcopy(storage_handler.__data_properties_map.get(storage_handler.__uuid, dict()))
+        return True
+
     def prepare_move(self) -> None:
         pass
 
@@ -3,14 +3,19 @@
 """
 from __future__ import annotations
 
+import collections
+import contextlib
+import dataclasses
 import datetime
 import io
 import json
 import os
 import pathlib
 import threading
+import time
 import typing
 import uuid
+import weakref
 
 import h5py
 import numpy
@@ -20,6 +25,7 @@ from nion.data import DataAndMetadata
 from nion.swift.model import StorageHandler
 from nion.swift.model import Utility
 from nion.utils import DateTime
+from nion.utils import Event
 from nion.utils import Geometry
 from nion.utils import Registry
 
@@ -42,19 +48,17 @@ def make_directory_if_needed(directory_path: str) -> None:
         os.makedirs(directory_path)
 
 
-def get_write_chunk_shape_for_data(data_shape: DataAndMetadata.ShapeType, data_dtype: numpy.typing.DTypeLike) -> typing.Optional[DataAndMetadata.ShapeType]:
-    """
-    Calculate an appropriate write chunk shape for a given data shape and dtype.
+# frames or datums larger than this size in bytes are split into several chunks.
+_max_aligned_chunk_size = 16 * 1024 * 1024
 
-    The target chunk size is 580 kB which seems to be a sweet spot according to benchmarks.
-    The algorithm assumes that the data is c-contiguous in memory.
+# the size in bytes and number of slots of the raw data chunk cache for each open file. the cache should hold at least
+# one chunk so that partial reads of a chunk do not read the chunk again. the number of slots should be a prime.
+_g_chunk_cache_nbytes = 32 * 1024 * 1024
+_g_chunk_cache_nslots = 1021
 
-    If the total number of chunks that the calculated chunk shape would lead to is less than 100 (i.e. the file will
-    be less than 58 MB in size) or if the data shape is not suitable for chunking, return None.
-    """
-    data_dtype = numpy.dtype(data_dtype)
 
-    target_chunk_size = 580*1024/data_dtype.itemsize
+def _get_trailing_chunk_shape(data_shape: DataAndMetadata.ShapeType, target_chunk_size: float) -> typing.Optional[typing.List[int]]:
+    # fill the trailing dimensions until the chunk reaches the target number of elements.
     chunk_size = 1
     counter = len(data_shape)
     chunk_shape = [1] * len(data_shape)
@@ -66,9 +70,56 @@ def get_write_chunk_shape_for_data(data_shape: DataAndMetadata.ShapeType, data_d
     if chunk_size == 0: # This means one of the input dimensions was "0", so chunking cannot be used
         return None
 
-    chunk_size //= data_shape[counter]
-    remaining_elements = min(max(target_chunk_size // chunk_size, 1), data_shape[counter])
-    chunk_shape[counter] = int(remaining_elements)
+    if counter < len(data_shape):
+        chunk_size //= data_shape[counter]
+        remaining_elements = min(max(target_chunk_size // chunk_size, 1), data_shape[counter])
+        chunk_shape[counter] = int(remaining_elements)
+
+    return chunk_shape
+
+
+def _get_aligned_chunk_shape(data_shape: DataAndMetadata.ShapeType, data_dtype: numpy.dtype[typing.Any], data_descriptor: DataAndMetadata.DataDescriptor) -> typing.Optional[typing.List[int]]:
+    # align the chunks to frames of sequences and datums of collections.
+    sequence_dimension_count = 1 if data_descriptor.is_sequence else 0
+    collection_dimension_count = data_descriptor.collection_dimension_count
+    collection_shape = data_shape[sequence_dimension_count:sequence_dimension_count + collection_dimension_count]
+    datum_shape = data_shape[sequence_dimension_count + collection_dimension_count:]
+    if not all(data_shape):
+        return None
+    datum_size = int(numpy.prod(datum_shape, dtype=numpy.int64)) * data_dtype.itemsize
+    frame_size = datum_size * int(numpy.prod(collection_shape, dtype=numpy.int64))
+    if datum_size > _max_aligned_chunk_size:
+        return _get_trailing_chunk_shape(data_shape, 580*1024/data_dtype.itemsize)
+    if sequence_dimension_count and frame_size <= _max_aligned_chunk_size:
+        return [1] + list(collection_shape) + list(datum_shape)
+    collection_chunk_shape = _get_trailing_chunk_shape(collection_shape, 580*1024/datum_size) or list()
+    return [1] * sequence_dimension_count + collection_chunk_shape + list(datum_shape)
+
+
+def get_write_chunk_shape_for_data(data_shape: DataAndMetadata.ShapeType, data_dtype: numpy.typing.DTypeLike, data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor] = None) -> typing.Optional[DataAndMetadata.ShapeType]:
+    """
+    Calculate an appropriate write chunk shape for a given data shape and dtype.
+
+    The target chunk size is 580 kB which seems to be a sweet spot according to benchmarks.
+    The algorithm assumes that the data is c-contiguous in memory.
+
+    If a data descriptor for a sequence or collection is given, the chunks are aligned to the way the data is read
+    for display. Each chunk of a sequence holds one frame, so that reading a frame reads a single chunk. Each chunk of
+    a collection holds complete datums, so that reading the datum at a navigation position reads a single chunk.
+    Frames which are too large are chunked as collections and datums which are too large are chunked as plain data.
+
+    If the total number of chunks that the calculated chunk shape would lead to is less than 100 (i.e. the file will
+    be less than 58 MB in size) or if the data shape is not suitable for chunking, return None.
+    """
+    data_dtype = numpy.dtype(data_dtype)
+
+    if data_descriptor and (data_descriptor.is_sequence or data_descriptor.is_collection) and data_descriptor.expected_dimension_count == len(data_shape):
+        chunk_shape = _get_aligned_chunk_shape(data_shape, data_dtype, data_descriptor)
+    else:
+        chunk_shape = _get_trailing_chunk_shape(data_shape, 580*1024/data_dtype.itemsize)
+
+    if chunk_shape is None:
+        return None
 
     n_chunks = 1
     for i in range(len(chunk_shape)):
@@ -79,16 +130,77 @@ def get_write_chunk_shape_for_data(data_shape: DataAndMetadata.ShapeType, data_d
     return tuple(chunk_shape)
 
 
+# the compression filters that may be used for data, by name. only filters built into h5py are used so that the
+# files can be read without plug-ins. the shuffle filter improves the compression ratio of multibyte numeric data.
+compression_options: typing.Mapping[str, PersistentDictType] = {
+    "gzip": {"compression": "gzip", "compression_opts": 1, "shuffle": True},
+    "lzf": {"compression": "lzf", "shuffle": True},
+}
+
+
+def get_dataset_options(data_shape: DataAndMetadata.ShapeType, data_dtype: numpy.typing.DTypeLike, compression: typing.Optional[str] = None, data_descriptor: typing.Optional[DataAndMetadata.DataDescriptor] = None) -> PersistentDictType:
+    """
+    Return the chunk and filter options used to create a dataset of the given shape and dtype.
+
+    Compression requires chunked storage. If the data is too small to use the write chunk shape, h5py chooses the
+    chunk shape. Data with an empty dimension and unknown compression names are stored uncompressed.
+    """
+    chunks = get_write_chunk_shape_for_data(data_shape, data_dtype, data_descriptor)
+    dataset_options: PersistentDictType = {"chunks": chunks}
+    if compression is not None and compression in compression_options and len(data_shape) > 0 and all(data_shape):
+        dataset_options["chunks"] = chunks or True
+        dataset_options.update(compression_options[compression])
+    return dataset_options
+
+
 _HDF5FilePointer = typing.Any
 
+# the number of files kept open by the file manager. when more files are open, files which are not in use are closed,
+# least recently used first, and reopened when next used. files in use are never closed, so the limit may be exceeded.
+_g_max_open_files = 128
+
+
+@dataclasses.dataclass(frozen=True)
+class HDF5FileStatistics:
+    """Statistics for the files opened by a file manager."""
+    open_file_count: int
+    access_count: int
+    hit_count: int
+    reopen_count: int
+    reopen_time_s: float
+
+    @property
+    def hit_rate(self) -> float:
+        """Return the fraction of accesses to files that were already open."""
+        return self.hit_count / self.access_count if self.access_count else 1.0
+
+    @property
+    def reopen_latency_s(self) -> float:
+        """Return the average time to reopen a file which was closed by the file manager."""
+        return self.reopen_time_s / self.reopen_count if self.reopen_count else 0.0
+
 
 class HDF5FileEntry:
-    def __init__(self, path: pathlib.Path) -> None:
+    def __init__(self, path: pathlib.Path, rdcc_nbytes: typing.Optional[int] = None, rdcc_nslots: typing.Optional[int] = None, file_manager: typing.Optional[HDF5FileManager] = None) -> None:
         self.__lock = threading.RLock()
         self.__path = path
         self.__fp: typing.Optional[_HDF5FilePointer] = None
+        # the chunk cache settings; use the module settings if not specified.
+        self.__rdcc_nbytes = rdcc_nbytes
+        self.__rdcc_nslots = rdcc_nslots
+        self.__file_manager = file_manager
+        # the file is in use while it is being accessed or while datasets read from it are referenced.
+        self.__access_count = 0
+        self.__datasets: weakref.WeakSet[typing.Any] = weakref.WeakSet()
+        self.__was_opened = False
+        # fired when the file is closed so that users can release objects referring to the file.
+        self.closed_event = Event.Event()
         self._count = 0
 
+    @property
+    def path(self) -> pathlib.Path:
+        return self.__path
+
     @property
     def fp(self) -> _HDF5FilePointer:
         with self.__lock:
@@ -96,49 +208,160 @@ class HDF5FileEntry:
             assert self.__fp
             return self.__fp
 
+    @contextlib.contextmanager
+    def access(self) -> typing.Iterator[None]:
+        # keep the file open for the duration of an operation.
+        with self.__lock:
+            is_hit = self.__fp is not None
+            self.open()
+            if self.__file_manager:
+                self.__file_manager._file_accessed(self, is_hit)
+            self.__access_count += 1
+            try:
+                yield
+            finally:
+                self.__access_count -= 1
+
+    def track_dataset(self, dataset: typing.Any) -> None:
+        # keep the file open while the dataset is referenced.
+        with self.__lock:
+            self.__datasets.add(dataset)
+
     def open(self) -> None:
         with self.__lock:
             if not self.__fp:
+                start_time = time.perf_counter()
                 self.__path.parent.mkdir(parents=True, exist_ok=True)
-                self.__fp = h5py.File(self.__path, "a")
+                rdcc_nbytes = self.__rdcc_nbytes if self.__rdcc_nbytes is not None else _g_chunk_cache_nbytes
+                rdcc_nslots = self.__rdcc_nslots if self.__rdcc_nslots is not None else _g_chunk_cache_nslots
+                self.__fp = h5py.File(self.__path, "a", rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots)
+                if self.__file_manager:
+                    self.__file_manager._file_opened(self, self.__was_opened, time.perf_counter() - start_time)
+                self.__was_opened = True
 
     def close(self) -> None:
         with self.__lock:
-            if self.__fp:
-                self.__fp.close()
+            self.__close()
+
+    def _close_if_idle(self) -> bool:
+        # close the file unless it is in use. do not wait for another thread which is using the file.
+        if not self.__lock.acquire(blocking=False):
+            return False
+        try:
+            if self.__access_count > 0 or len(self.__datasets) > 0:
+                return False
+            self.__close()
+            return True
+        finally:
+            self.__lock.release()
+
+    def __close(self) -> None:
+        if self.__fp:
+            self.closed_event.fire()
+            self.__fp.close()
             self.__fp = None
+            if self.__file_manager:
+                self.__file_manager._file_closed(self)
 
 
 class HDF5FileManager:
-    def __init__(self) -> None:
+    def __init__(self, max_open_files: typing.Optional[int] = None) -> None:
         self.__file_entries: typing.Dict[pathlib.Path, HDF5FileEntry] = dict()
+        # the entries with open files, least recently used first.
+        self.__open_file_entries: collections.OrderedDict[pathlib.Path, HDF5FileEntry] = collections.OrderedDict()
         self.__lock = threading.RLock()
+        self.__max_open_files = max_open_files
+        self.__access_count = 0
+        self.__hit_count = 0
+        self.__reopen_count = 0
+        self.__reopen_time_s = 0.0
 
     def _clear(self) -> None:
         # for tests only
         self.__file_entries.clear()
+        self.__open_file_entries.clear()
+        self.reset_statistics()
 
     @property
     def _open_count(self) -> int:
         return len(self.__file_entries.items())
 
+    @property
+    def max_open_files(self) -> int:
+        return self.__max_open_files if self.__max_open_files is not None else _g_max_open_files
+
+    @max_open_files.setter
+    def max_open_files(self, value: typing.Optional[int]) -> None:
+        self.__max_open_files = value
+        self.__close_idle_files(None)
+
+    @property
+    def statistics(self) -> HDF5FileStatistics:
+        with self.__lock:
+            return HDF5FileStatistics(len(self.__open_file_entries), self.__access_count, self.__hit_count, self.__reopen_count, self.__reopen_time_s)
+
+    def reset_statistics(self) -> None:
+        with self.__lock:
+            self.__access_count = 0
+            self.__hit_count = 0
+            self.__reopen_count = 0
+            self.__reopen_time_s = 0.0
+
     def open(self, path: pathlib.Path) -> HDF5FileEntry:
         with self.__lock:
             if not path in self.__file_entries:
-                self.__file_entries[path] = HDF5FileEntry(path)
+                self.__file_entries[path] = HDF5FileEntry(path, file_manager=self)
             self.__file_entries[path]._count += 1
             return self.__file_entries[path]
 
     def close(self, path: pathlib.Path) -> None:
+        # entries are closed outside of the lock since closing waits for other threads using the entry.
+        file_entry = None
         with self.__lock:
             self.__file_entries[path]._count -= 1
             if self.__file_entries[path]._count == 0:
-                self.__file_entries.pop(path).close()
+                file_entry = self.__file_entries.pop(path)
+        if file_entry:
+            file_entry.close()
 
     def force_close(self, path: pathlib.Path) -> None:
         with self.__lock:
-            if path in self.__file_entries:
-                self.__file_entries[path].close()
+            file_entry = self.__file_entries.get(path)
+        if file_entry:
+            file_entry.close()
+
+    def _file_accessed(self, file_entry: HDF5FileEntry, is_hit: bool) -> None:
+        with self.__lock:
+            self.__access_count += 1
+            self.__hit_count += 1 if is_hit else 0
+            if file_entry.path in self.__open_file_entries:
+                self.__open_file_entries.move_to_end(file_entry.path)
+
+    def _file_opened(self, file_entry: HDF5FileEntry, is_reopen: bool, duration_s: float) -> None:
+        with self.__lock:
+            self.__open_file_entries[file_entry.path] = file_entry
+            self.__open_file_entries.move_to_end(file_entry.path)
+            if is_reopen:
+                self.__reopen_count += 1
+                self.__reopen_time_s += duration_s
+        self.__close_idle_files(file_entry)
+
+    def _file_closed(self, file_entry: HDF5FileEntry) -> None:
+        with self.__lock:
+            if self.__open_file_entries.get(file_entry.path) is file_entry:
+                self.__open_file_entries.pop(file_entry.path)
+
+    def __close_idle_files(self, current_file_entry: typing.Optional[HDF5FileEntry]) -> None:
+        # close the least recently used files which are not in use until the limit is met. this is called while
+        # holding the lock of the current entry, so other entries are only closed if they are not locked.
+        with self.__lock:
+            excess_count = len(self.__open_file_entries) - self.max_open_files
+            file_entries = [file_entry for file_entry in self.__open_file_entries.values() if file_entry is not current_file_entry]
+        for file_entry in file_entries:
+            if excess_count <= 0:
+                break
+            if file_entry._close_if_idle():
+                excess_count -= 1
 
 
 _file_manager = HDF5FileManager()
@@ -148,16 +371,22 @@ class HDF5Handler(StorageHandler.StorageHandler):
     count = 0  # useful for detecting leaks in tests
     open = 0  # useful for detecting unclosed files
 
-    def __init__(self, file_path: typing.Union[str, pathlib.Path]) -> None:
+    def __init__(self, file_path: typing.Union[str, pathlib.Path], compression: typing.Optional[str] = None) -> None:
         self.__file_path = str(file_path)
         self.__lock = threading.RLock()
         self.__file = _file_manager.open(pathlib.Path(self.__file_path))
+        # the dataset is released when the file manager closes the file; it is reopened when next used.
+        self.__file_closed_listener = self.__file.closed_event.listen(self.__file_closed)
         self.__dataset: typing.Any = None
         self._write_count = 0
+        # the compression used when the dataset is created. existing datasets keep their compression.
+        self.compression = compression
         HDF5Handler.count += 1
 
     def close(self) -> None:
         HDF5Handler.count -= 1
+        self.__file_closed_listener.close()
+        self.__file_closed_listener = typing.cast(typing.Any, None)
         self.__close_fp()
         _file_manager.close(pathlib.Path(self.__file_path))
 
@@ -212,7 +441,7 @@ class HDF5Handler(StorageHandler.StorageHandler):
                     self.__dataset = self.__file.fp.create_dataset("data", data=numpy.empty((0,)))
 
     def write_data(self, data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
-        with self.__lock:
+        with self.__lock, self.__file.access():
             assert data is not None
             json_properties = None
             # handle three cases:
@@ -221,8 +450,8 @@ class HDF5Handler(StorageHandler.StorageHandler):
             #   3 - 'data' exists and is the same size (overwrite)
             if not "data" in self.__file.fp:
                 # case 1
-                chunks = get_write_chunk_shape_for_data(data.shape, data.dtype)
-                self.__dataset = self.__file.fp.require_dataset("data", shape=data.shape, dtype=data.dtype, chunks=chunks)
+                dataset_options = get_dataset_options(data.shape, data.dtype, self.compression, data_descriptor)
+                self.__dataset = self.__file.fp.require_dataset("data", shape=data.shape, dtype=data.dtype, **dataset_options)
             else:
                 if self.__dataset is None:
                     self.__dataset = self.__file.fp["data"]
@@ -231,16 +460,31 @@ class HDF5Handler(StorageHandler.StorageHandler):
                     json_properties = self.__dataset.attrs.get("properties", "")
                     self.__close_fp()
                     os.remove(self.__file_path)
-                    chunks = get_write_chunk_shape_for_data(data.shape, data.dtype)
-                    self.__dataset = self.__file.fp.require_dataset("data", shape=data.shape, dtype=data.dtype, chunks=chunks)
+                    dataset_options = get_dataset_options(data.shape, data.dtype, self.compression, data_descriptor)
+                    self.__dataset = self.__file.fp.require_dataset("data", shape=data.shape, dtype=data.dtype, **dataset_options)
             self.__copy_data(data)
             if json_properties is not None:
                 self.__dataset.attrs["properties"] = json_properties
             self.__file.fp.flush()
 
+    def write_data_slice(self, dst_slice: typing.Sequence[slice], data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
+        with self.__lock, self.__file.access():
+            assert data is not None
+            if "data" in self.__file.fp:
+                if self.__dataset is None:
+                    self.__dataset = self.__file.fp["data"]
+                if self.__dataset.shape == data.shape and self.__dataset.dtype == data.dtype:
+                    # write the hyperslab only. if data is the dataset itself, it has already been written.
+                    if not self.__is_dataset(data):
+                        self.__dataset[tuple(dst_slice)] = data[tuple(dst_slice)]
+                        self._write_count += 1
+                    self.__file.fp.flush()
+                    return
+            self.write_data(data, data_descriptor, file_datetime)
+
     def reserve_data(self, data_shape: DataAndMetadata.ShapeType, data_dtype: numpy.typing.DTypeLike, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
         # reserve data of the given shape and dtype, filled with zeros
-        with self.__lock:
+        with self.__lock, self.__file.access():
             json_properties = None
             # first read existing properties and then close existing data set and file.
             if "data" in self.__file.fp:
@@ -251,41 +495,70 @@ class HDF5Handler(StorageHandler.StorageHandler):
                 os.remove(self.__file_path)
                 self.__file.open()
             # reserve the data
-            chunks = get_write_chunk_shape_for_data(data_shape, data_dtype)
-            self.__dataset = self.__file.fp.require_dataset("data", shape=data_shape, dtype=data_dtype, fillvalue=0, chunks=chunks)
+            dataset_options = get_dataset_options(data_shape, data_dtype, self.compression, data_descriptor)
+            self.__dataset = self.__file.fp.require_dataset("data", shape=data_shape, dtype=data_dtype, fillvalue=0, **dataset_options)
             if json_properties is not None:
                 self.__dataset.attrs["properties"] = json_properties
             self.__file.fp.flush()
 
+    def __is_dataset(self, data: _NDArray) -> bool:
+        # datasets read from the file are distinct objects from the dataset held here, but compare equal.
+        return id(data) == id(self.__dataset) or (isinstance(data, h5py.Dataset) and data == self.__dataset)
+
     def __copy_data(self, data: _NDArray) -> None:
-        if id(data) != id(self.__dataset):
+        if not self.__is_dataset(data):
             self.__dataset[:] = data
             self._write_count += 1
 
     def write_properties(self, properties: PersistentDictType, file_datetime: datetime.datetime) -> None:
-        with self.__lock:
+        with self.__lock, self.__file.access():
             self.__ensure_dataset()
             self.__write_properties_to_dataset(properties)
             self.__file.fp.flush()
 
     def read_properties(self) -> PersistentDictType:
-        with self.__lock:
+        with self.__lock, self.__file.access():
             self.__ensure_dataset()
             json_properties = self.__dataset.attrs.get("properties", "")
             return typing.cast(PersistentDictType, json.loads(json_properties))
 
     def read_data(self) -> typing.Optional[_NDArray]:
-        with self.__lock:
+        with self.__lock, self.__file.access():
+            self.__ensure_dataset()
+            if self.__dataset.shape == (0, ):
+                return None
+            # return a separate dataset object. the file manager keeps the file open while it is referenced.
+            dataset = self.__file.fp["data"]
+            self.__file.track_dataset(dataset)
+            return typing.cast(typing.Optional[_NDArray], dataset)
+
+    def read_data_slice(self, key: typing.Any) -> typing.Optional[_NDArray]:
+        with self.__lock, self.__file.access():
             self.__ensure_dataset()
             if self.__dataset.shape == (0, ):
                 return None
-            return typing.cast(typing.Optional[_NDArray], self.__dataset)
+            # only the chunks which intersect the region are read from the file.
+            return numpy.asarray(self.__dataset[key])
+
+    def copy_from(self, storage_handler: StorageHandler.StorageHandler) -> bool:
+        if not isinstance(storage_handler, HDF5Handler) or not os.path.isfile(storage_handler.__file_path):
+            return False
+        with storage_handler.__lock, storage_handler.__file.access():
+            storage_handler.__file.fp.flush()
+            with self.__lock:
+                self.__close_fp()
+                _file_manager.force_close(pathlib.Path(self.__file_path))
+                Utility.clone_file(pathlib.Path(storage_handler.__file_path), pathlib.Path(self.__file_path))
+        return True
 
     def remove(self) -> None:
         self.__close_fp()
         if os.path.isfile(self.__file_path):
             os.remove(self.__file_path)
 
+    def __file_closed(self) -> None:
+        self.__dataset = None
+
     def __close_fp(self) -> None:
         self.__dataset = None
         self.__file.close()
@@ -293,6 +566,9 @@ class HDF5Handler(StorageHandler.StorageHandler):
 
 class HDF5HandlerFactory(StorageHandler.StorageHandlerFactoryLike):
 
+    def __init__(self, compression: typing.Optional[str] = None) -> None:
+        self.__compression = compression
+
     def get_storage_handler_type(self) -> str:
         return "hdf5"
 
@@ -302,7 +578,7 @@ class HDF5HandlerFactory(StorageHandler.StorageHandlerFactoryLike):
         return False
 
     def make(self, file_path: pathlib.Path) -> StorageHandler.StorageHandler:
-        return HDF5Handler(self.make_path(file_path))
+        return HDF5Handler(self.make_path(file_path), self.__compression)
 
     def make_path(self, file_path: pathlib.Path) -> str:
         return str(file_path.with_suffix(self.get_extension()))
@@ -34,6 +34,20 @@ _NDArray = numpy.typing.NDArray[typing.Any]
 # http://proger.i-forge.net/MS-DOS_date_and_time_format/OFz
 
 
+# when enabled, read_data returns a copy-on-write memory map over the uncompressed data.npy member instead of loading
+# the full array. only the pages that are accessed are read from disk; pages that are written are copied privately.
+# files are then always rewritten by writing a temporary file and replacing the original so that existing maps stay
+# valid; data slices are not written in place. this is not supported on platforms where a mapped file cannot be
+# replaced (Windows).
+_g_memory_map_data = False
+
+# the maximum number of bytes written to the file at once when writing data.
+_write_chunk_size = 4 * 1024 * 1024
+
+# sizes, offsets, and counts at or above this limit are written using zip64 extensions.
+_zip64_limit = 0xFFFFFFFF
+
+
 def make_directory_if_needed(directory_path: str) -> None:
     """
         Make the directory path, if needed.
@@ -45,7 +59,7 @@ def make_directory_if_needed(directory_path: str) -> None:
         os.makedirs(directory_path)
 
 
-def write_local_file(fp: typing.BinaryIO, name_bytes: bytes, writer: typing.Callable[[typing.BinaryIO], int], dt: datetime.datetime) -> typing.Tuple[int, int]:
+def write_local_file(fp: typing.BinaryIO, name_bytes: bytes, writer: typing.Callable[[typing.BinaryIO], int], dt: datetime.datetime, zip64: bool = False) -> typing.Tuple[int, int]:
     """
         Writes a zip file local file header structure at the current file position.
 
@@ -55,9 +69,10 @@ def write_local_file(fp: typing.BinaryIO, name_bytes: bytes, writer: typing.Call
         :param name: the name of the file
         :param writer: a function taking an fp parameter to do the writing, returns crc32
         :param dt: the datetime to write to the archive
+        :param zip64: whether to write the lengths in a zip64 extra field; required for data of 4 GB or more
     """
     fp.write(struct.pack('I', 0x04034b50))  # local file header
-    fp.write(struct.pack('H', 10))          # extract version (default)
+    fp.write(struct.pack('H', 45 if zip64 else 10))  # extract version (default or zip64)
     fp.write(struct.pack('H', 0))           # general purpose bits
     fp.write(struct.pack('H', 0))           # compression method
     msdos_date = int(dt.year - 1980) << 9 | int(dt.month) << 5 | int(dt.day)
@@ -67,20 +82,29 @@ def write_local_file(fp: typing.BinaryIO, name_bytes: bytes, writer: typing.Call
     crc32_pos = fp.tell()
     fp.write(struct.pack('I', 0))           # crc32 placeholder
     data_len_pos = fp.tell()
-    fp.write(struct.pack('I', 0))           # compressed length placeholder
-    fp.write(struct.pack('I', 0))           # uncompressed length placeholder
+    fp.write(struct.pack('I', 0xFFFFFFFF if zip64 else 0))  # compressed length placeholder
+    fp.write(struct.pack('I', 0xFFFFFFFF if zip64 else 0))  # uncompressed length placeholder
     fp.write(struct.pack('H', len(name_bytes)))   # name length
-    fp.write(struct.pack('H', 0))           # extra length
+    fp.write(struct.pack('H', 20 if zip64 else 0))  # extra length
     fp.write(name_bytes)
+    zip64_pos = fp.tell()
+    if zip64:
+        fp.write(struct.pack('<HHQQ', 0x0001, 16, 0, 0))  # zip64 extra field with length placeholders
     data_start_pos = fp.tell()
     crc32 = writer(fp)
     data_end_pos = fp.tell()
     data_len = data_end_pos - data_start_pos
     fp.seek(crc32_pos)
     fp.write(struct.pack('I', crc32))       # crc32
-    fp.seek(data_len_pos)
-    fp.write(struct.pack('I', data_len))    # compressed length placeholder
-    fp.write(struct.pack('I', data_len))    # uncompressed length placeholder
+    if zip64:
+        fp.seek(zip64_pos + 4)
+        fp.write(struct.pack('<QQ', data_len, data_len))  # uncompressed and compressed length
+    else:
+        if data_len >= 0xFFFFFFFF:
+            raise IOError("Data too large for zip file without zip64.")
+        fp.seek(data_len_pos)
+        fp.write(struct.pack('I', data_len))    # compressed length placeholder
+        fp.write(struct.pack('I', data_len))    # uncompressed length placeholder
     fp.seek(data_end_pos)
     return data_len, crc32
 
@@ -96,9 +120,16 @@ def write_directory_data(fp: typing.BinaryIO, offset: int, name_bytes: bytes, da
         :param crc32: the crc32 of the data to be written
         :param dt: the datetime to write to the archive
     """
+    # lengths and offset which do not fit are written to a zip64 extra field, in this order.
+    zip64_values = list()
+    if data_len >= _zip64_limit:
+        zip64_values.extend([data_len, data_len])
+    if offset >= _zip64_limit:
+        zip64_values.append(offset)
+    extra_bytes = struct.pack(f'<HH{len(zip64_values)}Q', 0x0001, 8 * len(zip64_values), *zip64_values) if zip64_values else bytes()
     fp.write(struct.pack('I', 0x02014b50))  # central directory header
-    fp.write(struct.pack('H', 10))          # made by version (default)
-    fp.write(struct.pack('H', 10))          # extract version (default)
+    fp.write(struct.pack('H', 45 if zip64_values else 10))  # made by version (default or zip64)
+    fp.write(struct.pack('H', 45 if zip64_values else 10))  # extract version (default or zip64)
     fp.write(struct.pack('H', 0))           # general purpose bits
     fp.write(struct.pack('H', 0))           # compression method
     msdos_date = int(dt.year - 1980) << 9 | int(dt.month) << 5 | int(dt.day)
@@ -106,16 +137,17 @@ def write_directory_data(fp: typing.BinaryIO, offset: int, name_bytes: bytes, da
     fp.write(struct.pack('H', msdos_time))  # extract version (default)
     fp.write(struct.pack('H', msdos_date))  # extract version (default)
     fp.write(struct.pack('I', crc32))       # crc32
-    fp.write(struct.pack('I', data_len))    # compressed length
-    fp.write(struct.pack('I', data_len))    # uncompressed length
+    fp.write(struct.pack('I', 0xFFFFFFFF if data_len >= _zip64_limit else data_len))  # compressed length
+    fp.write(struct.pack('I', 0xFFFFFFFF if data_len >= _zip64_limit else data_len))  # uncompressed length
     fp.write(struct.pack('H', len(name_bytes)))   # name length
-    fp.write(struct.pack('H', 0))           # extra length
+    fp.write(struct.pack('H', len(extra_bytes)))  # extra length
     fp.write(struct.pack('H', 0))           # comments length
     fp.write(struct.pack('H', 0))           # disk number
     fp.write(struct.pack('H', 0))           # internal file attributes
     fp.write(struct.pack('I', 0))           # external file attributes
-    fp.write(struct.pack('I', offset))      # relative offset of file header
+    fp.write(struct.pack('I', 0xFFFFFFFF if offset >= _zip64_limit else offset))  # relative offset of file header
     fp.write(name_bytes)
+    fp.write(extra_bytes)
 
 
 def write_end_of_directory(fp: typing.BinaryIO, dir_size: int, dir_offset: int, count: int) -> None:
@@ -126,7 +158,29 @@ def write_end_of_directory(fp: typing.BinaryIO, dir_size: int, dir_offset: int,
         :param dir_size: the total size of the directory
         :param dir_offset: the start of the first directory header
         :param count: the count of files
+
+        If the values do not fit, a zip64 end of central directory record and locator are
+        written first.
     """
+    if dir_size >= _zip64_limit or dir_offset >= _zip64_limit or count >= 0xFFFF:
+        zip64_eocd_pos = fp.tell()
+        fp.write(struct.pack('I', 0x06064b50))  # zip64 end of central directory record
+        fp.write(struct.pack('<Q', 44))         # size of remaining record
+        fp.write(struct.pack('H', 45))          # made by version (zip64)
+        fp.write(struct.pack('H', 45))          # extract version (zip64)
+        fp.write(struct.pack('I', 0))           # disk number
+        fp.write(struct.pack('I', 0))           # disk number
+        fp.write(struct.pack('<Q', count))      # number of files
+        fp.write(struct.pack('<Q', count))      # number of files
+        fp.write(struct.pack('<Q', dir_size))   # central directory size
+        fp.write(struct.pack('<Q', dir_offset))  # central directory offset
+        fp.write(struct.pack('I', 0x07064b50))  # zip64 end of central directory locator
+        fp.write(struct.pack('I', 0))           # disk number
+        fp.write(struct.pack('<Q', zip64_eocd_pos))  # zip64 end of central directory record offset
+        fp.write(struct.pack('I', 1))           # number of disks
+        count = min(count, 0xFFFF)
+        dir_size = min(dir_size, 0xFFFFFFFF)
+        dir_offset = min(dir_offset, 0xFFFFFFFF)
     fp.write(struct.pack('I', 0x06054b50))  # central directory header
     fp.write(struct.pack('H', 0))           # disk number
     fp.write(struct.pack('H', 0))           # disk number
@@ -137,6 +191,56 @@ def write_end_of_directory(fp: typing.BinaryIO, dir_size: int, dir_offset: int,
     fp.write(struct.pack('H', 0))           # comment len
 
 
+def write_npy(fp: typing.BinaryIO, data: _NDArray) -> int:
+    """
+        Write data in npy format at the current file position in a single pass.
+
+        Returns the crc32 of the written bytes.
+
+        :param fp: the file point to which to write the data
+        :param data: the data to write
+
+        The data is written in chunks of at most _write_chunk_size bytes directly from the array memory. Non-contiguous
+        data is copied one chunk at a time. The written bytes are the same as numpy.save.
+    """
+    if data.dtype.hasobject:
+        # object arrays are pickled by numpy.save; there is no streaming path. read back the bytes for the crc.
+        start_pos = fp.tell()
+        numpy.save(fp, data)
+        end_pos = fp.tell()
+        fp.seek(start_pos)
+        crc32 = binascii.crc32(fp.read(end_pos - start_pos))
+        fp.seek(end_pos)
+        return crc32 & 0xFFFFFFFF
+    header = numpy.lib.format.header_data_from_array_1_0(data)
+    header_io = io.BytesIO()
+    try:
+        numpy.lib.format.write_array_header_1_0(header_io, header)
+    except ValueError:
+        # header too large for version 1.0
+        header_io = io.BytesIO()
+        numpy.lib.format.write_array_header_2_0(header_io, header)
+    header_bytes = header_io.getvalue()
+    fp.write(header_bytes)
+    crc32 = binascii.crc32(header_bytes)
+    # fortran ordered data is written in fortran order; the transpose is c-contiguous.
+    data_c = data.T if header["fortran_order"] else data
+    if data_c.flags.c_contiguous:
+        data_bytes = memoryview(data_c.reshape(-1).view(numpy.uint8))
+        for offset in range(0, len(data_bytes), _write_chunk_size):
+            chunk = data_bytes[offset:offset + _write_chunk_size]
+            fp.write(chunk)
+            crc32 = binascii.crc32(chunk, crc32)
+    else:
+        buffer_size = max(_write_chunk_size // max(data_c.itemsize, 1), 1)
+        for chunk_array in numpy.nditer(data_c, flags=["external_loop", "buffered", "zerosize_ok"], buffersize=buffer_size, order="C"):
+            # with a single operand, each iteration is an array, not a tuple.
+            chunk_bytes = typing.cast(_NDArray, chunk_array).tobytes("C")
+            fp.write(chunk_bytes)
+            crc32 = binascii.crc32(chunk_bytes, crc32)
+    return crc32 & 0xFFFFFFFF
+
+
 def write_zip_fp(fp: typing.BinaryIO, data: typing.Optional[_NDArray], properties: PersistentDictType,
                  dir_data_list: typing.Optional[typing.List[typing.Tuple[int, bytes, int, int]]] = None) -> None:
     """
@@ -164,17 +268,11 @@ def write_zip_fp(fp: typing.BinaryIO, data: typing.Optional[_NDArray], propertie
     if data is not None:
         offset_data = fp.tell()
         def write_data(fp: typing.BinaryIO) -> int:
-            numpy_start_pos = fp.tell()
-            numpy.save(fp, data)
-            numpy_end_pos = fp.tell()
-            fp.seek(numpy_start_pos)
             assert data is not None
-            data_c = numpy.require(data, dtype=data.dtype, requirements=["C_CONTIGUOUS"])
-            header_data = fp.read((numpy_end_pos - numpy_start_pos) - data_c.nbytes)  # read the header
-            data_crc32 = binascii.crc32(data_c.data, binascii.crc32(header_data)) & 0xFFFFFFFF
-            fp.seek(numpy_end_pos)
-            return data_crc32
-        data_len, crc32 = write_local_file(fp, b"data.npy", write_data, dt)
+            return write_npy(fp, data)
+        # the npy header is at most 64 KB (version 2.0 headers are larger but only used for many fields).
+        is_zip64 = data.nbytes + 65536 >= _zip64_limit
+        data_len, crc32 = write_local_file(fp, b"data.npy", write_data, dt, is_zip64)
         dir_data_list.append((offset_data, b"data.npy", data_len, crc32))
     if properties is not None:
         json_str = str()
@@ -222,8 +320,19 @@ def write_zip(file_path: str, data: typing.Optional[_NDArray], properties: Persi
 
         See write_zip_fp.
     """
-    with open(file_path, "w+b") as fp:
-        write_zip_fp(fp, data, properties)
+    if _g_memory_map_data and os.path.exists(file_path):
+        # existing memory maps refer to the old file; write a new file and replace the old one.
+        temp_file_path = file_path + ".temp"
+        try:
+            with open(temp_file_path, "w+b") as fp:
+                write_zip_fp(fp, data, properties)
+            os.replace(temp_file_path, file_path)
+        finally:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+    else:
+        with open(file_path, "w+b") as fp:
+            write_zip_fp(fp, data, properties)
 
 
 def parse_zip(fp: typing.BinaryIO) -> typing.Tuple[typing.Dict[int, typing.Tuple[bytes, int, int, int]], typing.Dict[bytes, typing.Tuple[int, int]], typing.Optional[typing.Tuple[int, int]]]:
@@ -243,11 +352,98 @@ def parse_zip(fp: typing.BinaryIO) -> typing.Tuple[typing.Dict[int, typing.Tuple
         The end of central directory is a tuple consisting of the location of the end of
         central directory header and the location of the first directory header.
 
-        This method will seek to location 0 of fp and leave fp at end of file.
+        The members are found from the central directory, located from the end of central
+        directory record at the end of the file. If the central directory cannot be read,
+        the local file headers are walked from the start of the file instead.
+
+        The position of fp is undefined after this method.
     """
+    zip_index = _parse_zip_central_directory(fp)
+    if zip_index:
+        return zip_index
+    return _parse_zip_local_files(fp)
+
+
+def _parse_zip_central_directory(fp: typing.BinaryIO) -> typing.Optional[typing.Tuple[typing.Dict[int, typing.Tuple[bytes, int, int, int]], typing.Dict[bytes, typing.Tuple[int, int]], typing.Optional[typing.Tuple[int, int]]]]:
+    # find the end of central directory record in the tail of the file, then read the central directory with a single
+    # read. the local file headers are only read to find the start of the data. returns None if not valid.
+    local_files: typing.Dict[int, typing.Tuple[bytes, int, int, int]] = dict()
+    dir_files: typing.Dict[bytes, typing.Tuple[int, int]] = dict()
+    file_size = fp.seek(0, os.SEEK_END)
+    tail_size = min(file_size, 22 + 65535)  # end of central directory record plus maximum comment
+    tail_pos = file_size - tail_size
+    fp.seek(tail_pos)
+    tail = fp.read(tail_size)
+    eocd_index = tail.rfind(b"PK\x05\x06")
+    if eocd_index < 0 or eocd_index + 22 > len(tail):
+        return None
+    eocd_pos = tail_pos + eocd_index
+    count, dir_size, dir_pos = struct.unpack_from("<HII", tail, eocd_index + 10)
+    if (count == 0xFFFF or dir_size == 0xFFFFFFFF or dir_pos == 0xFFFFFFFF) and eocd_pos >= 20:
+        # read the values from the zip64 end of central directory record.
+        fp.seek(eocd_pos - 20)
+        locator = fp.read(20)
+        if struct.unpack_from("<I", locator)[0] == 0x07064b50:
+            zip64_eocd_pos = struct.unpack_from("<Q", locator, 8)[0]
+            fp.seek(zip64_eocd_pos)
+            zip64_eocd = fp.read(56)
+            if len(zip64_eocd) != 56 or struct.unpack_from("<I", zip64_eocd)[0] != 0x06064b50:
+                return None
+            count, dir_size, dir_pos = struct.unpack_from("<QQQ", zip64_eocd, 32)
+    if dir_pos + dir_size > eocd_pos:
+        return None
+    if dir_pos >= tail_pos:
+        dir_bytes = tail[dir_pos - tail_pos:dir_pos - tail_pos + dir_size]
+    else:
+        fp.seek(dir_pos)
+        dir_bytes = fp.read(dir_size)
+    offset = 0
+    for i in range(count):
+        if offset + 46 > len(dir_bytes):
+            return None
+        signature, crc32, data_len, uncompressed_len, name_len, extra_len, comment_len = struct.unpack_from("<I12xIIIHHH", dir_bytes, offset)
+        local_pos = struct.unpack_from("<I", dir_bytes, offset + 42)[0]
+        if signature != 0x02014b50:
+            return None
+        name_bytes = bytes(dir_bytes[offset + 46:offset + 46 + name_len])
+        if 0xFFFFFFFF in (data_len, uncompressed_len, local_pos):
+            extra_bytes = bytes(dir_bytes[offset + 46 + name_len:offset + 46 + name_len + extra_len])
+            uncompressed_len, data_len, local_pos = _read_zip64_extra(extra_bytes, uncompressed_len, data_len, local_pos)
+        dir_files[name_bytes] = (dir_pos + offset, local_pos)
+        fp.seek(local_pos)
+        local_header = fp.read(30)
+        if len(local_header) != 30 or struct.unpack_from("<I", local_header)[0] != 0x04034b50:
+            return None
+        local_name_len, local_extra_len = struct.unpack_from("<HH", local_header, 26)
+        local_files[local_pos] = (name_bytes, local_pos + 30 + local_name_len + local_extra_len, data_len, crc32)
+        offset += 46 + name_len + extra_len + comment_len
+    return local_files, dir_files, (eocd_pos, dir_pos)
+
+
+def _read_zip64_extra(extra_bytes: bytes, uncompressed_len: int, compressed_len: int, local_pos: int) -> typing.Tuple[int, int, int]:
+    # replace the values which are 0xFFFFFFFF with the values from the zip64 extra field, which are stored in order.
+    offset = 0
+    while offset + 4 <= len(extra_bytes):
+        header_id, data_size = struct.unpack_from("<HH", extra_bytes, offset)
+        if header_id == 0x0001:
+            values = list(struct.unpack_from(f"<{data_size // 8}Q", extra_bytes, offset + 4))
+            if uncompressed_len == 0xFFFFFFFF and values:
+                uncompressed_len = values.pop(0)
+            if compressed_len == 0xFFFFFFFF and values:
+                compressed_len = values.pop(0)
+            if local_pos == 0xFFFFFFFF and values:
+                local_pos = values.pop(0)
+            break
+        offset += 4 + data_size
+    return uncompressed_len, compressed_len, local_pos
+
+
+def _parse_zip_local_files(fp: typing.BinaryIO) -> typing.Tuple[typing.Dict[int, typing.Tuple[bytes, int, int, int]], typing.Dict[bytes, typing.Tuple[int, int]], typing.Optional[typing.Tuple[int, int]]]:
+    # walk the local file headers from the start of the file.
     local_files: typing.Dict[int, typing.Tuple[bytes, int, int, int]] = dict()
     dir_files: typing.Dict[bytes, typing.Tuple[int, int]] = dict()
     eocd: typing.Optional[typing.Tuple[int, int]] = None
+    zip64_dir_pos: typing.Optional[int] = None
     fp.seek(0)
     while True:
         pos = fp.tell()
@@ -261,7 +457,9 @@ def parse_zip(fp: typing.BinaryIO) -> typing.Tuple[typing.Dict[int, typing.Tuple
             name_len = struct.unpack('H', fp.read(2))[0]
             extra_len = struct.unpack('H', fp.read(2))[0]
             name_bytes = fp.read(name_len)
-            fp.seek(extra_len, os.SEEK_CUR)
+            extra_bytes = fp.read(extra_len)
+            if data_len == 0xFFFFFFFF:
+                data_len = _read_zip64_extra(extra_bytes, data_len, data_len, 0)[1]
             data_pos = fp.tell()
             fp.seek(data_len, os.SEEK_CUR)
             local_files[pos] = (name_bytes, data_pos, data_len, crc32)
@@ -270,15 +468,29 @@ def parse_zip(fp: typing.BinaryIO) -> typing.Tuple[typing.Dict[int, typing.Tuple
             name_len = struct.unpack('H', fp.read(2))[0]
             extra_len = struct.unpack('H', fp.read(2))[0]
             comment_len = struct.unpack('H', fp.read(2))[0]
+            fp.seek(pos + 20)
+            data_len = struct.unpack('I', fp.read(4))[0]
+            uncompressed_len = struct.unpack('I', fp.read(4))[0]
             fp.seek(pos + 42)
             pos2 = struct.unpack('I', fp.read(4))[0]
             name_bytes = fp.read(name_len)
+            extra_bytes = fp.read(extra_len)
+            if pos2 == 0xFFFFFFFF:
+                pos2 = _read_zip64_extra(extra_bytes, uncompressed_len, data_len, pos2)[2]
             fp.seek(pos + 46 + name_len + extra_len + comment_len)
             dir_files[name_bytes] = (pos, pos2)
+        elif signature == 0x06064b50:
+            fp.seek(pos + 4)
+            record_len = struct.unpack('<Q', fp.read(8))[0]
+            fp.seek(pos + 48)
+            zip64_dir_pos = struct.unpack('<Q', fp.read(8))[0]
+            fp.seek(pos + 12 + record_len)
+        elif signature == 0x07064b50:
+            fp.seek(pos + 20)
         elif signature == 0x06054b50:
             fp.seek(pos + 16)
             pos2 = struct.unpack('I', fp.read(4))[0]
-            eocd = (pos, pos2)
+            eocd = (pos, zip64_dir_pos if pos2 == 0xFFFFFFFF and zip64_dir_pos is not None else pos2)
             break
         else:
             raise IOError()
@@ -307,6 +519,44 @@ def read_data(fp: typing.BinaryIO, local_files: typing.Dict[int, typing.Tuple[by
     return None
 
 
+def read_data_mapped(file_path: str, fp: typing.BinaryIO, local_files: typing.Dict[int, typing.Tuple[bytes, int, int, int]], dir_files: typing.Dict[bytes, typing.Tuple[int, int]], name_bytes: bytes) -> typing.Optional[_NDArray]:
+    """
+        Memory map a numpy data array from the zip file
+
+        :param file_path: the path of the zip file
+        :param fp: a file pointer to the zip file
+        :param local_files: the local files structure
+        :param dir_files: the directory headers
+        :param name: the name of the data file to map
+        :return: the numpy data array, if found
+
+        The array is a copy-on-write memory map (numpy.memmap with mode "c") over the bytes of the
+        uncompressed member. Writing to the array does not modify the file.
+
+        Arrays which cannot be mapped (empty arrays, object arrays, or unknown npy versions)
+        are read into memory instead.
+
+        The local_files and dir_files should be passed from
+        the results of parse_zip.
+    """
+    if name_bytes in dir_files:
+        data_pos = local_files[dir_files[name_bytes][1]][1]
+        fp.seek(data_pos)
+        version = numpy.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(fp)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(fp)
+        else:
+            fp.seek(data_pos)
+            return numpy.load(fp)  # type: ignore
+        if dtype.hasobject or numpy.prod(shape, dtype=numpy.int64) == 0:
+            fp.seek(data_pos)
+            return numpy.load(fp)  # type: ignore
+        return numpy.memmap(file_path, dtype=dtype, mode="c", shape=shape, order="F" if fortran_order else "C", offset=fp.tell())
+    return None
+
+
 def read_json(fp: typing.BinaryIO, local_files: typing.Dict[int, typing.Tuple[bytes, int, int, int]], dir_files: typing.Dict[bytes, typing.Tuple[int, int]], name_bytes: bytes) -> PersistentDictType:
     """
         Read json properties from the zip file
@@ -332,6 +582,136 @@ def read_json(fp: typing.BinaryIO, local_files: typing.Dict[int, typing.Tuple[by
     return dict()
 
 
+def _gf2_matrix_times(mat: typing.Sequence[int], vec: int) -> int:
+    result = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            result ^= mat[i]
+        vec >>= 1
+        i += 1
+    return result
+
+
+def _make_crc32_zeros_operators() -> typing.List[typing.List[int]]:
+    # the operators (as gf(2) matrices) which append 2**n zero bytes to a crc32. see crc32_combine in zlib.
+    operator = [0xedb88320] + [1 << n for n in range(31)]  # one zero bit
+    operators = list()
+    for i in range(3 + 64):
+        operator = [_gf2_matrix_times(operator, operator[n]) for n in range(32)]
+        if i >= 2:
+            operators.append(operator)  # starting with eight zero bits
+    return operators
+
+
+_crc32_zeros_operators: typing.List[typing.List[int]] = list()
+
+
+def _crc32_shift(crc32: int, length: int) -> int:
+    """Return the crc32 of bytes with the given crc32 followed by length zero bytes, without the conditioning.
+
+    This is crc32_combine from zlib with a zero second crc. It allows updating a crc32 when a region of the data
+    changes: crc32(new) = crc32(old) ^ _crc32_shift(crc32(old_region) ^ crc32(new_region), length_after_region).
+    """
+    if not _crc32_zeros_operators:
+        _crc32_zeros_operators.extend(_make_crc32_zeros_operators())
+    n = 0
+    while length:
+        if length & 1:
+            crc32 = _gf2_matrix_times(_crc32_zeros_operators[n], crc32)
+        length >>= 1
+        n += 1
+    return crc32
+
+
+def _get_slice_runs(shape: typing.Sequence[int], itemsize: int, dst_slice: typing.Sequence[slice]) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+    """Return the list of (offset, length) byte runs covered by dst_slice in a c-contiguous array.
+
+    Returns None if the slice is not a sequence of unit step slices, one for each dimension.
+    """
+    dst_slice = tuple(dst_slice) + (slice(None),) * (len(shape) - len(dst_slice))
+    if len(dst_slice) != len(shape) or not all(isinstance(s, slice) for s in dst_slice):
+        return None
+    ranges = list()
+    for s, n in zip(dst_slice, shape):
+        start, stop, step = s.indices(n)
+        if step != 1:
+            return None
+        ranges.append((start, max(stop, start)))
+    strides = [itemsize] * len(shape)
+    for i in reversed(range(len(shape) - 1)):
+        strides[i] = strides[i + 1] * shape[i + 1]
+    # find the outermost dimension from which the region is contiguous.
+    k = len(shape) - 1
+    while k > 0 and ranges[k] == (0, shape[k]):
+        k -= 1
+    if k < 0:  # zero dimensional
+        return [(0, itemsize)]
+    run_length = (ranges[k][1] - ranges[k][0]) * strides[k]
+    if run_length == 0:
+        return list()
+    runs = list()
+    for index in numpy.ndindex(*[stop - start for start, stop in ranges[:k]]):
+        offset = ranges[k][0] * strides[k]
+        for d, i in enumerate(index):
+            offset += (ranges[d][0] + i) * strides[d]
+        runs.append((offset, run_length))
+    return runs
+
+
+def rewrite_zip_data_slice(file_path: str, dst_slice: typing.Sequence[slice], data: _NDArray) -> bool:
+    """
+        Rewrite the dst_slice region of the data file in the zip file in place
+
+        :param file_path: the file path to the zip file
+        :param dst_slice: the region of the data to rewrite
+        :param data: the complete data array from which to take the region
+        :return: whether the region was written
+
+        Only the bytes of the region are written. The crc32 of the data file is updated
+        from the old and new bytes of the region without reading the rest of the data.
+
+        The region is not written if the zip file does not contain c-contiguous data with
+        the same shape and dtype as data or if dst_slice is not a simple region.
+    """
+    with open(file_path, "r+b") as fp:
+        local_files, dir_files, eocd = parse_zip(fp)
+        if b"data.npy" not in dir_files:
+            return False
+        dir_pos, local_pos = dir_files[b"data.npy"]
+        name_bytes, data_pos, data_len, crc32 = local_files[local_pos]
+        fp.seek(data_pos)
+        version = numpy.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(fp)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(fp)
+        else:
+            return False
+        if fortran_order or dtype.hasobject or tuple(shape) != data.shape or dtype != data.dtype:
+            return False
+        array_pos = fp.tell()
+        runs = _get_slice_runs(shape, dtype.itemsize, dst_slice)
+        if runs is None:
+            return False
+        slab_bytes = memoryview(numpy.ascontiguousarray(data[tuple(dst_slice)])).cast("B")
+        data_end_pos = data_pos + data_len
+        slab_pos = 0
+        for offset, length in runs:
+            region_bytes = slab_bytes[slab_pos:slab_pos + length]
+            fp.seek(array_pos + offset)
+            old_region_bytes = fp.read(length)
+            crc32 ^= _crc32_shift(binascii.crc32(old_region_bytes) ^ binascii.crc32(region_bytes), data_end_pos - (array_pos + offset + length))
+            fp.seek(array_pos + offset)
+            fp.write(region_bytes)
+            slab_pos += length
+        fp.seek(local_pos + 14)
+        fp.write(struct.pack('I', crc32))       # crc32 in local file header
+        fp.seek(dir_pos + 16)
+        fp.write(struct.pack('I', crc32))       # crc32 in central directory header
+        return True
+
+
 def rewrite_zip(file_path: str, properties: PersistentDictType) -> None:
     """
         Rewrite the json properties in the zip file
@@ -357,13 +737,13 @@ def rewrite_zip(file_path: str, properties: PersistentDictType) -> None:
             local_file = local_files[local_file_pos]
             dir_data_list.append((local_file_pos, b"data.npy", local_file[2], local_file[3]))
             write_zip_fp(fp, None, properties, dir_data_list)
-        else:
-            data = None
-            if b"data.npy" in dir_files:
-                fp.seek(local_files[dir_files[b"data.npy"][1]][1])
-                data = numpy.load(fp)
-            fp.seek(0)
-            write_zip_fp(fp, data, properties)
+            return
+        data = None
+        if b"data.npy" in dir_files:
+            fp.seek(local_files[dir_files[b"data.npy"][1]][1])
+            data = numpy.load(fp)
+    # the data is not the first item; rewrite the entire file.
+    write_zip(file_path, data, properties)
 
 
 class NDataHandler(StorageHandler.StorageHandler):
@@ -388,6 +768,9 @@ class NDataHandler(StorageHandler.StorageHandler):
     def __init__(self, file_path: typing.Union[str, pathlib.Path]) -> None:
         self.__file_path = str(file_path)
         self.__lock = threading.RLock()
+        # the result of parse_zip and the file stat it is valid for. writes reset the file mtime, so the inode and
+        # ctime are also used; writes by this handler clear it.
+        self.__zip_index: typing.Optional[typing.Tuple[typing.Tuple[int, int, int, int], typing.Tuple[typing.Dict[int, typing.Tuple[bytes, int, int, int]], typing.Dict[bytes, typing.Tuple[int, int]], typing.Optional[typing.Tuple[int, int]]]]] = None
         NDataHandler.count += 1
 
     def close(self) -> None:
@@ -416,6 +799,15 @@ class NDataHandler(StorageHandler.StorageHandler):
     def get_extension(self) -> str:
         return ".ndata"
 
+    def __parse_zip(self, fp: typing.BinaryIO) -> typing.Tuple[typing.Dict[int, typing.Tuple[bytes, int, int, int]], typing.Dict[bytes, typing.Tuple[int, int]], typing.Optional[typing.Tuple[int, int]]]:
+        stat_result = os.fstat(fp.fileno())
+        stat_key = (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ctime_ns)
+        if self.__zip_index and self.__zip_index[0] == stat_key:
+            return self.__zip_index[1]
+        zip_index = parse_zip(fp)
+        self.__zip_index = (stat_key, zip_index)
+        return zip_index
+
     def write_data(self, data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
         """
             Write data to the ndata file specified by reference.
@@ -429,6 +821,7 @@ class NDataHandler(StorageHandler.StorageHandler):
             #logging.debug("WRITE data file %s for %s", absolute_file_path, key)
             make_directory_if_needed(os.path.dirname(absolute_file_path))
             properties = self.read_properties() if os.path.exists(absolute_file_path) else dict()
+            self.__zip_index = None
             if properties is not None:
                 write_zip(absolute_file_path, data, properties)
             # convert to utc time.
@@ -436,6 +829,31 @@ class NDataHandler(StorageHandler.StorageHandler):
             timestamp = calendar.timegm(file_datetime.timetuple()) - tz_minutes * 60
             os.utime(absolute_file_path, (time.time(), timestamp))
 
+    def write_data_slice(self, dst_slice: typing.Sequence[slice], data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
+        """
+            Write the dst_slice region of data to the ndata file specified by reference.
+
+            :param dst_slice: the region of the data to write
+            :param data: the complete numpy array data
+            :param data_descriptor: the data descriptor of the data
+            :param file_datetime: the datetime for the file
+
+            The region is written in place. If the file does not yet contain matching data,
+            the complete data is written. The complete data is also written when data is memory
+            mapped, since writing in place would change the existing maps.
+        """
+        with self.__lock:
+            assert data is not None
+            absolute_file_path = self.__file_path
+            self.__zip_index = None
+            if _g_memory_map_data or not os.path.exists(absolute_file_path) or not rewrite_zip_data_slice(absolute_file_path, dst_slice, data):
+                self.write_data(data, data_descriptor, file_datetime)
+                return
+            # convert to utc time.
+            tz_minutes = Utility.local_utcoffset_minutes(file_datetime)
+            timestamp = calendar.timegm(file_datetime.timetuple()) - tz_minutes * 60
+            os.utime(absolute_file_path, (time.time(), timestamp))
+
     def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
         self.write_data(numpy.zeros(data_shape, data_dtype), data_descriptor, file_datetime)
 
@@ -454,6 +872,7 @@ class NDataHandler(StorageHandler.StorageHandler):
             absolute_file_path = self.__file_path
             #logging.debug("WRITE properties %s for %s", absolute_file_path, key)
             make_directory_if_needed(os.path.dirname(absolute_file_path))
+            self.__zip_index = None
             exists = os.path.exists(absolute_file_path)
             if exists:
                 rewrite_zip(absolute_file_path, Utility.clean_dict(properties))
@@ -474,7 +893,7 @@ class NDataHandler(StorageHandler.StorageHandler):
         with self.__lock:
             absolute_file_path = self.__file_path
             with open(absolute_file_path, "rb") as fp:
-                local_files, dir_files, eocd = parse_zip(fp)
+                local_files, dir_files, eocd = self.__parse_zip(fp)
                 properties = read_json(fp, local_files, dir_files, b"metadata.json")
             return properties
 
@@ -489,9 +908,41 @@ class NDataHandler(StorageHandler.StorageHandler):
             absolute_file_path = self.__file_path
             #logging.debug("READ data file %s", absolute_file_path)
             with open(absolute_file_path, "rb") as fp:
-                local_files, dir_files, eocd = parse_zip(fp)
+                local_files, dir_files, eocd = self.__parse_zip(fp)
+                if _g_memory_map_data:
+                    return read_data_mapped(absolute_file_path, fp, local_files, dir_files, b"data.npy")
                 return read_data(fp, local_files, dir_files, b"data.npy")
 
+    def read_data_slice(self, key: typing.Any) -> typing.Optional[_NDArray]:
+        """
+            Read a region of the data from the ndata file reference
+
+            :param key: the index key of the region to read
+            :return: a numpy array of the region of the data; maybe None
+
+            The data is memory mapped so that only the region is read from the file.
+        """
+        with self.__lock:
+            absolute_file_path = self.__file_path
+            with open(absolute_file_path, "rb") as fp:
+                local_files, dir_files, eocd = self.__parse_zip(fp)
+                data = read_data_mapped(absolute_file_path, fp, local_files, dir_files, b"data.npy")
+                return numpy.array(data[key]) if data is not None else None
+
+    def copy_from(self, storage_handler: StorageHandler.StorageHandler) -> bool:
+        """
+            Replace the ndata file with a copy of the ndata file of another handler
+
+            :param storage_handler: the handler to copy from
+            :return: whether the file was copied
+        """
+        if not isinstance(storage_handler, NDataHandler) or not os.path.isfile(storage_handler.__file_path):
+            return False
+        with storage_handler.__lock, self.__lock:
+            Utility.clone_file(pathlib.Path(storage_handler.__file_path), pathlib.Path(self.__file_path))
+            self.__zip_index = None
+        return True
+
     def remove(self) -> None:
         """
             Remove the ndata file reference
@@ -501,6 +952,7 @@ class NDataHandler(StorageHandler.StorageHandler):
         with self.__lock:
             absolute_file_path = self.__file_path
             #logging.debug("DELETE data file %s", absolute_file_path)
+            self.__zip_index = None
             if os.path.isfile(absolute_file_path):
                 os.remove(absolute_file_path)
 
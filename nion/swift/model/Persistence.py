@@ -317,9 +317,15 @@ class PersistentStorageInterface(typing.Protocol):
     @abc.abstractmethod
     def read_external_data(self, item: PersistentObject, name: str) -> typing.Any: ...
 
+    @abc.abstractmethod
+    def read_external_data_slice(self, item: PersistentObject, name: str, key: typing.Any) -> typing.Any: ...
+
     @abc.abstractmethod
     def write_external_data(self, item: PersistentObject, name: str, value: _NDArray) -> None: ...
 
+    @abc.abstractmethod
+    def write_external_data_slice(self, item: PersistentObject, name: str, dst_slice: typing.Sequence[slice], value: _NDArray) -> None: ...
+
     @abc.abstractmethod
     def reserve_external_data(self, item: PersistentObject, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: tuple[bool, int, int]) -> None: ...
 
@@ -1245,11 +1251,21 @@ class PersistentObject(Observable.Observable):
         assert self.persistent_storage
         return self.persistent_storage.read_external_data(self, name)
 
+    def read_external_data_slice(self, name: str, key: typing.Any) -> typing.Any:
+        """ Call this to read the region given by key of external data with name from an item in persistent storage. """
+        assert self.persistent_storage
+        return self.persistent_storage.read_external_data_slice(self, name, key)
+
     def write_external_data(self, name: str, value: typing.Any) -> None:
         """ Call this to notify write external data value with name to an item in persistent storage. """
         assert self.persistent_storage
         self.persistent_storage.write_external_data(self, name, value)
 
+    def write_external_data_slice(self, name: str, dst_slice: typing.Sequence[slice], value: typing.Any) -> None:
+        """ Call this to notify write of the dst_slice region of external data value with name to an item in persistent storage. """
+        assert self.persistent_storage
+        self.persistent_storage.write_external_data_slice(self, name, dst_slice, value)
+
     def reserve_external_data(self, name: str, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: tuple[bool, int, int]) -> None:
         """ Call this to notify reserve external data value with name to an item in persistent storage. """
         assert self.persistent_storage
@@ -57,6 +57,8 @@ class Project(Persistence.PersistentObject):
         self.define_property("mapped_items", list(), changed=self.__property_changed, hidden=True)  # list of item references, used for shortcut variables in scripts
         self.define_property("filter_id", hidden=True)
         self.define_property("data_group_uuid", converter=Converter.UuidToStringConverter(), hidden=True)
+        self.define_property("storage_compression", changed=self.__storage_compression_changed, hidden=True)  # name of compression used for data, see HDF5Handler
+        self.define_property("storage_deduplication", False, changed=self.__storage_deduplication_changed, hidden=True)  # whether identical data is stored once, see DataBlobStore
 
         self.handle_start_read: typing.Optional[typing.Callable[[], None]] = None
         self.handle_insert_model_item: typing.Optional[typing.Callable[[Persistence.PersistentContainerType, str, int, Persistence.PersistentObject], None]] = None
@@ -128,6 +130,22 @@ class Project(Persistence.PersistentObject):
         if data_group != self.data_group:
             self._set_persistent_property_value("data_group_uuid", str(data_group.uuid) if data_group else None)
 
+    @property
+    def storage_compression(self) -> typing.Optional[str]:
+        return typing.cast(typing.Optional[str], self._get_persistent_property_value("storage_compression"))
+
+    @storage_compression.setter
+    def storage_compression(self, value: typing.Optional[str]) -> None:
+        self._set_persistent_property_value("storage_compression", value)
+
+    @property
+    def storage_deduplication(self) -> bool:
+        return typing.cast(bool, self._get_persistent_property_value("storage_deduplication"))
+
+    @storage_deduplication.setter
+    def storage_deduplication(self, value: bool) -> None:
+        self._set_persistent_property_value("storage_deduplication", value)
+
     @property
     def mapped_items(self) -> typing.List[Persistence._SpecifierType]:
         return list(self._get_persistent_property_value("mapped_items"))
@@ -199,6 +217,10 @@ class Project(Persistence.PersistentObject):
         assert self.__cache
         return self.__cache
 
+    def prune_storage_cache(self, target_uuids: typing.AbstractSet[uuid.UUID]) -> None:
+        if self.__cache:
+            self.__cache.prune_cached_values(target_uuids)
+
     @property
     def project_uuid(self) -> typing.Optional[uuid.UUID]:
         return self.__storage_system.storage_uuid
@@ -320,6 +342,8 @@ class Project(Persistence.PersistentObject):
                 self._get_persistent_property("filter_id").set_value(properties.get("filter_id", None))
                 self._get_persistent_property("data_item_references").set_value(properties.get("data_item_references", dict()))
                 self._get_persistent_property("mapped_items").set_value(properties.get("mapped_items", list()))
+                self._get_persistent_property("storage_compression").set_value(properties.get("storage_compression", None))
+                self._get_persistent_property("storage_deduplication").set_value(properties.get("storage_deduplication", False))
                 self.__has_been_read = True
         if callable(self.handle_finish_read):
             self.handle_finish_read()
@@ -405,6 +429,14 @@ class Project(Persistence.PersistentObject):
     def __property_changed(self, name: str, value: typing.Any) -> None:
         self.notify_property_changed(name)
 
+    def __storage_compression_changed(self, name: str, value: typing.Any) -> None:
+        self.__storage_system.storage_compression = value
+        self.notify_property_changed(name)
+
+    def __storage_deduplication_changed(self, name: str, value: typing.Any) -> None:
+        self.__storage_system.storage_deduplication = bool(value)
+        self.notify_property_changed(name)
+
     def append_data_item(self, data_item: DataItem.DataItem) -> None:
         assert not self.get_item_by_uuid("data_items", data_item.uuid)
         self.append_item("data_items", data_item)
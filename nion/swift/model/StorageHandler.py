@@ -67,6 +67,13 @@ class StorageHandler(typing.Protocol):
         """Read and return the data array from storage, or None if not available."""
         ...
 
+    def read_data_slice(self, key: typing.Any) -> typing.Optional[_NDArray]:
+        """Read and return the region of the data array given by the index key, or None if not available.
+
+        Only the region is read from storage, so that a frame of a large sequence or collection can be read without
+        reading all of the data."""
+        ...
+
     def write_properties(self, properties: PersistentDictType, file_datetime: datetime.datetime) -> None:
         """Write the given properties to storage with the specified file datetime."""
         ...
@@ -75,10 +82,27 @@ class StorageHandler(typing.Protocol):
         """Write the given data array and descriptor to storage with the specified file datetime."""
         ...
 
+    def write_data_slice(self, dst_slice: typing.Sequence[slice], data: _NDArray, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
+        """Write the dst_slice region of the given data array to storage, leaving the rest of the stored data intact.
+
+        The data array is the complete array; only data[dst_slice] is written. If the stored data does not match the
+        shape and dtype of the data array, the complete data array is written instead.
+        """
+        ...
+
     def reserve_data(self, data_shape: typing.Tuple[int, ...], data_dtype: numpy.typing.DTypeLike, data_descriptor: DataAndMetadata.DataDescriptor, file_datetime: datetime.datetime) -> None:
         """Reserve space for data in storage with the given shape, dtype, descriptor, and file datetime."""
         ...
 
+    def copy_from(self, storage_handler: StorageHandler) -> bool:
+        """Replace the storage with a copy of the storage of another storage handler, returning whether it was copied.
+
+        The properties are copied too and should be rewritten afterwards. Storage is copied without reading the data
+        into memory, sharing the underlying blocks where the file system allows it. Returns False if the storage
+        cannot be copied, for instance if the other storage handler is of a different type.
+        """
+        ...
+
     def prepare_move(self) -> None:
         """Prepare the storage handler for moving or renaming the underlying storage."""
         ...
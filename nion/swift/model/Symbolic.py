@@ -14,6 +14,7 @@ import asyncio
 import concurrent.futures
 import contextlib
 import copy
+import dataclasses
 import datetime
 import difflib
 import enum
@@ -1142,7 +1143,9 @@ class DataSource:
     def __derived_display_values(self) -> DisplayItem.DerivedDisplayValues | None:
         display_data_info = self.__display_data_info
         if display_data_info and not self.__cached_derived_display_values:
-            self.__cached_derived_display_values = display_data_info.derived_display_values
+            # calculate the derived display values without the display buffer pool so that computations get them in
+            # full precision rather than the float32 used for the display.
+            self.__cached_derived_display_values = dataclasses.replace(display_data_info, display_buffer_pool=None).derived_display_values
         return self.__cached_derived_display_values
 
     @property
@@ -12,6 +12,7 @@ import logging
 import os
 import pathlib
 import re
+import shutil
 import sys
 import threading
 import time
@@ -563,6 +564,40 @@ class Timer:
         self.last_time_ns = current_time
 
 
+# the linux ioctl to clone a file, sharing its blocks, on file systems which support it (btrfs, xfs, ...).
+_FICLONE = 0x40049409
+
+
+def clone_file(source_path: pathlib.Path, target_path: pathlib.Path) -> None:
+    """Copy the file at source_path to target_path, sharing the file blocks where the file system allows it.
+
+    Otherwise the file is copied by the operating system. A hard link is never used since the files are written
+    independently afterwards. The file is copied to a temporary file which then replaces the target, so an existing
+    target is never left partially written.
+    """
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target_path.with_name(target_path.name + ".temp")
+    try:
+        if not _clone_file_blocks(source_path, temp_path):
+            shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def _clone_file_blocks(source_path: pathlib.Path, target_path: pathlib.Path) -> bool:
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(source_path, "rb") as source_fp, open(target_path, "wb") as target_fp:
+            try:
+                fcntl.ioctl(target_fp.fileno(), _FICLONE, source_fp.fileno())
+                return True
+            except OSError:
+                pass
+    return False
+
+
 def make_pretty_size_str(total_bytes: int | float) -> str:
     """Format a number into a string with units Byte(s), KB, MB, GB, or TB formatted to two decimal places.
 
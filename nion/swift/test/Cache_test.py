@@ -1,10 +1,17 @@
 # standard libraries
+import contextlib
 import logging
+import os
+import pathlib
+import pickle
+import sqlite3
+import tempfile
+import time
 import unittest
 import uuid
 
 # third party libraries
-# None
+import numpy
 
 # local libraries
 from nion.swift.model import Cache
@@ -55,6 +62,224 @@ class TestSuspendableCacheClass(unittest.TestCase):
         suspendable_cache.spill_cache()
         self.assertTrue(suspendable_cache.get_cached_value(suspendable_cache, "key", False))
 
+
+class Target:
+    def __init__(self) -> None:
+        self.uuid = uuid.uuid4()
+
+
+class TestDbStorageCacheClass(unittest.TestCase):
+
+    def setUp(self):
+        self.__temp_directory = tempfile.TemporaryDirectory()
+        self.cache_path = pathlib.Path(self.__temp_directory.name) / "test.nscache"
+
+    def tearDown(self):
+        self.__temp_directory.cleanup()
+
+    def test_values_are_read_before_and_after_they_are_written(self):
+        targets = [Target() for i in range(4)]
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            for i, target in enumerate(targets):
+                storage_cache.set_cached_value(target, "key", i, dirty=True)
+                self.assertEqual(i, storage_cache.get_cached_value(target, "key"))
+                self.assertTrue(storage_cache.is_cached_value_dirty(target, "key"))
+                storage_cache.set_cached_value_dirty(target, "key", False)
+                self.assertFalse(storage_cache.is_cached_value_dirty(target, "key"))
+            storage_cache.remove_cached_value(targets[3], "key")
+            self.assertEqual(-1, storage_cache.get_cached_value(targets[3], "key", -1))
+            self.assertTrue(storage_cache.is_cached_value_dirty(targets[3], "key"))
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            self.assertEqual([0, 1, 2, None], [storage_cache.get_cached_value(target, "key") for target in targets])
+            self.assertEqual([False, False, False, True], [storage_cache.is_cached_value_dirty(target, "key") for target in targets])
+            storage_cache.set_cached_value_dirty(targets[0], "key", True)
+            self.assertTrue(storage_cache.is_cached_value_dirty(targets[0], "key"))
+            # marking a missing value does not create it
+            storage_cache.set_cached_value_dirty(targets[3], "key", False)
+            self.assertTrue(storage_cache.is_cached_value_dirty(targets[3], "key"))
+
+    def test_get_cached_values_reads_values_of_many_targets(self):
+        old_db_query_uuid_count = Cache._db_query_uuid_count
+        Cache._db_query_uuid_count = 3
+        try:
+            targets = [Target() for i in range(10)]
+            with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+                for i, target in enumerate(targets[:8]):
+                    storage_cache.set_cached_value(target, "key", i)
+                storage_cache.remove_cached_value(targets[0], "key")
+            with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+                storage_cache.set_cached_value(targets[1], "key", 11)
+                storage_cache.set_cached_value(targets[8], "key", 18)
+                storage_cache.remove_cached_value(targets[2], "key")
+                self.assertEqual([-1, 11, -1, 3, 4, 5, 6, 7, 18, -1], storage_cache.get_cached_values(targets, "key", -1))
+                self.assertEqual([None] * 10, storage_cache.get_cached_values(targets, "other"))
+        finally:
+            Cache._db_query_uuid_count = old_db_query_uuid_count
+
+    def test_database_uses_write_ahead_log(self):
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            storage_cache.set_cached_value(Target(), "key", 1)
+        with contextlib.closing(sqlite3.connect(str(self.cache_path))) as conn:
+            self.assertEqual("wal", conn.execute("PRAGMA journal_mode").fetchone()[0])
+
+    def test_cached_values_are_encoded_and_decoded(self):
+        values = [
+            numpy.random.randint(0, 2 ** 32, size=(256, 256), dtype=numpy.uint32),
+            numpy.zeros((256, 256), dtype=numpy.uint32),
+            numpy.arange(12, dtype=numpy.float32).reshape(3, 4).T,
+            numpy.zeros((0, 3), dtype=numpy.int16),
+            numpy.float64(1.5),
+            (1.0, 2.0),
+            {"a": [1, 2]},
+            None,
+        ]
+        for value in values:
+            with self.subTest(value_type=type(value)):
+                value_bytes = Cache._encode_cached_value(value)
+                decoded_value, is_current = Cache._decode_cached_value(value_bytes)
+                self.assertTrue(is_current)
+                if isinstance(value, numpy.ndarray):
+                    self.assertEqual(value.dtype, decoded_value.dtype)
+                    self.assertTrue(numpy.array_equal(value, decoded_value))
+                    self.assertTrue(decoded_value.flags.writeable)
+                    self.assertLessEqual(len(value_bytes), value.nbytes + 64)
+                else:
+                    self.assertEqual(value, decoded_value)
+        self.assertLess(len(Cache._encode_cached_value(values[1])), values[1].nbytes // 10)
+
+    def test_values_in_old_format_are_read_and_rewritten(self):
+        target = Target()
+        data = numpy.random.randint(0, 2 ** 32, size=(16, 16), dtype=numpy.uint32)
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)):
+            pass
+        with contextlib.closing(sqlite3.connect(str(self.cache_path))) as conn:
+            with conn:
+                conn.execute("INSERT INTO cache (uuid, key, value, dirty) VALUES (?, ?, ?, ?)", (str(target.uuid), "key", sqlite3.Binary(pickle.dumps(data, 0)), 0))
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            self.assertTrue(numpy.array_equal(data, storage_cache.get_cached_value(target, "key")))
+        with contextlib.closing(sqlite3.connect(str(self.cache_path))) as conn:
+            value_bytes = conn.execute("SELECT value FROM cache WHERE uuid=? AND key=?", (str(target.uuid), "key")).fetchone()[0]
+        value, is_current = Cache._decode_cached_value(value_bytes)
+        self.assertTrue(is_current)
+        self.assertTrue(numpy.array_equal(data, value))
+
+    def test_least_recently_accessed_values_are_evicted_beyond_maximum_size(self):
+        targets = [Target() for i in range(8)]
+        data = numpy.random.randint(0, 2 ** 32, size=(256,), dtype=numpy.uint32)  # does not compress
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            for target in targets:
+                storage_cache.set_cached_value(target, "key", data)
+        # make the first values the most recently accessed
+        with contextlib.closing(sqlite3.connect(str(self.cache_path))) as conn:
+            with conn:
+                for i, target in enumerate(targets):
+                    conn.execute("UPDATE cache SET accessed=? WHERE uuid=?", (len(targets) - i, str(target.uuid)))
+        # opening with a smaller maximum size evicts the least recently accessed values, to 3/4 of the maximum size
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path, 6 * data.nbytes)) as storage_cache:
+            values = storage_cache.get_cached_values(targets, "key")
+            self.assertTrue(all(value is not None for value in values[:4]))
+            self.assertTrue(all(value is None for value in values[4:]))
+        # reading a value updates its access time
+        with contextlib.closing(sqlite3.connect(str(self.cache_path))) as conn:
+            self.assertLess(len(targets), conn.execute("SELECT accessed FROM cache WHERE uuid=?", (str(targets[0].uuid),)).fetchone()[0])
+
+    def test_values_of_other_targets_are_pruned(self):
+        targets = [Target() for i in range(4)]
+        with contextlib.closing(Cache.MemoryCache(Cache.DbStorageCache(self.cache_path))) as cache:
+            for i, target in enumerate(targets):
+                cache.set_cached_value(target, "key", i)
+            cache.prune_cached_values({targets[0].uuid, targets[2].uuid})
+            self.assertEqual([0, None, 2, None], cache.get_cached_values(targets, "key"))
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            self.assertEqual([0, None, 2, None], storage_cache.get_cached_values(targets, "key"))
+            storage_cache.prune_cached_values(set())
+            self.assertEqual([None] * 4, storage_cache.get_cached_values(targets, "key"))
+
+    def test_cache_without_access_times_is_read(self):
+        target = Target()
+        with contextlib.closing(sqlite3.connect(str(self.cache_path))) as conn:
+            with conn:
+                conn.execute("CREATE TABLE cache(uuid STRING, key STRING, value BLOB, dirty INTEGER, PRIMARY KEY(uuid, key))")
+                conn.execute("INSERT INTO cache (uuid, key, value, dirty) VALUES (?, ?, ?, ?)", (str(target.uuid), "key", sqlite3.Binary(pickle.dumps(4, 0)), 0))
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            self.assertEqual(4, storage_cache.get_cached_value(target, "key"))
+            storage_cache.set_cached_value(target, "key2", 5)
+        with contextlib.closing(Cache.DbStorageCache(self.cache_path)) as storage_cache:
+            self.assertEqual([4, 5], [storage_cache.get_cached_value(target, "key"), storage_cache.get_cached_value(target, "key2")])
+
+    def test_in_memory_database_reads_values(self):
+        target = Target()
+        with contextlib.closing(Cache.DbStorageCache(":memory:")) as storage_cache:
+            storage_cache.set_cached_value(target, "key", 1)
+            self.assertEqual(1, storage_cache.get_cached_value(target, "key"))
+            self.assertEqual([1], storage_cache.get_cached_values([target], "key"))
+            self.assertEqual(5, storage_cache.get_cached_value(Target(), "key", 5))
+            self.assertTrue(storage_cache.is_cached_value_dirty(Target(), "key"))
+
+    def test_cache_factory_purges_old_cache_files_with_their_log_files(self):
+        cache_dir_path = self.cache_path.parent
+        old_file_paths = [cache_dir_path / name for name in ("old.nscache", "old.nscache-wal", "old.nscache-shm")]
+        old_time = time.time() - 60 * 60 * 24 * 40
+        for file_path in old_file_paths:
+            file_path.write_bytes(b"")
+            os.utime(file_path, (old_time, old_time))
+        cache_factory = Cache.DbCacheFactory(cache_dir_path, "new")
+        cache = cache_factory.create_cache()
+        cache_factory.release_cache(cache)
+        self.assertFalse(any(file_path.exists() for file_path in old_file_paths))
+        self.assertTrue((cache_dir_path / "new.nscache").exists())
+
+
+class TestMemoryCacheClass(unittest.TestCase):
+
+    def test_values_are_written_to_storage_cache_when_evicted(self):
+        storage_cache = Cache.DictStorageCache()
+        memory_cache = Cache.MemoryCache(storage_cache, 3 * (1024 + 128))
+        targets = [Target() for i in range(4)]
+        for i, target in enumerate(targets):
+            memory_cache.set_cached_value(target, "key", numpy.full((256,), i, dtype=numpy.uint32), dirty=i == 0)
+        self.assertEqual(1, memory_cache.eviction_count)
+        self.assertLessEqual(memory_cache.n_bytes, 3 * (1024 + 128))
+        # the least recently used value was written to the storage cache
+        self.assertTrue(numpy.array_equal(numpy.full((256,), 0), storage_cache.get_cached_value(targets[0], "key")))
+        self.assertTrue(storage_cache.is_cached_value_dirty(targets[0], "key"))
+        self.assertIsNone(storage_cache.get_cached_value(targets[3], "key"))
+        # reading the evicted value reads it from the storage cache
+        self.assertEqual(0, memory_cache.get_cached_value(targets[0], "key")[0])
+        self.assertEqual(1, memory_cache.miss_count)
+        self.assertTrue(memory_cache.is_cached_value_dirty(targets[0], "key"))
+        # closing writes the remaining values
+        memory_cache.close()
+        for i, target in enumerate(targets):
+            self.assertEqual(i, storage_cache.get_cached_value(target, "key")[0])
+            self.assertEqual(i == 0, storage_cache.is_cached_value_dirty(target, "key"))
+
+    def test_hot_values_are_read_from_memory(self):
+        storage_cache = Cache.DictStorageCache()
+        targets = [Target() for i in range(3)]
+        storage_cache.set_cached_value(targets[0], "key", 1)
+        storage_cache.set_cached_value(targets[1], "key", 2)
+        with contextlib.closing(Cache.MemoryCache(storage_cache)) as memory_cache:
+            self.assertEqual([1, 2, None], memory_cache.get_cached_values(targets, "key"))
+            self.assertEqual(3, memory_cache.miss_count)
+            # values in the storage cache are not read again, including missing values
+            storage_cache.set_cached_value(targets[0], "key", 10)
+            storage_cache.set_cached_value(targets[2], "key", 30)
+            self.assertEqual([1, 2, -1], [memory_cache.get_cached_value(target, "key", -1) for target in targets])
+            self.assertEqual(3, memory_cache.hit_count)
+            self.assertEqual(3, memory_cache.miss_count)
+            # removed values are removed from the storage cache immediately
+            memory_cache.remove_cached_value(targets[1], "key")
+            self.assertIsNone(memory_cache.get_cached_value(targets[1], "key"))
+            self.assertIsNone(storage_cache.get_cached_value(targets[1], "key"))
+            self.assertTrue(memory_cache.is_cached_value_dirty(targets[1], "key"))
+            memory_cache.set_cached_value_dirty(targets[1], "key", False)
+            self.assertTrue(memory_cache.is_cached_value_dirty(targets[1], "key"))
+            memory_cache.set_cached_value_dirty(targets[0], "key", True)
+            self.assertTrue(memory_cache.is_cached_value_dirty(targets[0], "key"))
+            self.assertTrue(storage_cache.is_cached_value_dirty(targets[0], "key"))
+
+
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.DEBUG)
     unittest.main()
@@ -796,6 +796,75 @@ class TestDataItemClass(unittest.TestCase):
         data_item_copy.close()
         data_item.close()
 
+    def test_snapshot_shares_data_until_written(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data = numpy.random.randn(8, 8)
+            data_item = DataItem.DataItem(numpy.copy(data))
+            document_model.append_data_item(data_item)
+            # data read from storage is owned by the data item and can be shared
+            data_item._force_unload()
+            # keep the data loaded, as a display does
+            data_item.increment_data_ref_count()
+            try:
+                data_item_copy = data_item.snapshot()
+                with contextlib.closing(data_item_copy):
+                    self.assertTrue(numpy.shares_memory(data_item.data, data_item_copy.data))
+                    self.assertFalse(data_item_copy.data.flags.writeable)
+                    self.assertEqual(data_item, data_item_copy.data_copy_source)
+                    # writing to the source in place does not modify the copy
+                    with data_item.data_ref() as data_ref:
+                        data_ref.data[0, 0] = 100
+                        data_ref.data_updated()
+                    self.assertEqual(100, data_item.data[0, 0])
+                    self.assertTrue(numpy.array_equal(data, data_item_copy.data))
+                    self.assertIsNone(data_item_copy.data_copy_source)
+                    # partial writes to the copy do not modify the source
+                    data_item._force_unload()
+                    data_item_copy2 = data_item.snapshot()
+                    with contextlib.closing(data_item_copy2):
+                        self.assertTrue(numpy.shares_memory(data_item.data, data_item_copy2.data))
+                        partial_xdata = DataAndMetadata.new_data_and_metadata(numpy.zeros((8, 8)))
+                        data_item_copy2.set_data_and_metadata_partial(data_item_copy2.data_metadata, partial_xdata, (slice(0, 1),), (slice(0, 1),))
+                        self.assertTrue(numpy.array_equal(numpy.zeros((8,)), data_item_copy2.data[0]))
+                        self.assertEqual(100, data_item.data[0, 0])
+            finally:
+                data_item.decrement_data_ref_count()
+
+    def test_snapshot_does_not_share_data_set_by_caller(self):
+        data = numpy.random.randn(8, 8)
+        data_item = DataItem.DataItem(data)
+        data_item_copy = data_item.snapshot()
+        with contextlib.closing(data_item), contextlib.closing(data_item_copy):
+            self.assertFalse(numpy.shares_memory(data_item.data, data_item_copy.data))
+            self.assertEqual(data_item, data_item_copy.data_copy_source)
+
+    def test_data_is_read_only_only_while_shared_with_snapshot(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.random.randn(8, 8))
+            document_model.append_data_item(data_item)
+            data_item._force_unload()
+            # keep the data loaded, as a display does
+            data_item.increment_data_ref_count()
+            try:
+                # data read from storage is writable
+                self.assertTrue(data_item.data.flags.writeable)
+                data_item_copy = data_item.snapshot()
+                with contextlib.closing(data_item_copy):
+                    # the shared data is read-only in both items
+                    self.assertTrue(numpy.shares_memory(data_item.data, data_item_copy.data))
+                    self.assertFalse(data_item.data.flags.writeable)
+                    self.assertFalse(data_item_copy.data.flags.writeable)
+                    with self.assertRaises(ValueError):
+                        data_item_copy.data[0, 0] = 100
+                    # a data reference gives writable data
+                    with data_item_copy.data_ref() as data_ref:
+                        self.assertTrue(data_ref.data.flags.writeable)
+                    self.assertTrue(data_item_copy.data.flags.writeable)
+            finally:
+                data_item.decrement_data_ref_count()
+
     def test_data_item_allows_adding_of_two_data_sources(self):
         with TestContext.create_memory_context() as test_context:
             document_model = test_context.create_document_model()
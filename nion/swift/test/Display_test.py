@@ -1,7 +1,9 @@
 # standard libraries
 import contextlib
 import copy
+import dataclasses
 import math
+import threading
 import typing
 import unittest
 import uuid
@@ -230,6 +232,191 @@ class TestDisplayClass(unittest.TestCase):
             display_item = document_model.get_display_item_for_data_item(data_item)
             self.assertIsNotNone(display_item.display_data_channels[0].display_values.data_range)
 
+    def test_display_data_range_is_read_from_cache_after_reload(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                data_item = DataItem.DataItem(numpy.full((8, 8), 2.0))
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                self.assertEqual((2.0, 2.0), display_item.display_data_channels[0].display_values.data_range)
+                # replace the stored data range to confirm that it is used instead of scanning the data
+                key = f"display_statistics_{data_item.uuid}_data_range"
+                signature, data_range = test_context.storage_cache.get_cached_value(display_item, key)
+                self.assertEqual((2.0, 2.0), tuple(data_range))
+                test_context.storage_cache.set_cached_value(display_item, key, (signature, (1.0, 3.0)))
+            test_context.reload()
+            document_model = test_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                display_item = document_model.display_items[0]
+                self.assertEqual((1.0, 3.0), display_item.display_data_channels[0].display_values.data_range)
+
+    def test_display_data_range_is_updated_from_partial_updates(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.zeros((8, 8)))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            self.assertEqual((0.0, 0.0), display_data_channel.display_values.data_range)
+            scanned_sizes = list()
+            calculate_data_extent = DisplayItem._calculate_data_extent
+
+            def calculate_data_extent_spy(data):
+                scanned_sizes.append(data.size)
+                return calculate_data_extent(data)
+
+            def update_row(row: int, value: float) -> typing.Tuple[float, float]:
+                partial_xdata = DataAndMetadata.new_data_and_metadata(numpy.full((8, 8), value))
+                data_item.set_data_and_metadata_partial(data_item.data_metadata, partial_xdata, (slice(row, row + 1),), (slice(row, row + 1),))
+                return display_data_channel.display_values.data_range
+
+            DisplayItem._calculate_data_extent = calculate_data_extent_spy
+            try:
+                # the first partial update scans all of the data to find where the minimum and maximum are
+                self.assertEqual((0.0, 2.0), update_row(1, 2.0))
+                self.assertEqual([64], scanned_sizes)
+                # only the updated row is scanned when it can only grow the range
+                self.assertEqual((-1.0, 2.0), update_row(2, -1.0))
+                self.assertEqual((-1.0, 3.0), update_row(4, 3.0))
+                self.assertEqual([64, 8, 8], scanned_sizes)
+                # overwriting the maximum scans all of the data
+                self.assertEqual((-1.0, 2.0), update_row(4, 2.0))
+                self.assertEqual(64, scanned_sizes[-1])
+                self.assertEqual((0.0, 0.0), update_row(3, numpy.nan))
+                self.assertEqual((-1.0, 2.0), update_row(3, 0.5))
+            finally:
+                DisplayItem._calculate_data_extent = calculate_data_extent
+
+    def test_calculate_data_extent_finds_extent_and_indexes(self):
+        rng = numpy.random.default_rng(0)
+        data_list = [
+            rng.normal(size=(300, 400)).astype(numpy.float32),
+            numpy.arange(300 * 400, dtype=numpy.float64).reshape(300, 400),
+            rng.integers(0, 65535, size=(300, 400), dtype=numpy.uint16),
+            rng.integers(-1000, 1000, size=(300, 400), dtype=numpy.int32)[:, ::2],
+        ]
+        for data in data_list:
+            with self.subTest(dtype=data.dtype):
+                min_value, max_value, min_index, max_index = DisplayItem._calculate_data_extent(data)
+                self.assertEqual(numpy.amin(data), min_value)
+                self.assertEqual(numpy.amax(data), max_value)
+                self.assertEqual(min_value, data.flat[min_index])
+                self.assertEqual(max_value, data.flat[max_index])
+
+    def test_display_data_pyramid_levels_are_built_and_updated_from_partial_updates(self):
+        minimum_size = DisplayItem._g_display_data_pyramid_minimum_size
+        DisplayItem._g_display_data_pyramid_minimum_size = 512
+        try:
+            with TestContext.create_memory_context() as test_context:
+                document_model = test_context.create_document_model()
+                data = numpy.random.randn(1030, 515).astype(numpy.float32)
+                data_item = DataItem.DataItem(data.copy())
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                display_data_channel = display_item.display_data_channels[0]
+                display_data_info = display_data_channel.display_values.display_data_info
+                display_data_pyramid = display_data_info.display_data_pyramid
+                self.assertEqual(2, display_data_pyramid.get_level_count(data.shape))
+                self.assertEqual(0, display_data_pyramid.get_level(data.shape, 1.0))
+                self.assertEqual(1, display_data_pyramid.get_level(data.shape, 0.3))
+                self.assertEqual(2, display_data_pyramid.get_level(data.shape, 0.01))
+                # the levels are built on a thread
+                level_ready = threading.Event()
+                with display_data_pyramid.level_ready_event.listen(level_ready.set):
+                    if display_data_info.get_level_display_data_info(2) is None:
+                        self.assertTrue(level_ready.wait(10.0))
+                level_1 = (data[0::2, 0:514:2] + data[1::2, 0:514:2] + data[0::2, 1:514:2] + data[1::2, 1:514:2]) / 4
+                expected_level_1 = numpy.concatenate([level_1, (data[0::2, 514:] + data[1::2, 514:]) / 2], axis=1)
+                level_display_data_info = display_data_info.get_level_display_data_info(1)
+                self.assertTrue(numpy.allclose(expected_level_1, level_display_data_info.display_data_and_metadata.data, atol=1e-6))
+                self.assertEqual(display_data_info.data_range, level_display_data_info.data_range)
+                self.assertEqual((258, 129), display_data_info.get_level_display_data_info(2).display_data_and_metadata.data_shape)
+                # partial updates update the levels without waiting for the thread
+                data[100:110] = 5.0
+                partial_xdata = DataAndMetadata.new_data_and_metadata(data)
+                data_item.set_data_and_metadata_partial(data_item.data_metadata, partial_xdata, (slice(100, 110),), (slice(100, 110),))
+                display_data_info = display_data_channel.display_values.display_data_info
+                level_data = display_data_info.get_level_display_data_info(2).display_data_and_metadata.data
+                self.assertTrue(numpy.allclose(DisplayItem._decimate_data(DisplayItem._decimate_data(data)), level_data))
+                self.assertTrue(numpy.all(level_data[25:27] == 5.0))
+        finally:
+            DisplayItem._g_display_data_pyramid_minimum_size = minimum_size
+
+    def test_display_data_pyramid_is_not_built_for_live_data(self):
+        minimum_size = DisplayItem._g_display_data_pyramid_minimum_size
+        DisplayItem._g_display_data_pyramid_minimum_size = 512
+        try:
+            with TestContext.create_memory_context() as test_context:
+                document_model = test_context.create_document_model()
+                data_item = DataItem.DataItem(numpy.random.randn(1030, 515).astype(numpy.float32))
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                display_data_channel = display_item.display_data_channels[0]
+                data_item._enter_live_state()
+                try:
+                    display_data_info = display_data_channel.display_values.display_data_info
+                    self.assertIsNone(display_data_info.display_data_pyramid)
+                    self.assertIsNone(display_data_info.get_level_display_data_info(1))
+                finally:
+                    data_item._exit_live_state()
+                self.assertIsNotNone(display_data_channel.display_values.display_data_info.display_data_pyramid)
+        finally:
+            DisplayItem._g_display_data_pyramid_minimum_size = minimum_size
+
+    def test_integer_display_rgba_by_lookup_table_matches_display_of_float_data(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            for dtype, display_limits in ((numpy.uint8, (10.5, 200.25)), (numpy.uint16, (-100, 3000)), (numpy.int16, (-20000.0, 10000.0))):
+                iinfo = numpy.iinfo(dtype)
+                data = numpy.random.randint(iinfo.min, iinfo.max + 1, (64, 48)).astype(dtype)
+                data_item = DataItem.DataItem(data)
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                display_data_channel = display_item.display_data_channels[0]
+                display_data_channel.display_limits = display_limits
+                for color_map_id, brightness, contrast, adjustments in ((None, 0.0, 1.0, list()), ("hsv", 0.2, 1.7, [{"type": "gamma", "gamma": 0.6}]), ("hsv", 0.0, 1.0, [{"type": "log"}])):
+                    display_data_channel.color_map_id = color_map_id
+                    display_data_channel.brightness = brightness
+                    display_data_channel.contrast = contrast
+                    display_data_channel.adjustments = adjustments
+                    display_data_info = display_data_channel.display_values.display_data_info
+                    derived_display_values = display_data_info.derived_display_values
+                    self.assertTrue(derived_display_values.uses_lookup_table)
+                    float_derived_display_values = display_data_info._replace_display_data(data.astype(numpy.float64)).derived_display_values
+                    self.assertFalse(float_derived_display_values.uses_lookup_table)
+                    self.assertTrue(numpy.array_equal(float_derived_display_values.display_rgba, derived_display_values.display_rgba))
+                # equalization depends on all of the data, so it cannot use a lookup table
+                display_data_channel.adjustments = [{"type": "equalized"}]
+                self.assertFalse(display_data_channel.display_values.display_data_info.derived_display_values.uses_lookup_table)
+
+    def test_display_buffer_pool_reuses_released_buffers_without_overwriting_held_ones(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data_item = DataItem.DataItem(numpy.random.randn(64, 48))
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_data_channel.adjustments = [{"type": "gamma", "gamma": 0.5}]
+            display_buffer_pool = display_data_channel.display_values.display_buffer_pool
+            # the display holds on to the rgba of the last frame while the next frame is calculated
+            display_rgba = display_data_channel.display_values.display_data_info.derived_display_values.display_rgba
+            last_display_rgba = numpy.copy(display_rgba)
+            for i in range(4):
+                data_item.set_data(numpy.random.randn(64, 48))
+                display_data_info = display_data_channel.display_values.display_data_info
+                next_display_rgba = display_data_info.derived_display_values.display_rgba
+                self.assertTrue(numpy.array_equal(last_display_rgba, display_rgba))
+                self.assertFalse(numpy.shares_memory(display_rgba, next_display_rgba))
+                expected_display_rgba = dataclasses.replace(display_data_info, display_buffer_pool=DisplayItem.DisplayBufferPool()).derived_display_values.display_rgba
+                self.assertTrue(numpy.array_equal(expected_display_rgba, next_display_rgba))
+                if i == 0:
+                    allocation_count = display_buffer_pool._allocation_count
+                display_rgba = next_display_rgba
+                last_display_rgba = numpy.copy(display_rgba)
+            # after the first two frames, each frame reuses the buffers released by the frame before the last
+            self.assertEqual(allocation_count, display_buffer_pool._allocation_count)
+
     def test_data_item_setting_slice_width_validates_when_invalid(self):
         with TestContext.create_memory_context() as test_context:
             document_model = test_context.create_document_model()
@@ -49,6 +49,51 @@ class TestHDF5Handler(unittest.TestCase):
                 else:
                     self.assertSequenceEqual(chunk_shape, expected_chunk_shape)
 
+    def test_get_write_chunk_shape_for_data_aligns_chunks_to_data_descriptor(self):
+        data_shapes_dtypes_and_descriptors = [((200, 1024, 1024), 'float32', DataAndMetadata.DataDescriptor(True, 0, 2)),
+                                              ((200, 4096, 4096), 'float32', DataAndMetadata.DataDescriptor(True, 0, 2)),
+                                              ((128, 128, 256, 256), 'float32', DataAndMetadata.DataDescriptor(False, 2, 2)),
+                                              ((256, 256, 2048), 'float32', DataAndMetadata.DataDescriptor(False, 2, 1)),
+                                              ((20, 64, 64, 128, 128), 'float32', DataAndMetadata.DataDescriptor(True, 2, 2)),
+                                              ((20, 64, 64), 'float32', DataAndMetadata.DataDescriptor(True, 0, 2)),
+                                              ((512, 512, 130, 130), 'float32', DataAndMetadata.DataDescriptor(False, 0, 2))]
+        expected_chunk_shapes = [(1, 1024, 1024),
+                                 (1, 36, 4096),
+                                 (1, 2, 256, 256),
+                                 (1, 72, 2048),
+                                 (1, 1, 9, 128, 128),
+                                 None,
+                                 (1, 8, 130, 130)]
+
+        for (data_shape, data_dtype, data_descriptor), expected_chunk_shape in zip(data_shapes_dtypes_and_descriptors, expected_chunk_shapes):
+            with self.subTest(shape=data_shape, dtype=data_dtype):
+                chunk_shape = HDF5Handler.get_write_chunk_shape_for_data(data_shape, data_dtype, data_descriptor)
+
+                if expected_chunk_shape is None:
+                    self.assertIsNone(chunk_shape)
+                else:
+                    self.assertSequenceEqual(chunk_shape, expected_chunk_shape)
+
+    def test_hdf5_file_entry_configures_chunk_cache(self):
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            file_entry = HDF5Handler.HDF5FileEntry(data_dir / "abc.h5")
+            with contextlib.closing(file_entry):
+                mdc_nelmts, rdcc_nslots, rdcc_nbytes, rdcc_w0 = file_entry.fp.id.get_access_plist().get_cache()
+                self.assertEqual(HDF5Handler._g_chunk_cache_nslots, rdcc_nslots)
+                self.assertEqual(HDF5Handler._g_chunk_cache_nbytes, rdcc_nbytes)
+            file_entry = HDF5Handler.HDF5FileEntry(data_dir / "abc.h5", rdcc_nbytes=4 * 1024 * 1024, rdcc_nslots=101)
+            with contextlib.closing(file_entry):
+                mdc_nelmts, rdcc_nslots, rdcc_nbytes, rdcc_w0 = file_entry.fp.id.get_access_plist().get_cache()
+                self.assertEqual(101, rdcc_nslots)
+                self.assertEqual(4 * 1024 * 1024, rdcc_nbytes)
+        finally:
+            shutil.rmtree(data_dir)
+
     def test_hdf5_handler_basic_functionality(self):
         now = datetime.datetime.now()
         current_working_directory = pathlib.Path.cwd()
@@ -92,3 +137,151 @@ class TestHDF5Handler(unittest.TestCase):
         finally:
             #logging.debug("rmtree %s", data_dir)
             shutil.rmtree(data_dir)
+
+    def test_hdf5_handler_writes_data_slice(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = HDF5Handler.HDF5Handler(os.path.join(data_dir, "abc.h5"))
+            with contextlib.closing(h):
+                data = numpy.zeros((6, 5, 4), dtype=numpy.float32)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                write_count = h._write_count
+                data[2:3] = 1.0
+                h.write_data_slice((slice(2, 3),), data, DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                self.assertEqual(write_count + 1, h._write_count)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+                # writing the dataset itself does not write again
+                h.write_data_slice((slice(2, 3),), h.read_data(), DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                self.assertEqual(write_count + 1, h._write_count)
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_hdf5_handler_reads_data_slice(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = HDF5Handler.HDF5Handler(os.path.join(data_dir, "abc.h5"))
+            with contextlib.closing(h):
+                h.write_properties({u"uuid": str(uuid.uuid4())}, now)
+                self.assertIsNone(h.read_data_slice((0, ...)))
+                data = numpy.random.randn(6, 5, 4).astype(numpy.float32)
+                h.write_data(data, DataAndMetadata.DataDescriptor(True, 0, 2), now)
+                for key in [(2, ...), (slice(1, 3), 4), (..., slice(1, 3)), ...]:
+                    d = h.read_data_slice(key)
+                    self.assertIsInstance(d, numpy.ndarray)
+                    self.assertTrue(numpy.array_equal(d, data[key]))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_hdf5_handler_copies_file_from_another_handler(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = HDF5Handler.HDF5Handler(data_dir / "abc.h5")
+            h2 = HDF5Handler.HDF5Handler(data_dir / "def.h5")
+            with contextlib.closing(h), contextlib.closing(h2):
+                data = numpy.random.randn(6, 5)
+                h.write_properties({u"uuid": str(uuid.uuid4())}, now)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                h2.write_properties({u"uuid": str(uuid.uuid4())}, now)
+                self.assertTrue(h2.copy_from(h))
+                self.assertTrue(numpy.array_equal(h2.read_data(), data))
+                # the copy is written independently
+                p2 = {u"uuid": str(uuid.uuid4())}
+                h2.write_properties(p2, now)
+                h2.write_data(numpy.zeros((6, 5)), DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                self.assertEqual(h2.read_properties(), p2)
+                self.assertNotEqual(h.read_properties(), p2)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_hdf5_handler_writes_compressed_data(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            for compression in HDF5Handler.compression_options:
+                with self.subTest(compression=compression):
+                    file_path = data_dir / f"{compression}.h5"
+                    h = HDF5Handler.HDF5Handler(file_path, compression)
+                    with contextlib.closing(h):
+                        p = {u"uuid": str(uuid.uuid4())}
+                        data = numpy.zeros((64, 32, 32), dtype=numpy.float32)
+                        h.write_properties(p, now)
+                        h.write_data(data, DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                        self.assertEqual(compression, h.read_data().compression)
+                        self.assertTrue(h.read_data().shuffle)
+                        data[2:3] = numpy.random.randn(1, 32, 32)
+                        h.write_data_slice((slice(2, 3),), data, DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                        self.assertTrue(numpy.array_equal(h.read_data(), data))
+                        self.assertEqual(h.read_properties(), p)
+                        # reserved data is also compressed
+                        h.reserve_data((8, 8), numpy.float64, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                        self.assertEqual(compression, h.read_data().compression)
+                        self.assertEqual(h.read_properties(), p)
+                    self.assertLess(file_path.stat().st_size, data.nbytes)
+            # data with an empty dimension cannot be chunked and is stored uncompressed
+            self.assertNotIn("compression", HDF5Handler.get_dataset_options((0, 4), numpy.float32, "gzip"))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_hdf5_file_manager_closes_least_recently_used_idle_files(self):
+        now = datetime.datetime.now()
+        current_working_directory = pathlib.Path.cwd()
+        data_dir = current_working_directory / "__Test"
+        if data_dir.exists():
+            shutil.rmtree(data_dir)
+        Cache.db_make_directory_if_needed(data_dir)
+        file_manager = HDF5Handler._file_manager
+        file_manager.max_open_files = 2
+        file_manager.reset_statistics()
+        try:
+            handlers = [HDF5Handler.HDF5Handler(data_dir / f"{i}.h5") for i in range(4)]
+            try:
+                for i, h in enumerate(handlers):
+                    h.write_properties({"uuid": str(uuid.uuid4()), "index": i}, now)
+                    h.write_data(numpy.full((4, 4), i, dtype=numpy.float32), DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                    self.assertLessEqual(file_manager.statistics.open_file_count, 2)
+                # a dataset which is still referenced keeps its file open
+                d0 = handlers[0].read_data()
+                for h in handlers[1:]:
+                    self.assertEqual(h.read_properties()["index"], handlers.index(h))
+                    self.assertEqual(2, file_manager.statistics.open_file_count)
+                self.assertTrue(numpy.array_equal(d0, numpy.full((4, 4), 0)))
+                d0 = None
+                # closed files are reopened when used
+                for i, h in enumerate(handlers):
+                    self.assertTrue(numpy.array_equal(h.read_data(), numpy.full((4, 4), i)))
+                    self.assertLessEqual(file_manager.statistics.open_file_count, 2)
+                statistics = file_manager.statistics
+                self.assertLess(statistics.hit_rate, 1.0)
+                self.assertLess(0, statistics.reopen_count)
+                self.assertLess(0.0, statistics.reopen_latency_s)
+            finally:
+                for h in handlers:
+                    h.close()
+            self.assertEqual(0, file_manager.statistics.open_file_count)
+        finally:
+            file_manager.max_open_files = None
+            shutil.rmtree(data_dir)
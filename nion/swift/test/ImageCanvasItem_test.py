@@ -1,6 +1,7 @@
 # standard libraries
 import logging
 import math
+import threading
 import typing
 import unittest
 
@@ -12,6 +13,7 @@ from nion.data import Calibration
 from nion.data import DataAndMetadata
 from nion.swift import Application
 from nion.swift.model import DataItem
+from nion.swift.model import DisplayItem
 from nion.swift.model import Graphics
 from nion.swift.test import TestContext
 from nion.ui import CanvasItem
@@ -313,6 +315,85 @@ class TestImageCanvasItemClass(unittest.TestCase):
             document_controller.tool_mode = "hand"
             display_panel.display_canvas_item.simulate_press((100,125))
 
+    def test_large_image_displayed_at_reduced_scale_uses_decimated_display_data(self):
+        minimum_size = DisplayItem._g_display_data_pyramid_minimum_size
+        DisplayItem._g_display_data_pyramid_minimum_size = 512
+        try:
+            with TestContext.create_memory_context() as test_context:
+                document_controller = test_context.create_document_controller()
+                document_model = document_controller.document_model
+                display_panel = document_controller.selected_display_panel
+                data_item = DataItem.DataItem(numpy.random.randn(1024, 1024).astype(numpy.float32))
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                display_panel.set_display_panel_display_item(display_item)
+                header_height = display_panel.header_canvas_item.header_height
+                display_panel.layout_immediate((300 + header_height, 300))
+                display_canvas_item = display_panel.display_canvas_item
+                # the full display data is used until the level is built on a thread
+                display_data_pyramid = display_item.display_data_channels[0].display_values.display_data_pyramid
+                level_ready = threading.Event()
+                with display_data_pyramid.level_ready_event.listen(level_ready.set):
+                    display_canvas_item.update_canvas_items()
+                    if display_canvas_item._bitmap_canvas_item_for_test.data.shape == (1024, 1024):
+                        self.assertTrue(level_ready.wait(10.0))
+                display_canvas_item.update_canvas_items()
+                self.assertEqual((512, 512), display_canvas_item._bitmap_canvas_item_for_test.data.shape)
+                # at full scale, the full display data is used
+                display_panel.layout_immediate((1100 + header_height, 1100))
+                display_canvas_item.update_canvas_items()
+                self.assertEqual((1024, 1024), display_canvas_item._bitmap_canvas_item_for_test.data.shape)
+        finally:
+            DisplayItem._g_display_data_pyramid_minimum_size = minimum_size
+
+    def test_large_image_zoomed_in_renders_and_reuses_visible_tiles(self):
+        minimum_size = DisplayItem._g_display_data_pyramid_minimum_size
+        DisplayItem._g_display_data_pyramid_minimum_size = 512
+        try:
+            with TestContext.create_memory_context() as test_context:
+                document_controller = test_context.create_document_controller()
+                document_model = document_controller.document_model
+                display_panel = document_controller.selected_display_panel
+                data_item = DataItem.DataItem(numpy.random.randn(1024, 1024).astype(numpy.float32))
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                display_panel.set_display_panel_display_item(display_item)
+                header_height = display_panel.header_canvas_item.header_height
+                display_panel.layout_immediate((300 + header_height, 300))
+                display_canvas_item = display_panel.display_canvas_item
+                display_tile_cache = display_item.display_data_channels[0].display_values.display_tile_cache
+                # zoomed in, the center quarter of the image is visible; it intersects four tiles
+                display_item.set_display_property("image_canvas_mode", "custom")
+                display_item.set_display_property("image_zoom", 4.0)
+                document_controller.periodic()
+                display_canvas_item.update_canvas_items()
+                tiles = display_canvas_item._tiles_canvas_item_for_test.tiles
+                self.assertEqual(4, len(tiles))
+                self.assertIsNone(display_canvas_item._bitmap_canvas_item_for_test.data)
+                self.assertEqual(4, display_tile_cache._tile_count)
+                display_rgba = display_item.display_data_channels[0].display_values.display_data_info.derived_display_values.display_rgba
+                tile_rect, tile_rgba = tiles[0]
+                self.assertEqual(Geometry.FloatRect.from_tlbr(0.25, 0.25, 0.5, 0.5), tile_rect)
+                self.assertTrue(numpy.array_equal(display_rgba[256:512, 256:512], tile_rgba))
+                # panning reuses the tiles rendered earlier and only renders the tiles coming into view
+                display_item.set_display_property("image_position", (0.3, 0.5))
+                document_controller.periodic()
+                display_canvas_item.update_canvas_items()
+                self.assertEqual(4, len(display_canvas_item._tiles_canvas_item_for_test.tiles))
+                self.assertEqual(6, display_tile_cache._tile_count)
+                display_item.set_display_property("image_position", (0.5, 0.5))
+                document_controller.periodic()
+                display_canvas_item.update_canvas_items()
+                self.assertEqual(4, len(display_canvas_item._tiles_canvas_item_for_test.tiles))
+                self.assertEqual(6, display_tile_cache._tile_count)
+                # when the whole image is visible, it is not tiled
+                display_panel.perform_action("set_fit_mode")
+                display_canvas_item.update_canvas_items()
+                self.assertEqual(0, len(display_canvas_item._tiles_canvas_item_for_test.tiles))
+                self.assertIsNotNone(display_canvas_item._bitmap_canvas_item_for_test.data)
+        finally:
+            DisplayItem._g_display_data_pyramid_minimum_size = minimum_size
+
     def test_zoom_tool_in_and_out_around_clicked_point_fit_mode(self):
         with TestContext.create_memory_context() as test_context:
             document_controller = test_context.create_document_controller()
@@ -9,6 +9,7 @@ import os
 import shutil
 import unittest
 import uuid
+import zipfile
 
 # third party libraries
 import numpy
@@ -142,6 +143,237 @@ class TestNDataHandlerClass(unittest.TestCase):
             #logging.debug("rmtree %s", data_dir)
             shutil.rmtree(data_dir)
 
+    def test_ndata_writes_same_bytes_as_numpy_save_in_chunks(self):
+        old_write_chunk_size = NDataHandler._write_chunk_size
+        NDataHandler._write_chunk_size = 100
+        try:
+            data_list = [
+                numpy.random.randn(37, 41),
+                numpy.random.randn(37, 41)[::2, 1::3],
+                numpy.asfortranarray(numpy.random.randn(13, 17)),
+                numpy.arange(24, dtype=numpy.uint16).reshape(2, 3, 4).transpose(1, 0, 2),
+                numpy.zeros((0, 5)),
+                numpy.arange(10, dtype=numpy.complex64),
+            ]
+            for data in data_list:
+                with self.subTest(shape=data.shape, dtype=data.dtype):
+                    expected_io = io.BytesIO()
+                    numpy.save(expected_io, data)
+                    npy_io = io.BytesIO()
+                    crc32 = NDataHandler.write_npy(npy_io, data)
+                    self.assertEqual(expected_io.getvalue(), npy_io.getvalue())
+                    self.assertEqual(binascii.crc32(expected_io.getvalue()), crc32)
+        finally:
+            NDataHandler._write_chunk_size = old_write_chunk_size
+
+    def test_ndata_handler_memory_maps_data_when_enabled(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        old_memory_map_data = NDataHandler._g_memory_map_data
+        NDataHandler._g_memory_map_data = True
+        try:
+            h = NDataHandler.NDataHandler(os.path.join(data_dir, "abc.ndata"))
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4())}
+                data = numpy.random.randn(16, 8).astype(numpy.float32)
+                h.write_properties(p, now)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                d = h.read_data()
+                self.assertIsInstance(d, numpy.memmap)
+                self.assertTrue(numpy.array_equal(d, data))
+                # writing to the mapped data does not modify the file
+                d[0, 0] = 100
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+                # rewriting data and properties keeps the existing map valid
+                h.write_data(numpy.zeros((32, 32), dtype=numpy.int16), DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                h.write_properties(p, now)
+                self.assertEqual(d[0, 0], 100)
+                self.assertTrue(numpy.array_equal(d[1:], data[1:]))
+                self.assertEqual(h.read_properties(), p)
+                dd = h.read_data()
+                self.assertEqual(dd.shape, (32, 32))
+                self.assertEqual(dd.dtype, numpy.int16)
+                d = dd = None
+        finally:
+            NDataHandler._g_memory_map_data = old_memory_map_data
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_writing_data_slice_keeps_memory_mapped_data_valid(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        old_memory_map_data = NDataHandler._g_memory_map_data
+        NDataHandler._g_memory_map_data = True
+        try:
+            h = NDataHandler.NDataHandler(os.path.join(data_dir, "abc.ndata"))
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4())}
+                data = numpy.arange(16 * 8, dtype=numpy.float32).reshape(16, 8)
+                h.write_properties(p, now)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                d = h.read_data()
+                self.assertIsInstance(d, numpy.memmap)
+                new_data = numpy.copy(data)
+                new_data[10:12] = -1
+                h.write_data_slice((slice(10, 12),), new_data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                # the held map still has the old data
+                self.assertTrue(numpy.array_equal(d, data))
+                self.assertTrue(numpy.array_equal(h.read_data(), new_data))
+                self.assertEqual(h.read_properties(), p)
+                d = None
+        finally:
+            NDataHandler._g_memory_map_data = old_memory_map_data
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_writes_data_slice_in_place(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            file_path = os.path.join(data_dir, "abc.ndata")
+            h = NDataHandler.NDataHandler(file_path)
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4())}
+                data = numpy.zeros((6, 5, 4), dtype=numpy.float32)
+                h.write_properties(p, now)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                file_size = os.path.getsize(file_path)
+                for dst_slice in [(slice(2, 3),), (slice(1, 4), slice(2, 4), slice(1, 3)), (slice(0, 6), slice(4, 5), slice(0, 4))]:
+                    data[dst_slice] = numpy.random.randn(*data[dst_slice].shape)
+                    h.write_data_slice(dst_slice, data, DataAndMetadata.DataDescriptor(False, 1, 2), now)
+                    self.assertEqual(file_size, os.path.getsize(file_path))
+                    self.assertTrue(numpy.array_equal(h.read_data(), data))
+                    self.assertEqual(h.read_properties(), p)
+                    # ensure the crc32 in the zip file is still valid
+                    with zipfile.ZipFile(file_path) as z:
+                        self.assertIsNone(z.testzip())
+                # a slice of data with a different shape writes all of the data
+                data = numpy.ones((3, 3), dtype=numpy.float32)
+                h.write_data_slice((slice(0, 1), slice(0, 3)), data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_reads_data_slice(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = NDataHandler.NDataHandler(os.path.join(data_dir, "abc.ndata"))
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4())}
+                h.write_properties(p, now)
+                self.assertIsNone(h.read_data_slice((0, ...)))
+                data = numpy.random.randn(6, 5, 4).astype(numpy.float32)
+                h.write_data(data, DataAndMetadata.DataDescriptor(True, 0, 2), now)
+                for key in [(2, ...), (slice(1, 3), 4), (..., slice(1, 3)), ...]:
+                    d = h.read_data_slice(key)
+                    self.assertNotIsInstance(d, numpy.memmap)
+                    self.assertTrue(numpy.array_equal(d, data[key]))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_copies_file_from_another_handler(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            h = NDataHandler.NDataHandler(os.path.join(data_dir, "abc.ndata"))
+            h2 = NDataHandler.NDataHandler(os.path.join(data_dir, "def.ndata"))
+            with contextlib.closing(h), contextlib.closing(h2):
+                data = numpy.random.randn(6, 5)
+                h.write_properties({u"uuid": str(uuid.uuid4())}, now)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                self.assertTrue(h2.copy_from(h))
+                self.assertTrue(numpy.array_equal(h2.read_data(), data))
+                # the copy is written independently
+                p2 = {u"uuid": str(uuid.uuid4())}
+                h2.write_properties(p2, now)
+                h2.write_data(numpy.zeros((3, 3)), DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                self.assertEqual(h2.read_properties(), p2)
+                self.assertNotEqual(h.read_properties(), p2)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+        finally:
+            #logging.debug("rmtree %s", data_dir)
+            shutil.rmtree(data_dir)
+
+    def test_ndata_parses_zip_from_central_directory(self):
+        zip_io = io.BytesIO()
+        with zipfile.ZipFile(zip_io, "w") as z:
+            z.writestr("data.npy", b"0" * 100)
+            z.writestr("metadata.json", b"{}")
+            z.comment = b"comment"
+        zip_io.seek(0)
+        local_files, dir_files, eocd = NDataHandler._parse_zip_central_directory(zip_io)
+        self.assertEqual((local_files, dir_files, eocd), NDataHandler._parse_zip_local_files(zip_io))
+        name_bytes, data_pos, data_len, crc32 = local_files[dir_files[b"metadata.json"][1]]
+        zip_io.seek(data_pos)
+        self.assertEqual(b"{}", zip_io.read(data_len))
+        self.assertEqual(binascii.crc32(b"{}"), crc32)
+
+    def test_ndata_handler_writes_zip64_when_data_exceeds_limit(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        old_zip64_limit = NDataHandler._zip64_limit
+        NDataHandler._zip64_limit = 64
+        try:
+            file_path = os.path.join(data_dir, "abc.ndata")
+            h = NDataHandler.NDataHandler(file_path)
+            with contextlib.closing(h):
+                p = {u"uuid": str(uuid.uuid4())}
+                data = numpy.random.randn(16, 8)
+                h.write_properties(p, now)
+                h.write_data(data, DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                with open(file_path, "rb") as fp:
+                    self.assertEqual(NDataHandler._parse_zip_central_directory(fp), NDataHandler._parse_zip_local_files(fp))
+                with zipfile.ZipFile(file_path) as z:
+                    self.assertIsNone(z.testzip())
+                    self.assertEqual(data.nbytes, numpy.load(io.BytesIO(z.read("data.npy"))).nbytes)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+                self.assertEqual(h.read_properties(), p)
+                # rewriting the properties keeps the data
+                p["abc"] = "def"
+                h.write_properties(p, now)
+                self.assertTrue(numpy.array_equal(h.read_data(), data))
+                self.assertEqual(h.read_properties(), p)
+                with zipfile.ZipFile(file_path) as z:
+                    self.assertIsNone(z.testzip())
+        finally:
+            NDataHandler._zip64_limit = old_zip64_limit
+            shutil.rmtree(data_dir)
+
+    def test_ndata_handler_reads_properties_changed_by_another_handler(self):
+        now = datetime.datetime.now()
+        current_working_directory = os.getcwd()
+        data_dir = os.path.join(current_working_directory, "__Test")
+        Cache.db_make_directory_if_needed(data_dir)
+        try:
+            file_path = os.path.join(data_dir, "abc.ndata")
+            h = NDataHandler.NDataHandler(file_path)
+            h2 = NDataHandler.NDataHandler(file_path)
+            with contextlib.closing(h), contextlib.closing(h2):
+                h.write_properties({"uuid": str(uuid.uuid4()), "a": 1}, now)
+                h.write_data(numpy.zeros((4, 4)), DataAndMetadata.DataDescriptor(False, 0, 2), now)
+                self.assertEqual(1, h.read_properties()["a"])
+                # the other handler resets the file time; the cached index must still be invalidated.
+                h2.write_properties({"uuid": str(uuid.uuid4()), "a": 1, "b": "longer properties"}, now)
+                self.assertEqual("longer properties", h.read_properties()["b"])
+                self.assertTrue(numpy.array_equal(numpy.zeros((4, 4)), h.read_data()))
+        finally:
+            shutil.rmtree(data_dir)
+
     def test_ndata_handles_corrupt_data(self):
         logging.getLogger().setLevel(logging.DEBUG)
         now = datetime.datetime.now()
@@ -47,6 +47,32 @@ class TestRecorderPanelClass(unittest.TestCase):
             self.assertTrue(recorded_data_item.is_sequence)
             self.assertEqual((4, 8, 8), recorded_data_item.dimensional_shape)
 
+    def test_recorder_writes_each_frame_into_reserved_sequence(self):
+        with TestContext.create_memory_context() as test_context:
+            document_controller = test_context.create_document_controller()
+            document_model = document_controller.document_model
+            data_item = DataItem.DataItem(numpy.zeros((8, 8), dtype=numpy.float32))
+            document_model.append_data_item(data_item)
+            recorder = RecorderPanel.Recorder(document_controller, data_item)
+            with contextlib.closing(recorder):
+                with document_model.data_item_live(data_item):
+                    recorder.start_recording(10, 1, 4)
+                    for i in range(3):
+                        recorder.continue_recording(10 + i + 0.25)
+                        document_model.perform_data_item_updates()
+                        recorded_data_item = document_model.data_items[1]
+                        self.assertEqual((4, 8, 8), recorded_data_item.dimensional_shape)
+                        self.assertEqual(numpy.float32, recorded_data_item.data_dtype)
+                        self.assertEqual("s", recorded_data_item.dimensional_calibrations[0].units)
+                        data_item.set_data(data_item.data + 1)
+                    # stopping early keeps only the recorded frames
+                    recorder.stop_recording()
+            recorded_data_item = document_model.data_items[1]
+            self.assertEqual((3, 8, 8), recorded_data_item.dimensional_shape)
+            self.assertTrue(recorded_data_item.is_sequence)
+            for i in range(3):
+                self.assertTrue(numpy.array_equal(numpy.full((8, 8), i), recorded_data_item.data[i]))
+
     def test_recorder_puts_recorded_data_item_under_transaction(self):
         with TestContext.create_memory_context() as test_context:
             document_controller = test_context.create_document_controller()
@@ -12,9 +12,11 @@ import shutil
 import threading
 import typing
 import unittest
+import unittest.mock
 import uuid
 
 # third party libraries
+import h5py
 import numpy
 
 # local libraries
@@ -30,16 +32,19 @@ from nion.swift.model import Cache
 from nion.swift.model import Connection
 from nion.swift.model import DataGroup
 from nion.swift.model import DataItem
+from nion.swift.model import DisplayItem
 from nion.swift.model import DocumentModel
 from nion.swift.model import DynamicString
 from nion.swift.model import FileStorageSystem
 from nion.swift.model import Graphics
+from nion.swift.model import NDataHandler
 from nion.swift.model import Persistence
 from nion.swift.model import Profile
 from nion.swift.model import Symbolic
 from nion.swift.test import TestContext
 from nion.ui import TestUI
 from nion.utils import DateTime
+from nion.utils import Event
 from nion.utils import Geometry
 from nion.utils import Registry
 
@@ -291,6 +296,107 @@ class TestStorageClass(unittest.TestCase):
                 read_display_item = document_model.get_display_item_for_data_item(read_data_item)
                 self.assertEqual(read_display_item.display_data_channels[0].display_values.data_range, data_range)
 
+    def test_project_manifest_is_used_for_unchanged_data_items_and_invalidated_by_writes(self):
+        old_manifest_minimum_age_ns = FileStorageSystem._g_manifest_minimum_age_ns
+        FileStorageSystem._g_manifest_minimum_age_ns = 0
+        try:
+            with create_temp_profile_context() as profile_context:
+                document_model = profile_context.create_document_model(auto_close=False)
+                with document_model.ref():
+                    data_item = DataItem.DataItem(numpy.ones((16, 16), numpy.uint32))
+                    document_model.append_data_item(data_item)
+                    data_item.title = "one"
+                    manifest_path = document_model._project.project_storage_system._manifest_path
+                # read it back; this will write the manifest
+                document_model = profile_context.create_document_model(auto_close=False)
+                with document_model.ref():
+                    self.assertEqual("one", document_model.data_items[0].title)
+                with manifest_path.open("r") as fp:
+                    self.assertEqual(1, len(json.load(fp)["items"]))
+                # read it back using the manifest; then change the data item
+                document_model = profile_context.create_document_model(auto_close=False)
+                with document_model.ref():
+                    self.assertEqual("one", document_model.data_items[0].title)
+                    self.assertTrue(numpy.array_equal(numpy.ones((16, 16), numpy.uint32), document_model.data_items[0].data))
+                    document_model.data_items[0].title = "two"
+                    self.assertFalse(manifest_path.exists())
+                with manifest_path.open("r") as fp:
+                    self.assertEqual(0, len(json.load(fp)["items"]))
+                # read it back; the changed data item must not come from the manifest
+                document_model = profile_context.create_document_model(auto_close=False)
+                with document_model.ref():
+                    self.assertEqual("two", document_model.data_items[0].title)
+        finally:
+            FileStorageSystem._g_manifest_minimum_age_ns = old_manifest_minimum_age_ns
+
+    def test_display_item_changes_are_journaled_and_compacted_into_project_file_on_close(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                data_item = DataItem.DataItem(numpy.ones((16, 16), numpy.uint32))
+                document_model.append_data_item(data_item)
+                display_item = document_model.get_display_item_for_data_item(data_item)
+                project_storage_system = document_model._project.project_storage_system
+                project_path = project_storage_system.project_path
+                project_bytes = project_path.read_bytes()
+                display_item.display_type = "line_plot"
+                self.assertEqual(project_bytes, project_path.read_bytes())
+                self.assertTrue(project_storage_system._journal_path.exists())
+            self.assertFalse(project_storage_system._journal_path.exists())
+            with project_path.open("r") as fp:
+                self.assertEqual("line_plot", json.load(fp)["display_items"][0]["display_type"])
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertEqual("line_plot", document_model.display_items[0].display_type)
+
+    def test_data_write_queue_coalesces_writes_and_serves_pending_data(self):
+        write_started_event = threading.Event()
+        continue_event = threading.Event()
+        written_data_list = list()
+
+        class BlockingStorageHandler(FileStorageSystem.MemoryStorageHandler):
+            def write_data(self, data, data_descriptor, file_datetime):
+                written_data_list.append(numpy.copy(data))
+                write_started_event.set()
+                continue_event.wait(10.0)
+                super().write_data(data, data_descriptor, file_datetime)
+
+        data_item = DataItem.DataItem()
+        data_item_uuid = uuid.uuid4()
+        data_map = dict()
+        storage_handler = BlockingStorageHandler(str(data_item_uuid), dict(), data_map, Event.Event())
+        storage_adapter = FileStorageSystem.DataItemStorageAdapter(storage_handler, dict())
+        data_descriptor = DataAndMetadata.DataDescriptor(False, 0, 2)
+        data_write_queue = FileStorageSystem.DataWriteQueue(1024 * 1024)
+        with contextlib.closing(data_item), contextlib.closing(storage_adapter), contextlib.closing(data_write_queue):
+            data_write_queue.write_data(data_item_uuid, storage_adapter, data_item, numpy.full((4, 4), 1), data_descriptor)
+            self.assertTrue(write_started_event.wait(10.0))
+            # the first write is in progress; these writes are coalesced
+            for i in range(2, 5):
+                data_write_queue.write_data(data_item_uuid, storage_adapter, data_item, numpy.full((4, 4), i), data_descriptor)
+            self.assertTrue(numpy.array_equal(numpy.full((4, 4), 4), data_write_queue.get_pending_data(data_item_uuid)))
+            continue_event.set()
+            data_write_queue.wait_idle()
+            self.assertIsNone(data_write_queue.get_pending_data(data_item_uuid))
+            self.assertEqual([1, 4], [int(d[0, 0]) for d in written_data_list])
+            self.assertTrue(numpy.array_equal(numpy.full((4, 4), 4), storage_handler.read_data()))
+
+    def test_data_written_in_background_is_available_before_and_after_reload(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            data = numpy.random.randn(64, 64)
+            with document_model.ref():
+                data_item = DataItem.DataItem(numpy.zeros((64, 64)))
+                document_model.append_data_item(data_item)
+                data_item.set_data(data)
+                project_storage_system = document_model._project.project_storage_system
+                self.assertTrue(numpy.array_equal(data, project_storage_system.read_external_data(data_item, "data")))
+                project_storage_system.flush_data()
+                self.assertTrue(numpy.array_equal(data, project_storage_system.read_external_data(data_item, "data")))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertTrue(numpy.array_equal(data, document_model.data_items[0].data))
+
     def test_thumbnail_does_not_get_invalidated_upon_reading(self):
         # tests caching on display
         with create_temp_profile_context() as profile_context:
@@ -383,6 +489,63 @@ class TestStorageClass(unittest.TestCase):
             with document_model.ref():
                     self.assertEqual(data_read_count_ref[0], 0)
 
+    def test_displaying_large_sequence_reads_only_displayed_frame(self):
+        with create_memory_profile_context() as profile_context:
+            data = numpy.random.randn(4, 8, 8).astype(numpy.float32)
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                data_item = DataItem.DataItem()
+                data_item.set_data_and_metadata(DataAndMetadata.new_data_and_metadata(data.copy(), data_descriptor=DataAndMetadata.DataDescriptor(True, 0, 2)))
+                document_model.append_data_item(data_item)
+            # read it back
+            data_read_count_ref = [0]
+            def data_read(uuid):
+                data_read_count_ref[0] += 1
+            old_lazy_display_data_nbytes = DisplayItem._g_lazy_display_data_nbytes
+            DisplayItem._g_lazy_display_data_nbytes = 0
+            try:
+                listener = profile_context._test_data_read_event.listen(data_read)
+                with contextlib.closing(listener):
+                    document_model = profile_context.create_document_model(auto_close=False)
+                    with document_model.ref():
+                        display_item = document_model.display_items[0]
+                        display_data_channel = display_item.display_data_channels[0]
+                        display_item.increment_display_ref_count()
+                        try:
+                            for sequence_index in range(4):
+                                display_data_channel.sequence_index = sequence_index
+                                element_data = display_data_channel.display_values.element_data_and_metadata.data
+                                self.assertTrue(numpy.array_equal(data[sequence_index], element_data))
+                            self.assertFalse(display_item.data_item.is_data_loaded)
+                            self.assertEqual(0, data_read_count_ref[0])
+                        finally:
+                            display_item.decrement_display_ref_count()
+            finally:
+                DisplayItem._g_lazy_display_data_nbytes = old_lazy_display_data_nbytes
+
+    def test_displaying_unloaded_image_loads_it_instead_of_reading_slices(self):
+        with create_memory_profile_context() as profile_context:
+            data = numpy.random.randn(8, 8).astype(numpy.float32)
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                document_model.append_data_item(DataItem.DataItem(data.copy()))
+            # read it back
+            old_lazy_display_data_nbytes = DisplayItem._g_lazy_display_data_nbytes
+            DisplayItem._g_lazy_display_data_nbytes = 0
+            try:
+                document_model = profile_context.create_document_model(auto_close=False)
+                with document_model.ref():
+                    display_item = document_model.display_items[0]
+                    display_data_channel = display_item.display_data_channels[0]
+                    data_item = display_item.data_item
+                    self.assertFalse(data_item.is_data_loaded)
+                    with unittest.mock.patch.object(data_item, "read_data_slice", wraps=data_item.read_data_slice) as read_data_slice:
+                        element_data = display_data_channel.display_values.element_data_and_metadata.data
+                        self.assertTrue(numpy.array_equal(data, element_data))
+                        read_data_slice.assert_not_called()
+            finally:
+                DisplayItem._g_lazy_display_data_nbytes = old_lazy_display_data_nbytes
+
     def test_reload_data_item_initializes_display_slice(self):
         with create_memory_profile_context() as profile_context:
             document_model = profile_context.create_document_model(auto_close=False)
@@ -898,6 +1061,36 @@ class TestStorageClass(unittest.TestCase):
                 self.assertTrue(numpy.array_equal(document_model.data_items[0].data, data16))
                 self.assertEqual(99, document_model.data_items[0].metadata["a"])
 
+    def test_snapshot_copies_data_file_of_unmodified_data(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            data4 = numpy.random.randn(4, 4)
+            data16 = numpy.random.randn(16, 16)
+            with document_model.ref():
+                old_large_format_size = FileStorageSystem._g_large_format_size
+                FileStorageSystem._g_large_format_size = 256
+                try:
+                    for data in (data4, data16):
+                        data_item = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data, metadata={"a": 99}))
+                        document_model.append_data_item(data_item)
+                        display_item = document_model.get_display_item_for_data_item(data_item)
+                        data_item_copy = document_model.get_display_item_snapshot_new(display_item).data_item
+                        self.assertEqual(data_item, data_item_copy.data_copy_source)
+                        file_path = pathlib.Path(data_item._test_get_file_path())
+                        copy_file_path = pathlib.Path(data_item_copy._test_get_file_path())
+                        self.assertNotEqual(file_path, copy_file_path)
+                        self.assertEqual(file_path.suffix, copy_file_path.suffix)
+                        self.assertTrue(copy_file_path.exists())
+                finally:
+                    FileStorageSystem._g_large_format_size = old_large_format_size
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertEqual(4, len(document_model.data_items))
+                for data_item, data in zip(document_model.data_items, (data4, data4, data16, data16)):
+                    self.assertTrue(numpy.array_equal(data_item.data, data))
+                    self.assertEqual(99, data_item.metadata["a"])
+                self.assertEqual(4, len({data_item.uuid for data_item in document_model.data_items}))
+
     def test_file_format_adjusts_to_data_size_when_reserved(self):
         with create_temp_profile_context() as profile_context:
             document_model = profile_context.create_document_model(auto_close=False)
@@ -928,6 +1121,132 @@ class TestStorageClass(unittest.TestCase):
             with document_model.ref():
                 self.assertTrue(numpy.array_equal(document_model.data_items[0].data, data16))
 
+    def test_project_storage_compression_writes_compressed_hdf5_files(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            data = numpy.zeros((64, 64))
+            with document_model.ref():
+                document_model._project.storage_compression = "gzip"
+                data_item = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data))
+                document_model.append_data_item(data_item)
+                document_model._project.project_storage_system.flush_data()
+                h5_file_path = pathlib.Path(data_item._test_get_file_path())
+                self.assertEqual(".h5", h5_file_path.suffix)
+            with h5py.File(h5_file_path, "r") as fp:
+                self.assertEqual("gzip", fp["data"].compression)
+            self.assertLess(h5_file_path.stat().st_size, data.nbytes)
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertEqual("gzip", document_model._project.storage_compression)
+                self.assertTrue(numpy.array_equal(document_model.data_items[0].data, data))
+                # turning off compression writes new data items to uncompressed files
+                document_model._project.storage_compression = None
+                data_item = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(numpy.zeros((4, 4))))
+                document_model.append_data_item(data_item)
+                document_model._project.project_storage_system.flush_data()
+                self.assertEqual(".ndata", pathlib.Path(data_item._test_get_file_path()).suffix)
+
+    def test_project_storage_deduplication_stores_identical_data_once(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            data = numpy.random.randn(16, 16)
+            data2 = numpy.random.randn(8)
+            with document_model.ref():
+                document_model._project.storage_deduplication = True
+                project_storage_system = document_model._project.project_storage_system
+                data_blob_store = project_storage_system._get_data_blob_store()
+                data_item1 = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data))
+                data_item2 = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(numpy.copy(data)))
+                data_item3 = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data2))
+                for data_item in (data_item1, data_item2, data_item3):
+                    document_model.append_data_item(data_item)
+                project_storage_system.flush_data()
+                self.assertEqual(2, len(list(data_blob_store.directory.glob("*.npy"))))
+                self.assertEqual({2, 1}, set(data_blob_store.reference_counts.values()))
+                self.assertLess(pathlib.Path(data_item1._test_get_file_path()).stat().st_size, data.nbytes)
+                # data of a removed data item is kept until the trash is emptied
+                document_model.remove_data_item(data_item3)
+                self.assertEqual(2, len(list(data_blob_store.directory.glob("*.npy"))))
+                # changing the data stores the new data
+                data_item2.set_data(numpy.ones((4, 4)))
+                project_storage_system.flush_data()
+                self.assertEqual({1}, set(data_blob_store.reference_counts.values()))
+                self.assertEqual(3, len(list(data_blob_store.directory.glob("*.npy"))))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertTrue(document_model._project.storage_deduplication)
+                self.assertEqual(2, len(document_model.data_items))
+                self.assertTrue(numpy.array_equal(data, document_model.data_items[0].data))
+                self.assertTrue(numpy.array_equal(numpy.ones((4, 4)), document_model.data_items[1].data))
+                data_blob_store = document_model._project.project_storage_system._get_data_blob_store()
+                self.assertEqual(2, len(list(data_blob_store.directory.glob("*.npy"))))
+                # turning off deduplication writes changed data to the data item file
+                document_model._project.storage_deduplication = False
+                document_model.data_items[1].set_data(numpy.zeros((4, 4)))
+                self.assertEqual(1, len(list(data_blob_store.directory.glob("*.npy"))))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertTrue(numpy.array_equal(data, document_model.data_items[0].data))
+                self.assertTrue(numpy.array_equal(numpy.zeros((4, 4)), document_model.data_items[1].data))
+
+    def test_project_storage_deduplication_stores_data_on_data_writer(self):
+        thread_names = list()
+        get_key = FileStorageSystem.DataBlobStore.get_key
+        def get_key_on_thread(data):
+            thread_names.append(threading.current_thread().name)
+            return get_key(data)
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            data = numpy.random.randn(16, 16)
+            with document_model.ref():
+                document_model._project.storage_deduplication = True
+                project_storage_system = document_model._project.project_storage_system
+                with unittest.mock.patch.object(FileStorageSystem.DataBlobStore, "get_key", staticmethod(get_key_on_thread)):
+                    data_item = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data))
+                    document_model.append_data_item(data_item)
+                    data_item.set_data(data + 1)
+                    project_storage_system.flush_data()
+                self.assertTrue(thread_names)
+                self.assertEqual({"data writer"}, set(thread_names))
+                self.assertEqual(1, len(list(project_storage_system._get_data_blob_store().directory.glob("*.npy"))))
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertTrue(numpy.array_equal(data + 1, document_model.data_items[0].data))
+
+    def test_project_storage_deduplication_keeps_data_of_unreadable_data_items(self):
+        with create_temp_profile_context() as profile_context:
+            document_model = profile_context.create_document_model(auto_close=False)
+            data = numpy.random.randn(16, 16)
+            data2 = numpy.random.randn(8)
+            with document_model.ref():
+                document_model._project.storage_deduplication = True
+                project_storage_system = document_model._project.project_storage_system
+                data_item1 = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data))
+                data_item2 = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(numpy.copy(data)))
+                data_item3 = DataItem.new_data_item(DataAndMetadata.new_data_and_metadata(data2))
+                for data_item in (data_item1, data_item2, data_item3):
+                    document_model.append_data_item(data_item)
+                project_storage_system.flush_data()
+                data_blob_directory = project_storage_system._get_data_blob_store().directory
+                unreadable_file_paths = [pathlib.Path(data_item2._test_get_file_path()), pathlib.Path(data_item3._test_get_file_path())]
+            # data items 2 and 3 cannot be read. data item 2 shares its data with data item 1.
+            for file_path in unreadable_file_paths:
+                storage_handler = NDataHandler.NDataHandler(str(file_path))
+                properties = storage_handler.read_properties()
+                properties.pop("uuid")
+                storage_handler.write_properties(properties, datetime.datetime.now())
+                storage_handler.close()
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertEqual(1, len(document_model.data_items))
+                self.assertEqual(2, len(list(data_blob_directory.glob("*.npy"))))
+                # removing the only readable data item using the shared data keeps the shared data
+                document_model.remove_data_item(document_model.data_items[0])
+            document_model = profile_context.create_document_model(auto_close=False)
+            with document_model.ref():
+                self.assertEqual(0, len(document_model.data_items))
+                self.assertEqual(2, len(list(data_blob_directory.glob("*.npy"))))
+
     def test_metadata_works_in_reserved_data(self):
         with create_temp_profile_context() as profile_context:
             document_model = profile_context.create_document_model(auto_close=False)
@@ -471,6 +471,32 @@ class TestSymbolicClass(unittest.TestCase):
             document_model.recompute_all()
             self.assertTrue(numpy.array_equal(data[1, 1, ...], computed_data_item.data))
 
+    def test_computation_gets_normalized_adjusted_and_transformed_data_in_full_precision(self):
+        with TestContext.create_memory_context() as test_context:
+            document_model = test_context.create_document_model()
+            data = numpy.random.uniform(1000, 1001, (8, 8))
+            data_item = DataItem.DataItem(data)
+            document_model.append_data_item(data_item)
+            display_item = document_model.get_display_item_for_data_item(data_item)
+            display_data_channel = display_item.display_data_channels[0]
+            display_data_channel.display_limits = 1000.25, 1000.75
+            display_data_channel.adjustments = [{"type": "gamma", "gamma": 0.5}]
+            # the display calculates these in float32
+            self.assertEqual(numpy.float32, display_data_channel.display_values.display_data_info.derived_display_values.normalized_data_and_metadata.data_dtype)
+            normalized_data = (data - 1000.25) / 0.5
+            for expression, expected_data in (("a.normalized_xdata", normalized_data),
+                                              ("a.adjusted_xdata", numpy.power(numpy.clip(normalized_data, 0, 1), 0.5)),
+                                              ("a.transformed_xdata", numpy.power(numpy.clip(normalized_data, 0, 1), 0.5))):
+                with self.subTest(expression=expression):
+                    computation = document_model.create_computation(Symbolic.xdata_expression(expression))
+                    computation.create_input_item("a", Symbolic.make_item(display_data_channel))
+                    computed_data_item = DataItem.DataItem(numpy.zeros((8, 8)))
+                    document_model.append_data_item(computed_data_item)
+                    document_model.set_data_item_computation(computed_data_item, computation)
+                    document_model.recompute_all()
+                    self.assertEqual(numpy.float64, computed_data_item.data.dtype)
+                    self.assertTrue(numpy.allclose(expected_data, computed_data_item.data, rtol=0, atol=1e-12))
+
     def test_computation_fires_needs_update_event_when_metadata_changes(self):
         with TestContext.create_memory_context() as test_context:
             document_model = test_context.create_document_model()
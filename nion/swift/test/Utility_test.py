@@ -1,5 +1,7 @@
 import json
 import os
+import pathlib
+import tempfile
 import unittest
 
 from nion.swift.model import Utility
@@ -111,6 +113,17 @@ class TestUtilityClass(unittest.TestCase):
                 self.assertTrue(is_valid)
                 self.assertEqual(errors, None)
 
+    def test_clone_file_replaces_target_and_leaves_no_temporary_file(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_path = pathlib.Path(temp_dir) / "source.bin"
+            target_path = pathlib.Path(temp_dir) / "target.bin"
+            source_path.write_bytes(b"source data")
+            target_path.write_bytes(b"old target data which is longer")
+            Utility.clone_file(source_path, target_path)
+            self.assertEqual(b"source data", target_path.read_bytes())
+            self.assertEqual(b"source data", source_path.read_bytes())
+            self.assertEqual({"source.bin", "target.bin"}, {path.name for path in pathlib.Path(temp_dir).iterdir()})
+
 
 if __name__ == '__main__':
     unittest.main()